@@ -0,0 +1,293 @@
+"""Acquisition path benchmarks.
+
+Drives `EEG` with a simulated device (`ReplayEEGManager` over synthetic
+recordings) and reports, for every stream rate and channel count:
+
+- ingest: sustained chunks per second and per-chunk callback latency
+  percentiles of `EEG._acq`
+- windows: cost of `get_window`, `get_mne` and `convert_to_mne` after
+  sessions of increasing length, with the focus score on top
+- peak traced memory of filling a session and exporting it to MNE
+
+Results are written as JSON so runs of different SDK versions can be
+compared. Run from the repository root:
+
+    python benchmarks/acquisition.py --output results.json
+
+The BrainAccess core library must be loadable, no device is needed.
+"""
+
+import argparse
+import itertools
+import json
+import pathlib
+import platform
+import sys
+import time
+import tracemalloc
+import typing
+
+import mne
+import numpy as np
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+sys.path.insert(0, str(ROOT / "brainmain"))
+
+from brainaccess.core.stream_rate import StreamRate  # noqa: E402
+from brainaccess.utils.acquisition import EEG  # noqa: E402
+from brainaccess.utils.replay import ReplayEEGManager  # noqa: E402
+
+try:
+    import galerabrainlib  # noqa: E402
+except ImportError:
+    galerabrainlib = None
+
+CAPS = {
+    4: {0: "Fp1", 1: "Fp2", 2: "O1", 3: "O2"},
+    8: {0: "F3", 1: "F4", 2: "C3", 3: "C4", 4: "P3", 5: "P4", 6: "O1", 7: "O2"},
+}
+RATES = (StreamRate.X250Hz, StreamRate.X500Hz)
+# the focus score is defined on four channels
+FOCUS_CHANNELS = 4
+
+
+def _recording(cap: dict, sfreq: int, seconds: float, seed: int = 0) -> mne.io.RawArray:
+    """Synthetic recording with an alpha rhythm on top of noise."""
+    rng = np.random.default_rng(seed)
+    n = int(seconds * sfreq)
+    t = np.arange(n) / sfreq
+    data = 1e-5 * rng.standard_normal((len(cap), n))
+    data += 2e-5 * np.sin(2 * np.pi * 10 * t)
+    data = np.vstack([data, np.arange(n, dtype=np.float64)])
+    info = mne.create_info(
+        list(cap.values()) + ["Sample"], sfreq, ["eeg"] * len(cap) + ["misc"]
+    )
+    return mne.io.RawArray(data, info, verbose=False)
+
+
+def _eeg(
+    cap: dict,
+    sfreq: int,
+    mode: str = "accumulate",
+    zeros_at_start: int = 0,
+    dtype: str = "float64",
+    **replay,
+) -> typing.Tuple[EEG, ReplayEEGManager]:
+    """EEG connected to a replayed synthetic recording."""
+    mgr = ReplayEEGManager(
+        _recording(cap, sfreq, replay.pop("seconds", 1.0)), cap=cap, **replay
+    )
+    eeg = EEG(mode=mode, dtype=dtype)
+    eeg.setup(
+        mgr, "replay", cap=cap, zeros_at_start=zeros_at_start, sfreq=sfreq, scan=False
+    )
+    return eeg, mgr
+
+
+def _stats(values: typing.Sequence[float]) -> dict:
+    """Percentiles in microseconds of durations given in seconds."""
+    values = np.asarray(values) * 1e6
+    return {
+        "p50_us": float(np.percentile(values, 50)),
+        "p95_us": float(np.percentile(values, 95)),
+        "p99_us": float(np.percentile(values, 99)),
+        "max_us": float(values.max()),
+    }
+
+
+def _timeit(f: typing.Callable, repeat: int) -> dict:
+    """Median and worst duration of repeated calls in milliseconds."""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        f()
+        durations.append(time.perf_counter() - start)
+    return {
+        "median_ms": float(np.median(durations) * 1e3),
+        "max_ms": float(np.max(durations) * 1e3),
+    }
+
+
+def _peak_memory(f: typing.Callable) -> float:
+    """Peak traced memory of a call in MiB."""
+    tracemalloc.start()
+    try:
+        f()
+        return tracemalloc.get_traced_memory()[1] / 2**20
+    finally:
+        tracemalloc.stop()
+
+
+def bench_ingest(
+    cap: dict, sfreq: int, mode: str, seconds: float, chunk_size: int, dtype: str
+) -> dict:
+    """Replays a recording as fast as possible through the chunk callback."""
+    eeg, mgr = _eeg(
+        cap,
+        sfreq,
+        mode=mode,
+        zeros_at_start=int(seconds * sfreq) if mode == "roll" else 0,
+        seconds=seconds,
+        dtype=dtype,
+        speed=None,
+        chunk_size=chunk_size,
+    )
+    latencies = []
+    callback = eeg._acq
+
+    def timed(chunk, size):
+        start = time.perf_counter()
+        callback(chunk, size)
+        latencies.append(time.perf_counter() - start)
+
+    eeg._acq = timed
+    start = time.perf_counter()
+    eeg.start_acquisition()
+    while mgr.is_streaming():
+        time.sleep(0.001)
+    elapsed = time.perf_counter() - start
+    mgr.destroy()
+    eeg.close()
+    return {
+        "benchmark": "ingest",
+        "mode": mode,
+        "chunk_size": chunk_size,
+        "chunks": len(latencies),
+        "chunks_per_s": len(latencies) / elapsed,
+        "samples_per_s": len(latencies) * chunk_size / elapsed,
+        "callback_latency": _stats(latencies),
+    }
+
+
+def bench_windows(
+    cap: dict, sfreq: int, session: float, window: float, repeat: int, dtype: str
+) -> dict:
+    """Window and MNE export cost after a session of the given length."""
+    eeg, mgr = _eeg(cap, sfreq, dtype=dtype, speed=None)
+    eeg.start_acquisition()
+    while mgr.is_streaming():
+        time.sleep(0.001)
+    samples = int(session * sfreq)
+    # one second chunks laid out like the device stream
+    block = 1e-5 * np.random.default_rng(0).standard_normal((eeg.chans, sfreq))
+
+    def fill(eeg):
+        # continue the replayed sample numbers, no counter reset or gap
+        first = int(eeg.get_window(samples=1).sample_numbers[-1]) + 1
+        for start in range(first, first + samples, sfreq):
+            block[eeg.data.sample_index] = np.arange(start, start + sfreq)
+            eeg._acq(block, sfreq)
+
+    start = time.perf_counter()
+    fill(eeg)
+    fill_s = time.perf_counter() - start
+    names = list(cap.values())[:FOCUS_CHANNELS]
+    result = {
+        "benchmark": "windows",
+        "session_s": session,
+        "window_s": window,
+        "fill_samples_per_s": samples / fill_s,
+        "get_window": _timeit(lambda: eeg.get_window(seconds=window), repeat),
+        "get_mne_window": _timeit(lambda: eeg.get_mne(tim=window), repeat),
+        "get_mne_window_cached": _timeit(
+            lambda: eeg.get_mne(tim=window, cached=True), repeat
+        ),
+        "get_mne_session": _timeit(eeg.get_mne, max(1, repeat // 10)),
+        "peak_mib_get_mne_session": _peak_memory(eeg.get_mne),
+    }
+    if galerabrainlib is not None:
+        result["focus_score_window"] = _timeit(
+            lambda: galerabrainlib.contr_window(
+                eeg.get_window(seconds=window, channels=names)
+            ),
+            repeat,
+        )
+        if len(cap) == FOCUS_CHANNELS:
+            # contr expects the four electrodes followed by one channel it drops
+            result["focus_score_mne"] = _timeit(
+                lambda: galerabrainlib.contr(
+                    eeg.get_mne(tim=window).pick(names + ["Sample"])
+                ),
+                repeat,
+            )
+    mgr.destroy()
+    eeg.close()
+
+    # separate session so tracing does not slow down the timings above
+    eeg, mgr = _eeg(cap, sfreq, dtype=dtype, speed=None)
+    eeg.start_acquisition()
+    while mgr.is_streaming():
+        time.sleep(0.001)
+    result["peak_mib_fill"] = _peak_memory(lambda: fill(eeg))
+    mgr.destroy()
+    eeg.close()
+    return result
+
+
+def main(argv: typing.Optional[list] = None) -> dict:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", help="JSON file, printed if omitted")
+    parser.add_argument(
+        "--sessions",
+        type=float,
+        nargs="+",
+        default=[60, 600, 3600],
+        help="session lengths in seconds",
+    )
+    parser.add_argument("--ingest-seconds", type=float, default=60)
+    parser.add_argument("--chunk-size", type=int, default=10)
+    parser.add_argument("--window", type=float, default=5)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument(
+        "--dtype",
+        nargs="+",
+        default=["float64", "float32"],
+        help="storage data types",
+    )
+    args = parser.parse_args(argv)
+
+    results = []
+    for rate, (chans, cap), dtype in itertools.product(
+        RATES, CAPS.items(), args.dtype
+    ):
+        sfreq = rate.to_hz
+        config = {
+            "stream_rate": rate.name,
+            "sfreq": sfreq,
+            "channels": chans,
+            "dtype": dtype,
+        }
+        for mode in ("accumulate", "memmap", "roll"):
+            res = bench_ingest(
+                cap, sfreq, mode, args.ingest_seconds, args.chunk_size, dtype
+            )
+            results.append({**config, **res})
+        for session in args.sessions:
+            res = bench_windows(cap, sfreq, session, args.window, args.repeat, dtype)
+            results.append({**config, **res})
+
+    try:
+        from importlib.metadata import version
+
+        sdk_version = version("brainaccess")
+    except Exception:
+        sdk_version = "unknown"
+    report = {
+        "sdk_version": sdk_version,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "mne": mne.__version__,
+        "platform": platform.platform(),
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        pathlib.Path(args.output).write_text(text)
+    else:
+        print(text)
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,198 @@
+"""Marshalling benchmarks of brainaccess.connect.processor.
+
+Compares every wrapper with the marshalling it replaced: a copy, ravel
+and astype of the input, ctypes arrays from `np.ctypeslib.as_ctypes` and
+results converted back through a ctypes slice. The native functions are
+the same, so the difference is the cost of moving data in and out.
+
+Inputs are window-sized (5 s) and session-sized (10 min) arrays, both as
+C-contiguous float64 (passed without a copy) and as float32 row views of a
+larger buffer (copied once). Before timing, every case is checked to
+return the same result as the legacy marshalling. Results are written as
+JSON. Run from the repository root:
+
+    python benchmarks/processor.py --output results.json
+
+The BrainAccess connect library must be loadable, no device is needed.
+"""
+
+import argparse
+import ctypes
+import json
+import pathlib
+import platform
+import sys
+import time
+import typing
+
+import numpy as np
+
+ROOT = pathlib.Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from brainaccess.connect import _dll, processor  # noqa: E402
+
+SFREQ = 250
+_double_p = ctypes.POINTER(ctypes.c_double)
+
+
+def _legacy(name: str, argtypes: list) -> typing.Any:
+    """Native function with the pointer argtypes the wrappers used before."""
+    # item access returns a new function object, the wrappers keep theirs
+    func = _dll[name]
+    func.argtypes = argtypes
+    func.restype = None
+    return func
+
+
+_reduce_types = [_double_p, ctypes.c_size_t, ctypes.c_size_t, _double_p]
+_legacy_mean = _legacy("ba_bci_connect_mean", _reduce_types)
+_legacy_std = _legacy("ba_bci_connect_std", _reduce_types)
+_legacy_detrend = _legacy("ba_bci_connect_detrend", _reduce_types)
+_legacy_demean = _legacy("ba_bci_connect_demean", _reduce_types)
+_legacy_standardize = _legacy("ba_bci_connect_standartize", _reduce_types)
+_legacy_bandpass = _legacy(
+    "ba_bci_connect_filter_bandpass",
+    [_double_p, ctypes.c_size_t, ctypes.c_size_t] + [ctypes.c_double] * 3,
+)
+_legacy_fft_func = _legacy(
+    "ba_bci_connect_fft",
+    [_double_p, ctypes.c_size_t, ctypes.c_size_t, ctypes.c_double, _double_p, _double_p],
+)
+
+
+def _legacy_reduce(func: typing.Any, x: np.ndarray) -> np.ndarray:
+    chans, time_points = x.shape
+    _x = x.copy().ravel(order="C").astype(np.float64)
+    c_result = np.ctypeslib.as_ctypes(np.zeros(chans))
+    func(np.ctypeslib.as_ctypes(_x), chans, time_points, c_result)
+    return np.array(c_result[0:chans])
+
+
+def _legacy_map(func: typing.Any, x: np.ndarray) -> np.ndarray:
+    chans, time_points = x.shape
+    _x = x.copy().ravel(order="C").astype(np.float64)
+    c_result = np.ctypeslib.as_ctypes(np.zeros(chans * time_points))
+    func(np.ctypeslib.as_ctypes(_x), chans, time_points, c_result)
+    return np.array(c_result[: chans * time_points]).reshape((chans, time_points))
+
+
+def _legacy_filter_bandpass(x: np.ndarray) -> np.ndarray:
+    chans, time_points = x.shape
+    _x = x.copy().ravel(order="C").astype(np.float64)
+    c_arr = np.ctypeslib.as_ctypes(_x)
+    _legacy_bandpass(c_arr, chans, time_points, SFREQ, 1.0, 40.0)
+    return np.array(c_arr[: chans * time_points]).reshape((chans, time_points))
+
+
+def _legacy_fft(x: np.ndarray) -> dict:
+    chans, time_points = x.shape
+    _x = x.copy().ravel(order="C").astype(np.float64)
+    n = (time_points - (time_points % 2)) // 2 + 1
+    c_mag = np.ctypeslib.as_ctypes(np.zeros(chans * n))
+    c_phase = np.ctypeslib.as_ctypes(np.zeros(chans * n))
+    _legacy_fft_func(np.ctypeslib.as_ctypes(_x), chans, time_points, SFREQ, c_mag, c_phase)
+    mags = np.array(c_mag[: chans * n]).reshape((chans, n))
+    phases = np.array(c_phase[: chans * n]).reshape((chans, n))
+    return {"mag": mags * 2, "phase": phases}
+
+
+CASES: typing.Dict[str, typing.Tuple[typing.Callable, typing.Callable]] = {
+    "mean": (lambda x: _legacy_reduce(_legacy_mean, x), processor.mean),
+    "std": (lambda x: _legacy_reduce(_legacy_std, x), processor.std),
+    "detrend": (lambda x: _legacy_map(_legacy_detrend, x), processor.detrend),
+    "demean": (lambda x: _legacy_map(_legacy_demean, x), processor.demean),
+    "standardize": (
+        lambda x: _legacy_map(_legacy_standardize, x),
+        processor.standardize,
+    ),
+    "filter_bandpass": (
+        _legacy_filter_bandpass,
+        lambda x: processor.filter_bandpass(x, SFREQ, 1.0, 40.0),
+    ),
+    "fft": (_legacy_fft, lambda x: processor.fft(x, SFREQ)),
+}
+
+
+def _check(name: str, layout: str, before: typing.Any, after: typing.Any) -> None:
+    """Raises if the new wrapper does not return what the legacy one did."""
+    if isinstance(before, dict):
+        for key in before:
+            _check(f"{name}[{key}]", layout, before[key], after[key])
+        return
+    if not np.allclose(before, after, rtol=1e-10, atol=1e-12, equal_nan=True):
+        raise AssertionError(f"{name} differs from the legacy marshalling on {layout}")
+
+
+def _timeit(f: typing.Callable, repeat: int) -> dict:
+    """Median and worst duration of repeated calls in milliseconds."""
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        f()
+        durations.append(time.perf_counter() - start)
+    return {
+        "median_ms": float(np.median(durations) * 1e3),
+        "max_ms": float(np.max(durations) * 1e3),
+    }
+
+
+def _inputs(chans: int, seconds: float) -> dict:
+    """Contiguous float64 data and a float32 row view of a wider buffer."""
+    rng = np.random.default_rng(0)
+    n = int(seconds * SFREQ)
+    contiguous = rng.standard_normal((chans, n))
+    buffer = rng.standard_normal((chans + 1, 2 * n)).astype(np.float32)
+    return {"float64_contiguous": contiguous, "float32_view": buffer[:chans, :n]}
+
+
+def main(argv: typing.Optional[list] = None) -> dict:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--output", help="JSON file, printed if omitted")
+    parser.add_argument("--channels", type=int, nargs="+", default=[4, 8])
+    parser.add_argument(
+        "--seconds",
+        type=float,
+        nargs="+",
+        default=[5, 600],
+        help="input lengths in seconds",
+    )
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    results = []
+    for chans in args.channels:
+        for seconds in args.seconds:
+            for layout, x in _inputs(chans, seconds).items():
+                for name, (before, after) in CASES.items():
+                    _check(name, layout, before(x), after(x))
+                    old = _timeit(lambda: before(x), args.repeat)
+                    new = _timeit(lambda: after(x), args.repeat)
+                    results.append(
+                        {
+                            "function": name,
+                            "channels": chans,
+                            "seconds": seconds,
+                            "input": layout,
+                            "before": old,
+                            "after": new,
+                            "speedup": old["median_ms"] / max(new["median_ms"], 1e-9),
+                        }
+                    )
+
+    report = {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "results": results,
+    }
+    text = json.dumps(report, indent=2)
+    if args.output:
+        pathlib.Path(args.output).write_text(text)
+    else:
+        print(text)
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -1,100 +1,107 @@
 import ctypes
+import typing
 import numpy as np
 
 from typing import Optional
+from scipy import signal  # type: ignore
 
 from brainaccess.utils.exceptions import BrainAccessException
+from brainaccess.utils.filters import design_sos
 from brainaccess.connect import _dll
 
 
 # ctypes
 
+# arrays are passed by pointer, numpy checks dtype and layout on every call
+_f64 = np.ctypeslib.ndpointer(dtype=np.float64, flags="C_CONTIGUOUS")
+_f64_out = np.ctypeslib.ndpointer(dtype=np.float64, flags=("C_CONTIGUOUS", "WRITEABLE"))
+
 _dll.ba_bci_connect_get_signal_quality.argtypes = [
-    ctypes.POINTER(ctypes.c_double),
+    _f64,
     ctypes.c_size_t,
     ctypes.c_size_t,
-    ctypes.POINTER(ctypes.c_double),
+    _f64_out,
 ]
 _dll.ba_bci_connect_get_signal_quality.restype = None
 
 _dll.ba_bci_connect_detrend.argtypes = [
-    ctypes.POINTER(ctypes.c_double),
+    _f64,
     ctypes.c_size_t,
     ctypes.c_size_t,
-    ctypes.POINTER(ctypes.c_double),
+    _f64_out,
 ]
 _dll.ba_bci_connect_detrend.restype = None
 
 _dll.ba_bci_connect_median.argtypes = [
-    ctypes.POINTER(ctypes.c_double),
+    _f64,
     ctypes.c_size_t,
     ctypes.c_size_t,
-    ctypes.POINTER(ctypes.c_double),
+    _f64_out,
 ]
 _dll.ba_bci_connect_median.restype = None
 
 _dll.ba_bci_connect_mad.argtypes = [
-    ctypes.POINTER(ctypes.c_double),
+    _f64,
     ctypes.c_size_t,
     ctypes.c_size_t,
-    ctypes.POINTER(ctypes.c_double),
+    _f64_out,
 ]
 _dll.ba_bci_connect_mad.restype = None
 
 _dll.ba_bci_connect_mean.argtypes = [
-    ctypes.POINTER(ctypes.c_double),
+    _f64,
     ctypes.c_size_t,
     ctypes.c_size_t,
-    ctypes.POINTER(ctypes.c_double),
+    _f64_out,
 ]
 _dll.ba_bci_connect_mean.restype = None
 
 _dll.ba_bci_connect_std.argtypes = [
-    ctypes.POINTER(ctypes.c_double),
+    _f64,
     ctypes.c_size_t,
     ctypes.c_size_t,
-    ctypes.POINTER(ctypes.c_double),
+    _f64_out,
 ]
 _dll.ba_bci_connect_std.restype = None
 
 
 _dll.ba_bci_connect_demean.argtypes = [
-    ctypes.POINTER(ctypes.c_double),
+    _f64,
     ctypes.c_size_t,
     ctypes.c_size_t,
-    ctypes.POINTER(ctypes.c_double),
+    _f64_out,
 ]
 _dll.ba_bci_connect_demean.restype = None
 
 _dll.ba_bci_connect_standartize.argtypes = [
-    ctypes.POINTER(ctypes.c_double),
+    _f64,
     ctypes.c_size_t,
     ctypes.c_size_t,
-    ctypes.POINTER(ctypes.c_double),
+    _f64_out,
 ]
 _dll.ba_bci_connect_standartize.restype = None
 
 _dll.ba_bci_connect_ewma.argtypes = (
-    ctypes.POINTER(ctypes.c_double),
+    _f64,
     ctypes.c_size_t,
     ctypes.c_size_t,
     ctypes.c_double,
-    ctypes.POINTER(ctypes.c_double),
+    _f64_out,
 )
 _dll.ba_bci_connect_ewma.restype = None
 
 _dll.ba_bci_connect_ewma_standartize.argtypes = (
-    ctypes.POINTER(ctypes.c_double),
+    _f64,
     ctypes.c_size_t,
     ctypes.c_size_t,
     ctypes.c_double,
     ctypes.c_double,
-    ctypes.POINTER(ctypes.c_double),
+    _f64_out,
 )
 _dll.ba_bci_connect_ewma_standartize.restype = None
 
 _dll.ba_bci_connect_filter_notch.argtypes = (
-    ctypes.POINTER(ctypes.c_double),
+    _f64_out,
     ctypes.c_size_t,
     ctypes.c_size_t,
     ctypes.c_double,
@@ -104,7 +111,7 @@ _dll.ba_bci_connect_filter_notch.argtypes = (
 _dll.ba_bci_connect_filter_notch.restype = None
 
 _dll.ba_bci_connect_filter_bandpass.argtypes = (
-    ctypes.POINTER(ctypes.c_double),
+    _f64_out,
     ctypes.c_size_t,
     ctypes.c_size_t,
     ctypes.c_double,
@@ -114,7 +121,7 @@ _dll.ba_bci_connect_filter_bandpass.argtypes = (
 _dll.ba_bci_connect_filter_bandpass.restype = None
 
 _dll.ba_bci_connect_filter_highpass.argtypes = (
-    ctypes.POINTER(ctypes.c_double),
+    _f64_out,
     ctypes.c_size_t,
     ctypes.c_size_t,
     ctypes.c_double,
@@ -123,7 +130,7 @@ _dll.ba_bci_connect_filter_highpass.argtypes = (
 _dll.ba_bci_connect_filter_highpass.restype = None
 
 _dll.ba_bci_connect_filter_lowpass.argtypes = (
-    ctypes.POINTER(ctypes.c_double),
+    _f64_out,
     ctypes.c_size_t,
     ctypes.c_size_t,
     ctypes.c_double,
@@ -132,25 +139,89 @@ _dll.ba_bci_connect_filter_lowpass.argtypes = (
 _dll.ba_bci_connect_filter_lowpass.restype = None
 
 _dll.ba_bci_connect_fft.argtypes = [
-    ctypes.POINTER(ctypes.c_double),
+    _f64,
     ctypes.c_size_t,
     ctypes.c_size_t,
     ctypes.c_double,
-    ctypes.POINTER(ctypes.c_double),
-    ctypes.POINTER(ctypes.c_double),
+    _f64_out,
+    _f64_out,
 ]
 _dll.ba_bci_connect_fft.restype = None
 
 _dll.ba_bci_connect_minmax.argtypes = [
-    ctypes.POINTER(ctypes.c_double),
+    _f64,
     ctypes.c_size_t,
     ctypes.c_size_t,
-    ctypes.POINTER(ctypes.c_double),
-    ctypes.POINTER(ctypes.c_double),
+    _f64_out,
+    _f64_out,
 ]
 _dll.ba_bci_connect_minmax.restype = None
 
 
+def _dims(x: np.ndarray) -> typing.Tuple[int, int]:
+    """Number of signals and time points of an array with time on the last axis.
+
+    Leading axes, e.g. (epochs, channels), are flattened into one, so every
+    function processes all signals in a single native call.
+    """
+    shape = np.shape(x)
+    if len(shape) == 0:
+        raise BrainAccessException("data must have a time axis")
+    return int(np.prod(shape[:-1], dtype=np.int64)), shape[-1]
+
+
+def _input(x: np.ndarray) -> np.ndarray:
+    """Returns x as a C-contiguous float64 array, copying only if needed."""
+    return np.ascontiguousarray(x, dtype=np.float64)
+
+
+def _copy(x: np.ndarray) -> np.ndarray:
+    """Returns a C-contiguous float64 copy of x for functions working in place."""
+    return np.array(x, dtype=np.float64, order="C")
+
+
+def _destination(
+    x: np.ndarray, out: Optional[np.ndarray], inplace: bool
+) -> Optional[np.ndarray]:
+    """Returns the array a result is written to, None to allocate a new one.
+
+    Raises
+    ------
+    BrainAccessException
+        If both out and inplace are given, or the destination is not a
+        writeable C-contiguous float64 array of the shape of x.
+    """
+    if inplace and out is not None:
+        raise BrainAccessException("Use either out or inplace")
+    dest = x if inplace else out
+    if dest is None:
+        return None
+    if (
+        not isinstance(dest, np.ndarray)
+        or dest.dtype != np.float64
+        or not dest.flags.c_contiguous
+        or not dest.flags.writeable
+        or dest.shape != np.shape(x)
+    ):
+        name = "x" if inplace else "out"
+        raise BrainAccessException(
+            f"{name} must be a writeable C-contiguous float64 array of shape {np.shape(x)}"
+        )
+    return dest
+
+
+def _filter_buffer(
+    x: np.ndarray, out: Optional[np.ndarray], inplace: bool
+) -> np.ndarray:
+    """Returns the array an in-place native filter runs on, holding x."""
+    dest = _destination(x, out, inplace)
+    if dest is None:
+        return _copy(x)
+    if dest is not x:
+        np.copyto(dest, x)
+    return dest
+
+
 def get_signal_quality(x: np.ndarray) -> np.ndarray:
     """Calculate signal quality for each channel in the data
     This function estimates the EEG signal quality for each
@@ -165,46 +236,52 @@ def get_signal_quality(x: np.ndarray) -> np.ndarray:
     Parameters
     -----------
     x: np.ndarray
-        data array, shape (channels, time)
+        data array, shape (..., time), e.g. (channels, time) or
+        (epochs, channels, time)
 
     Returns
     --------
     np.ndarray
-        signal quality for each channel in the same order as x
+        signal quality for each channel in the same order as x, shape x.shape[:-1]
         * 0 - signal is bad and did not pass any quality measure
         * 1 - signal passed amplitude related quality measures
         * 2 - signal also do not contain significant amounts of 50/60Hz noise
     """
-    chans = x.shape[0]
-    time_points = x.shape[1]
-    _x = x.copy().ravel(order="C").astype(np.float64)
-    c_result = np.ctypeslib.as_ctypes(np.zeros(chans))
-    c_arr = np.ctypeslib.as_ctypes(_x)
-    _dll.ba_bci_connect_get_signal_quality(c_arr, chans, time_points, c_result)
-    return np.array(c_result[0:chans])
+    chans, time_points = _dims(x)
+    result = np.zeros(np.shape(x)[:-1])
+    _dll.ba_bci_connect_get_signal_quality(_input(x), chans, time_points, result)
+    return result
 
 
-def detrend(x: np.ndarray) -> np.ndarray:
+def detrend(
+    x: np.ndarray, out: Optional[np.ndarray] = None, inplace: bool = False
+) -> np.ndarray:
     """Remove linear trend from each channel
 
     Parameters
     -----------
     x: np.ndarray
-        data array, shape (channels, time)
+        data array, shape (..., time), e.g. (channels, time) or
+        (epochs, channels, time)
+    out: np.ndarray, optional
+        C-contiguous float64 array of the shape of x the result is written to
+    inplace: bool
+        Write the result to x, which must be a C-contiguous float64 array;
+        input and output of the native function then share x, which gives
+        the same result as a separate output (tests/test_processor.py)
 
     Returns
     -----------
     np.ndarray
-        data array, shape (channels, time)
+        data array, shape of x
     """
 
-    chans = x.shape[0]
-    time_points = x.shape[1]
-    _x = x.copy().ravel(order="C").astype(np.float64)
-    c_result = np.ctypeslib.as_ctypes(np.zeros(chans * time_points))
-    c_arr = np.ctypeslib.as_ctypes(_x)
-    _dll.ba_bci_connect_detrend(c_arr, chans, time_points, c_result)
-    return np.array(c_result[: chans * time_points]).reshape((chans, time_points))
+    chans, time_points = _dims(x)
+    result = _destination(x, out, inplace)
+    if result is None:
+        result = np.zeros(np.shape(x))
+    _dll.ba_bci_connect_detrend(_input(x), chans, time_points, result)
+    return result
 
 
 def mad(x: np.ndarray) -> np.ndarray:
@@ -213,20 +290,18 @@ def mad(x: np.ndarray) -> np.ndarray:
     Parameters
     -----------
     x: np.ndarray
-        data array, shape (channels, time)
+        data array, shape (..., time), e.g. (channels, time) or
+        (epochs, channels, time)
 
     Returns
     --------
     np.ndarray
 
     """
-    chans = x.shape[0]
-    time_points = x.shape[1]
-    _x = x.copy().ravel(order="C").astype(np.float64)
-    c_result = np.ctypeslib.as_ctypes(np.zeros(chans))
-    c_arr = np.ctypeslib.as_ctypes(_x)
-    _dll.ba_bci_connect_mad(c_arr, chans, time_points, c_result)
-    return np.array(c_result)
+    chans, time_points = _dims(x)
+    result = np.zeros(np.shape(x)[:-1])
+    _dll.ba_bci_connect_mad(_input(x), chans, time_points, result)
+    return result
 
 
 def get_minmax(x: np.ndarray) -> dict[str, np.ndarray]:
@@ -235,25 +310,19 @@ def get_minmax(x: np.ndarray) -> dict[str, np.ndarray]:
     Parameters
     -----------
     x: np.ndarray
-        data array, shape (channels, time)
+        data array, shape (..., time), e.g. (channels, time) or
+        (epochs, channels, time)
 
     Returns
     --------
     dict
-        min and max for each channel in the same order as x
+        min and max for each channel in the same order as x, shape x.shape[:-1]
     """
-    chans = x.shape[0]
-    time_points = x.shape[1]
-    _x = x.copy().ravel(order="C").astype(np.float64)
-    c_arr = np.ctypeslib.as_ctypes(_x)
-    result = np.zeros(chans)
-    c_result_min = np.ctypeslib.as_ctypes(result.copy())
-    c_result_max = np.ctypeslib.as_ctypes(result.copy())
-    _dll.ba_bci_connect_minmax(c_arr, chans, time_points, c_result_min, c_result_max)
-    return {
-        "min": np.array(c_result_min[0:chans]),
-        "max": np.array(c_result_max[0:chans]),
-    }
+    chans, time_points = _dims(x)
+    result_min = np.zeros(np.shape(x)[:-1])
+    result_max = np.zeros(np.shape(x)[:-1])
+    _dll.ba_bci_connect_minmax(_input(x), chans, time_points, result_min, result_max)
+    return {"min": result_min, "max": result_max}
 
 
 def median(x: np.ndarray) -> np.ndarray:
@@ -262,21 +331,18 @@ def median(x: np.ndarray) -> np.ndarray:
     Parameters
     -----------
     x: np.ndarray
-        data array, shape (channels, time)
+        data array, shape (..., time), e.g. (channels, time) or
+        (epochs, channels, time)
 
     Returns
     --------
     np.ndarray
-        medians for each channel in the same order as x
+        medians for each channel in the same order as x, shape x.shape[:-1]
     """
-    chans = x.shape[0]
-    time_points = x.shape[1]
-    _x = x.copy().ravel(order="C").astype(np.float64)
-    result = np.zeros(chans)
-    c_result = np.ctypeslib.as_ctypes(result)
-    c_arr = np.ctypeslib.as_ctypes(_x)
-    _dll.ba_bci_connect_median(c_arr, chans, time_points, c_result)
-    return np.array(c_result[0:chans])
+    chans, time_points = _dims(x)
+    result = np.zeros(np.shape(x)[:-1])
+    _dll.ba_bci_connect_median(_input(x), chans, time_points, result)
+    return result
 
 
 def mean(x: np.ndarray) -> np.ndarray:
@@ -285,21 +351,18 @@ def mean(x: np.ndarray) -> np.ndarray:
     Parameters
     -----------
     x: np.ndarray
-        data array, shape (channels, time)
+        data array, shape (..., time), e.g. (channels, time) or
+        (epochs, channels, time)
 
     Returns
     --------
     np.ndarray
-        means for each channel in the same order as x
+        means for each channel in the same order as x, shape x.shape[:-1]
     """
-    chans = x.shape[0]
-    time_points = x.shape[1]
-    _x = x.copy().ravel(order="C").astype(np.float64)
-    result = np.zeros(chans)
-    c_result = np.ctypeslib.as_ctypes(result)
-    c_arr = np.ctypeslib.as_ctypes(_x)
-    _dll.ba_bci_connect_mean(c_arr, chans, time_points, c_result)
-    return np.array(c_result[0:chans])
+    chans, time_points = _dims(x)
+    result = np.zeros(np.shape(x)[:-1])
+    _dll.ba_bci_connect_mean(_input(x), chans, time_points, result)
+    return result
 
 
 def std(x: np.ndarray) -> np.ndarray:
@@ -308,97 +371,125 @@ def std(x: np.ndarray) -> np.ndarray:
     Parameters
     -----------
     x: np.ndarray
-        data array, shape (channels, time)
+        data array, shape (..., time), e.g. (channels, time) or
+        (epochs, channels, time)
 
     Returns
     --------
     np.ndarray
-        standard deviation for each channel in the same order as x
+        standard deviation for each channel in the same order as x, shape x.shape[:-1]
     """
-    chans = x.shape[0]
-    time_points = x.shape[1]
-    _x = x.copy().ravel(order="C").astype(np.float64)
-    result = np.zeros(chans)
-    c_result = np.ctypeslib.as_ctypes(result)
-    c_arr = np.ctypeslib.as_ctypes(_x)
-    _dll.ba_bci_connect_std(c_arr, chans, time_points, c_result)
-    return np.array(c_result[0:chans])
+    chans, time_points = _dims(x)
+    result = np.zeros(np.shape(x)[:-1])
+    _dll.ba_bci_connect_std(_input(x), chans, time_points, result)
+    return result
 
 
-def demean(x: np.ndarray) -> np.ndarray:
+def demean(
+    x: np.ndarray, out: Optional[np.ndarray] = None, inplace: bool = False
+) -> np.ndarray:
     """Subtract mean from each channel
 
     Parameters
     -----------
     x: np.ndarray
-        data array, shape (channels, time)
+        data array, shape (..., time), e.g. (channels, time) or
+        (epochs, channels, time)
+    out: np.ndarray, optional
+        C-contiguous float64 array of the shape of x the result is written to
+    inplace: bool
+        Write the result to x, which must be a C-contiguous float64 array;
+        input and output of the native function then share x, which gives
+        the same result as a separate output (tests/test_processor.py)
 
     Returns
     -----------
     np.ndarray
-        data array, shape (channels, time)
+        data array, shape of x
     """
 
-    chans = x.shape[0]
-    time_points = x.shape[1]
-    _x = x.copy().ravel(order="C").astype(np.float64)
-    c_result = np.ctypeslib.as_ctypes(np.zeros(chans * time_points))
-    c_arr = np.ctypeslib.as_ctypes(_x)
-    _dll.ba_bci_connect_demean(c_arr, chans, time_points, c_result)
-    return np.array(c_result[: chans * time_points]).reshape((chans, time_points))
+    chans, time_points = _dims(x)
+    result = _destination(x, out, inplace)
+    if result is None:
+        result = np.zeros(np.shape(x))
+    _dll.ba_bci_connect_demean(_input(x), chans, time_points, result)
+    return result
 
 
-def standardize(x: np.ndarray) -> np.ndarray:
+def standardize(
+    x: np.ndarray, out: Optional[np.ndarray] = None, inplace: bool = False
+) -> np.ndarray:
     """Data standardization
 
     Parameters
     -----------
     x: np.ndarray
-        data array, shape (channels, time)
+        data array, shape (..., time), e.g. (channels, time) or
+        (epochs, channels, time)
+    out: np.ndarray, optional
+        C-contiguous float64 array of the shape of x the result is written to
+    inplace: bool
+        Write the result to x, which must be a C-contiguous float64 array;
+        input and output of the native function then share x, which gives
+        the same result as a separate output (tests/test_processor.py)
 
     Returns
     -----------
     np.ndarray
-        data array, shape (channels, time)
+        data array, shape of x
 
     """
 
-    chans = x.shape[0]
-    time_points = x.shape[1]
-    _x = x.copy().ravel(order="C").astype(np.float64)
-    c_result = np.ctypeslib.as_ctypes(np.zeros(chans * time_points))
-    c_arr = np.ctypeslib.as_ctypes(_x)
-    _dll.ba_bci_connect_standartize(c_arr, chans, time_points, c_result)
-    return np.array(c_result[: chans * time_points]).reshape((chans, time_points))
+    chans, time_points = _dims(x)
+    result = _destination(x, out, inplace)
+    if result is None:
+        result = np.zeros(np.shape(x))
+    _dll.ba_bci_connect_standartize(_input(x), chans, time_points, result)
+    return result
 
 
-def ewma(x: np.ndarray, alpha: float = 0.001) -> np.ndarray:
+def ewma(
+    x: np.ndarray,
+    alpha: float = 0.001,
+    out: Optional[np.ndarray] = None,
+    inplace: bool = False,
+) -> np.ndarray:
     """Exponential weighed moving average helper_function
 
     Parameters
     -----------
     x: np.ndarray
-        data array, shape (channels, time)
+        data array, shape (..., time), e.g. (channels, time) or
+        (epochs, channels, time)
     alpha: float
         new factor
+    out: np.ndarray, optional
+        C-contiguous float64 array of the shape of x the result is written to
+    inplace: bool
+        Write the result to x, which must be a C-contiguous float64 array;
+        input and output of the native function then share x, which gives
+        the same result as a separate output (tests/test_processor.py)
 
     Returns
     -----------
     np.ndarray
-        data array, shape (channels, time)
+        data array, shape of x
 
     """
-    chans = x.shape[0]
-    time_points = x.shape[1]
-    _x = x.copy().ravel(order="C").astype(np.float64)
-    c_result = np.ctypeslib.as_ctypes(np.zeros(chans * time_points))
-    c_arr = np.ctypeslib.as_ctypes(_x)
-    _dll.ba_bci_connect_ewma(c_arr, chans, time_points, np.float64(alpha), c_result)
-    return np.array(c_result[: chans * time_points]).reshape((chans, time_points))
+    chans, time_points = _dims(x)
+    result = _destination(x, out, inplace)
+    if result is None:
+        result = np.zeros(np.shape(x))
+    _dll.ba_bci_connect_ewma(_input(x), chans, time_points, alpha, result)
+    return result
 
 
 def ewma_standardize(
-    x: np.ndarray, alpha: float = 0.001, epsilon: float = 1e-4
+    x: np.ndarray,
+    alpha: float = 0.001,
+    epsilon: float = 1e-4,
+    out: Optional[np.ndarray] = None,
+    inplace: bool = False,
 ) -> np.ndarray:
     """Exponential weighed moving average standardization
 
@@ -407,31 +498,42 @@ def ewma_standardize(
     Parameters
     -----------
     x: np.ndarray
-        data array, shape (channels, time)
+        data array, shape (..., time), e.g. (channels, time) or
+        (epochs, channels, time)
     alpha: float
         Represents the degree of weighting decrease, a constant smoothing factor between 0 and 1. A higher alpha discounts older observations faster.
     epsilon: float
         Stabilizer for division by zero variance
+    out: np.ndarray, optional
+        C-contiguous float64 array of the shape of x the result is written to
+    inplace: bool
+        Write the result to x, which must be a C-contiguous float64 array;
+        input and output of the native function then share x, which gives
+        the same result as a separate output (tests/test_processor.py)
 
     Returns
     -----------
     np.ndarray
-        data array, shape (channels, time)
+        data array, shape of x
 
     """
-    chans = x.shape[0]
-    time_points = x.shape[1]
-    _x = x.copy().ravel(order="C").astype(np.float64)
-    c_result = np.ctypeslib.as_ctypes(np.zeros(chans * time_points))
-    c_arr = np.ctypeslib.as_ctypes(_x)
+    chans, time_points = _dims(x)
+    result = _destination(x, out, inplace)
+    if result is None:
+        result = np.zeros(np.shape(x))
     _dll.ba_bci_connect_ewma_standartize(
-        c_arr, chans, time_points, np.float64(alpha), np.float64(epsilon), c_result
+        _input(x), chans, time_points, alpha, epsilon, result
     )
-    return np.array(c_result[: chans * time_points]).reshape((chans, time_points))
+    return result
 
 
 def filter_notch(
-    x: np.ndarray, sampling_freq: float, center_freq: float, width_freq: float
+    x: np.ndarray,
+    sampling_freq: float,
+    center_freq: float,
+    width_freq: float,
+    out: Optional[np.ndarray] = None,
+    inplace: bool = False,
 ) -> np.ndarray:
     """Notch filter at desired frequency
 
@@ -440,19 +542,23 @@ def filter_notch(
     Parameters
     -----------
     x: np.ndarray
-        data array, shape (channels, time)
+        data array, shape (..., time), e.g. (channels, time) or
+        (epochs, channels, time)
     sampling_freq: float
         data sampling rate
     center_freq: float
         notch filter center frequency
     width_freq: float
         notch filter width
-
+    out: np.ndarray, optional
+        C-contiguous float64 array of the shape of x the result is written to
+    inplace: bool
+        Write the result to x, which must be a C-contiguous float64 array
 
     Returns
     -----------
     np.ndarray
-        data array, shape (channels, time)
+        data array, shape of x
 
     Warnings
     ---------
@@ -460,23 +566,26 @@ def filter_notch(
     before applying notch filter
 
     """
-    chans = x.shape[0]
-    time_points = x.shape[1]
-    _x = x.copy().ravel(order="C").astype(np.float64)
-    c_arr = np.ctypeslib.as_ctypes(_x)
+    chans, time_points = _dims(x)
+    _x = _filter_buffer(x, out, inplace)
     _dll.ba_bci_connect_filter_notch(
-        c_arr,
+        _x,
         ctypes.c_size_t(chans),
         ctypes.c_size_t(time_points),
         ctypes.c_double(sampling_freq),
         ctypes.c_double(center_freq),
         ctypes.c_double(width_freq),
     )
-    return np.array(c_arr[: chans * time_points]).reshape((chans, time_points))
+    return _x
 
 
 def filter_bandpass(
-    x: np.ndarray, sampling_freq: float, freq_low: float, freq_high: float
+    x: np.ndarray,
+    sampling_freq: float,
+    freq_low: float,
+    freq_high: float,
+    out: Optional[np.ndarray] = None,
+    inplace: bool = False,
 ) -> np.ndarray:
     """Bandpass filter
 
@@ -485,19 +594,23 @@ def filter_bandpass(
     Parameters
     -----------
     x: np.ndarray
-        data array, shape (channels, time)
+        data array, shape (..., time), e.g. (channels, time) or
+        (epochs, channels, time)
     sampling_freq: float
         data sampling rate
     freq_low: float
         frequency to filter from
     freq_high: float
         frequency to filter to
-
+    out: np.ndarray, optional
+        C-contiguous float64 array of the shape of x the result is written to
+    inplace: bool
+        Write the result to x, which must be a C-contiguous float64 array
 
     Returns
     -----------
     np.ndarray
-        filtered data, shape (channels, time)
+        filtered data, shape of x
 
     Warnings
     ---------
@@ -505,22 +618,26 @@ def filter_bandpass(
     before applying notch filter
 
     """
-    chans = x.shape[0]
-    time_points = x.shape[1]
-    _x = x.copy().ravel(order="C").astype(np.float64)
-    c_arr = np.ctypeslib.as_ctypes(_x)
+    chans, time_points = _dims(x)
+    _x = _filter_buffer(x, out, inplace)
     _dll.ba_bci_connect_filter_bandpass(
-        c_arr,
+        _x,
         ctypes.c_size_t(chans),
         ctypes.c_size_t(time_points),
         ctypes.c_double(sampling_freq),
         ctypes.c_double(freq_low),
         ctypes.c_double(freq_high),
     )
-    return np.array(c_arr[: chans * time_points]).reshape((chans, time_points))
+    return _x
 
 
-def filter_highpass(x: np.ndarray, sampling_freq: float, freq: float) -> np.ndarray:
+def filter_highpass(
+    x: np.ndarray,
+    sampling_freq: float,
+    freq: float,
+    out: Optional[np.ndarray] = None,
+    inplace: bool = False,
+) -> np.ndarray:
     """High-pass filter
 
     Butterworth 5th order zero phase high-pass filter
@@ -528,16 +645,21 @@ def filter_highpass(x: np.ndarray, sampling_freq: float, freq: float) -> np.ndar
     Parameters
     -----------
     x: np.ndarray
-        data array, shape (channels, time)
+        data array, shape (..., time), e.g. (channels, time) or
+        (epochs, channels, time)
     sampling_freq: float
         data sampling rate
     freq: float
         edge frequency
+    out: np.ndarray, optional
+        C-contiguous float64 array of the shape of x the result is written to
+    inplace: bool
+        Write the result to x, which must be a C-contiguous float64 array
 
     Returns
     -----------
     np.ndarray
-        filtered data, shape (channels, time)
+        filtered data, shape of x
 
     Warnings
     ---------
@@ -545,21 +667,25 @@ def filter_highpass(x: np.ndarray, sampling_freq: float, freq: float) -> np.ndar
     before applying notch filter
 
     """
-    chans = x.shape[0]
-    time_points = x.shape[1]
-    _x = x.copy().ravel(order="C").astype(np.float64)
-    c_arr = np.ctypeslib.as_ctypes(_x)
+    chans, time_points = _dims(x)
+    _x = _filter_buffer(x, out, inplace)
     _dll.ba_bci_connect_filter_highpass(
-        c_arr,
+        _x,
         ctypes.c_size_t(chans),
         ctypes.c_size_t(time_points),
         ctypes.c_double(sampling_freq),
         ctypes.c_double(freq),
     )
-    return np.array(c_arr[: chans * time_points]).reshape((chans, time_points))
+    return _x
 
 
-def filter_lowpass(x: np.ndarray, sampling_freq: float, freq: float) -> np.ndarray:
+def filter_lowpass(
+    x: np.ndarray,
+    sampling_freq: float,
+    freq: float,
+    out: Optional[np.ndarray] = None,
+    inplace: bool = False,
+) -> np.ndarray:
     """Low-pass filter
 
     Butterworth 5th order zero phase low-pass filter
@@ -567,16 +693,21 @@ def filter_lowpass(x: np.ndarray, sampling_freq: float, freq: float) -> np.ndarr
     Parameters
     -----------
     x: np.ndarray
-        data array, shape (channels, time)
+        data array, shape (..., time), e.g. (channels, time) or
+        (epochs, channels, time)
     sampling_freq: float
         data sampling rate
     freq: float
         edge frequency
+    out: np.ndarray, optional
+        C-contiguous float64 array of the shape of x the result is written to
+    inplace: bool
+        Write the result to x, which must be a C-contiguous float64 array
 
     Returns
     -----------
     np.ndarray
-        filtered data, shape (channels, time)
+        filtered data, shape of x
 
     Warnings
     ---------
@@ -584,18 +715,88 @@ def filter_lowpass(x: np.ndarray, sampling_freq: float, freq: float) -> np.ndarr
     before applying notch filter
 
     """
-    chans = x.shape[0]
-    time_points = x.shape[1]
-    _x = x.copy().ravel(order="C").astype(np.float64)
-    c_arr = np.ctypeslib.as_ctypes(_x)
+    chans, time_points = _dims(x)
+    _x = _filter_buffer(x, out, inplace)
     _dll.ba_bci_connect_filter_lowpass(
-        c_arr,
+        _x,
         ctypes.c_size_t(chans),
         ctypes.c_size_t(time_points),
         ctypes.c_double(sampling_freq),
         ctypes.c_double(freq),
     )
-    return np.array(c_arr[: chans * time_points]).reshape((chans, time_points))
+    return _x
+
+
+def design_filter(
+    sampling_freq: float,
+    btype: str,
+    freqs: typing.Union[float, typing.Sequence[float]],
+    order: int = 4,
+) -> np.ndarray:
+    """Butterworth filter coefficients for `filter_sos`
+
+    Designs are cached (least recently used, see
+    `brainaccess.utils.filters.design_sos`), so designing again with the same
+    parameters is free. The native filters design their coefficients inside
+    the library on every call and cannot use the cache.
+
+    Parameters
+    -----------
+    sampling_freq: float
+        data sampling rate
+    btype: str
+        "lowpass", "highpass", "bandpass" or "bandstop"
+    freqs: float or sequence of float
+        edge frequency, or low and high edges of band filters
+    order: int
+        Butterworth order
+
+    Returns
+    -----------
+    np.ndarray
+        second-order sections, shape (sections, 6)
+
+    """
+    return design_sos(sampling_freq, btype, freqs, order)
+
+
+def filter_sos(
+    x: np.ndarray,
+    sos: np.ndarray,
+    out: Optional[np.ndarray] = None,
+    inplace: bool = False,
+) -> np.ndarray:
+    """Zero phase filter with given coefficients
+
+    Applies second-order sections, e.g. from `design_filter`, forward and
+    backward along the time axis, so only the application is paid for when
+    filtering repeatedly with the same parameters.
+
+    Parameters
+    -----------
+    x: np.ndarray
+        data array, shape (..., time), e.g. (channels, time) or
+        (epochs, channels, time)
+    sos: np.ndarray
+        second-order sections, shape (sections, 6)
+    out: np.ndarray, optional
+        C-contiguous float64 array of the shape of x the result is written to
+    inplace: bool
+        Write the result to x, which must be a C-contiguous float64 array
+
+    Returns
+    -----------
+    np.ndarray
+        filtered data, shape of x
+
+    """
+    _dims(x)
+    dest = _destination(x, out, inplace)
+    result = signal.sosfiltfilt(sos, np.asarray(x, dtype=np.float64), axis=-1)
+    if dest is None:
+        return result
+    np.copyto(dest, result)
+    return dest
 
 
 def fft(x: np.ndarray, sampling_freq: float) -> dict:
@@ -604,7 +805,8 @@ def fft(x: np.ndarray, sampling_freq: float) -> dict:
     Parameters
     -----------
     x: np.ndarray
-        data array, shape (channels, time)
+        data array, shape (..., time), e.g. (channels, time) or
+        (epochs, channels, time)
     sampling_freq: float
         data sampling rate
 
@@ -617,22 +819,14 @@ def fft(x: np.ndarray, sampling_freq: float) -> dict:
         - phase: phases
 
     """
-    chans = x.shape[0]
-    time_points = x.shape[1]
-    _x = x.copy().ravel(order="C").astype(np.float64)
-    c_arr = np.ctypeslib.as_ctypes(_x)
+    chans, time_points = _dims(x)
     n_time_steps = (time_points - (time_points % 2)) // 2 + 1
-    c_result_mag = np.ctypeslib.as_ctypes(np.zeros(chans * n_time_steps))
-    c_result_phase = np.ctypeslib.as_ctypes(np.zeros(chans * n_time_steps))
-    _dll.ba_bci_connect_fft(
-        c_arr, chans, time_points, sampling_freq, c_result_mag, c_result_phase
-    )
+    mags = np.zeros(np.shape(x)[:-1] + (n_time_steps,))
+    phases = np.zeros(np.shape(x)[:-1] + (n_time_steps,))
+    _dll.ba_bci_connect_fft(_input(x), chans, time_points, sampling_freq, mags, phases)
     freqs = np.linspace(0, sampling_freq / 2, n_time_steps)
-    mags = np.array(c_result_mag[: chans * n_time_steps]).reshape((chans, n_time_steps))
-    phases = np.array(c_result_phase[: chans * n_time_steps]).reshape(
-        (chans, n_time_steps)
-    )
-    return {"freq": freqs, "mag": mags * 2, "phase": phases}
+    mags *= 2
+    return {"freq": freqs, "mag": mags, "phase": phases}
 
 
 def cut_into_epochs(
@@ -644,7 +838,8 @@ def cut_into_epochs(
     """Cut data into epochs
 
     Args:
-      data: np.ndarray: (n_channels, n_times)
+      data: np.ndarray: (n_channels, n_times) or (..., n_times), e.g.
+        (n_devices, n_channels, n_times)
       sfreq: float:
         sampling frequency
       epoch_len: float:  (Default value = 1.0)
@@ -653,15 +848,15 @@ def cut_into_epochs(
         ratio of overlap between epochs
 
     Returns:
-      output: np.ndarray: (n_epochs, n_channels, n_times)
+      output: np.ndarray: (n_epochs, n_channels, n_times), or
+        (n_epochs, ..., n_times) for data with more leading axes
 
     """
     if data.ndim == 1:
         data = data.reshape((1, -1))
-    if data.ndim > 2:
-        raise BrainAccessException("data must be 1D or 2D")
-    n_channels = data.shape[0]
-    n_times = data.shape[1]
+    leading = data.shape[:-1]
+    n_channels, n_times = _dims(data)
+    data = data.reshape((n_channels, n_times))
     if epoch_length is None:
         _epoch_length = n_times / sfreq
         if _epoch_length > 15.0:
@@ -683,7 +878,7 @@ def cut_into_epochs(
         ]
         if dat.shape[1] == _epoch_length:
             epochs[idx] = dat
-    return epochs
+    return epochs.reshape((n_epochs,) + leading + (_epoch_length,))
 
 
 def get_bands(
@@ -719,20 +914,14 @@ def get_bands(
     """
     # cut into epochs to average out noise
     data = cut_into_epochs(data, sfreq, epoch_length=epoch_length, overlap=overlap)
-    # calculate power in each frequency band
-    _bands = []
-    for epoch in data:
-        epoch = demean(epoch)
-        _bands.append(
-            get_pow_freq_bands(
-                epoch,
-                sfreq,
-                freq_bands=np.array([0.5, 4.0, 8.0, 13.0, 30.0, 100.0]),
-                normalize=normalize,
-            )
-        )
+    # power in each frequency band of all epochs at once
+    bands = get_pow_freq_bands(
+        demean(data),
+        sfreq,
+        freq_bands=np.array([0.5, 4.0, 8.0, 13.0, 30.0, 100.0]),
+        normalize=normalize,
+    )
     # average over epochs
-    bands = np.array(_bands)
     bands = np.mean(bands, axis=0)
     return {
         "delta": list(bands[:, 0]),
@@ -752,7 +941,8 @@ def get_pow_freq_bands(
     """Power Spectrum (computed by frequency bands).
 
     Args:
-      data: np.ndarray: (n_channels, n_times)
+      data: np.ndarray: (..., n_times), e.g. (n_channels, n_times) or
+        (n_epochs, n_channels, n_times)
       sfreq: float:
         sampling frequency
       freq_bands: np.ndarray:  (Default value = np.array([0.5, 4.0, 8.0, 13.0, 30.0,
@@ -762,10 +952,9 @@ def get_pow_freq_bands(
         normalize power in each frequency band by total power
 
     Returns:
-      output: ndarray, shape (n_channels, (len(freq_bands)- 1),)
+      output: ndarray, shape (..., (len(freq_bands)- 1),)
 
     """
-    n_channels = data.shape[0]
     fb = np.zeros((len(freq_bands) - 1, 2))
     for idx, x in enumerate(freq_bands[:-1]):
         fb[idx, 0] = x
@@ -776,11 +965,10 @@ def get_pow_freq_bands(
     freqs = fft_data["freq"]
     psd = fft_data["mag"] ** 2
     # power in each frequency band
-    pow_freq_bands = np.empty((n_channels, n_freq_bands))
+    pow_freq_bands = np.empty(psd.shape[:-1] + (n_freq_bands,))
     for j in range(n_freq_bands):
         mask = np.logical_and(freqs >= fb[j, 0], freqs <= fb[j, 1])
-        psd_band = psd[:, mask]
-        pow_freq_bands[:, j] = np.sum(psd_band, axis=-1)
+        pow_freq_bands[..., j] = np.sum(psd[..., mask], axis=-1)
     if normalize:
-        pow_freq_bands = np.divide(pow_freq_bands, np.sum(psd, axis=-1)[:, None])
+        pow_freq_bands = np.divide(pow_freq_bands, np.sum(psd, axis=-1)[..., None])
     return pow_freq_bands
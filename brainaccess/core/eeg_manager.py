@@ -9,6 +9,7 @@ import platform
 from typing import Callable, Union, Optional, Any
 
 from brainaccess.utils.exceptions import _callback, _handle_error, BrainAccessException
+from brainaccess.utils.dispatch import ChunkDispatcher, make_chunk_callback
 from brainaccess.core import _dll
 from brainaccess.core.battery_info import BatteryInfo
 from brainaccess.core.device_info import DeviceInfo
@@ -180,101 +181,96 @@ _types_map = [
 ]
 
 
+def _get_manager(data: Any) -> Optional["EEGManager"]:
+    """Looks up the manager registered for a native handle.
+
+    The global lock only guards the dictionary read, callbacks then run
+    under the per-manager locks so managers do not serialize each other.
+    """
+    with _managers_mtx:
+        return _managers.get(data)
+
+
 @ctypes.CFUNCTYPE(None, ctypes.c_void_p)
 def _callback_stop_stream(data: ctypes.c_void_p) -> None:
-    with _managers_mtx:
-        mgr = _managers.get(data)
-        if mgr is not None:
-            with mgr._callback_stop_stream_mix:
-                cbk = mgr._callback_stop_stream
-                if cbk is not None:
-                    cbk()
+    mgr = _get_manager(data)
+    if mgr is not None:
+        with mgr._callback_stop_stream_mtx:
+            cbk = mgr._callback_stop_stream
+            if cbk is not None:
+                cbk()
 
 
 @ctypes.CFUNCTYPE(None, ctypes.c_void_p, ctypes.c_size_t, ctypes.c_size_t)
 def _callback_ota_update(data: ctypes.c_void_p, progress: int, total: int) -> None:
-    with _managers_mtx:
-        mgr = _managers.get(data)
-        if mgr is not None:
-            with mgr._callback_ota_update_mtx:
-                cbk = mgr._callback_ota_update
-                if cbk is not None:
-                    cbk(progress, total)
+    mgr = _get_manager(data)
+    if mgr is not None:
+        with mgr._callback_ota_update_mtx:
+            cbk = mgr._callback_ota_update
+            if cbk is not None:
+                cbk(progress, total)
 
 
 @ctypes.CFUNCTYPE(None, ctypes.c_void_p)
 def _callback_start_stream(data: ctypes.c_void_p) -> None:
-    with _managers_mtx:
-        mgr = _managers.get(data)
-        if mgr is not None:
-            with mgr._callback_start_stream_mix:
-                cbk = mgr._callback_start_stream
-                if cbk is not None:
-                    cbk()
+    mgr = _get_manager(data)
+    if mgr is not None:
+        with mgr._callback_start_stream_mtx:
+            cbk = mgr._callback_start_stream
+            if cbk is not None:
+                cbk()
 
 
 @ctypes.CFUNCTYPE(
     None, ctypes.POINTER(ctypes.c_void_p), ctypes.c_size_t, ctypes.c_void_p
 )
 def _callback_chunk(chunk_data: list, chunk_size: int, data: Any) -> None:
-    with _managers_mtx:
-        mgr = _managers.get(data)
-        if mgr is not None:
-            with mgr._callback_chunk_mtx:
-                cbk = mgr._callback_chunk
-                if cbk is not None:
-                    # Get channel sizes and type information
-                    types_ptr = ctypes.POINTER(ctypes.c_uint8)()
-                    types_size = ctypes.c_size_t()
-                    _dll.ba_eeg_manager_get_stream_channel_data_types(
-                        data, ctypes.byref(types_ptr), ctypes.byref(types_size)
-                    )
-                    types = [_types_map[types_ptr[i]] for i in range(types_size.value)]
-
-                    chunk_arrays = []
-                    for i, ctype in enumerate(types):
-                        data_pointer = ctypes.cast(
-                            chunk_data[i], ctypes.POINTER(ctype * chunk_size)
-                        )
-                        np_array = np.ctypeslib.as_array(
-                            data_pointer.contents, shape=(chunk_size,)
-                        )
-                        chunk_arrays.append(np_array)
-
-                    cbk(chunk_arrays, chunk_size)
+    mgr = _get_manager(data)
+    if mgr is not None:
+        with mgr._callback_chunk_mtx:
+            cbk = mgr._callback_chunk
+        if cbk is None:
+            return
+        # the callback may wait for a full queue, it runs without the
+        # callback lock so the worker can still reach the manager
+        with mgr._chunk_delivery_mtx:
+            chunk_arrays = [
+                np.frombuffer(array_type.from_address(chunk_data[i]), dtype)
+                for i, (array_type, dtype) in enumerate(
+                    mgr._get_chunk_layout(chunk_size)
+                )
+            ]
+            cbk(chunk_arrays, chunk_size)
 
 
 @ctypes.CFUNCTYPE(None, ctypes.POINTER(BatteryInfo), ctypes.c_void_p)
 def _callback_battery(b_info, data) -> None:
-    with _managers_mtx:
-        mgr = _managers.get(data)
-        if mgr is not None:
-            with mgr._callback_battery_mtx:
-                cbk = mgr._callback_battery
-                if cbk is not None:
-                    cbk(copy.copy(b_info[0]))
+    mgr = _get_manager(data)
+    if mgr is not None:
+        with mgr._callback_battery_mtx:
+            cbk = mgr._callback_battery
+            if cbk is not None:
+                cbk(copy.copy(b_info[0]))
 
 
 @ctypes.CFUNCTYPE(None, ctypes.c_void_p)
 def _callback_load_config(data) -> None:
-    with _managers_mtx:
-        mgr = _managers.get(data)
-        if mgr is not None:
-            with mgr._callback_load_config_mtx:
-                cbk = mgr._callback_load_config
-                if cbk is not None:
-                    cbk()
+    mgr = _get_manager(data)
+    if mgr is not None:
+        with mgr._callback_load_config_mtx:
+            cbk = mgr._callback_load_config
+            if cbk is not None:
+                cbk()
 
 
 @ctypes.CFUNCTYPE(None, ctypes.c_void_p)
 def _callback_disconnect(data) -> None:
-    with _managers_mtx:
-        mgr = _managers.get(data)
-        if mgr is not None:
-            with mgr._callback_disconnect_mtx:
-                cbk = mgr._callback_disconnect
-                if cbk is not None:
-                    cbk()
+    mgr = _get_manager(data)
+    if mgr is not None:
+        with mgr._callback_disconnect_mtx:
+            cbk = mgr._callback_disconnect
+            if cbk is not None:
+                cbk()
 
 
 class EEGManager:
@@ -296,12 +292,23 @@ class EEGManager:
         """
         self.conenction_success: int = 0
         self._callback_chunk_mtx = threading.Lock()
+        # held while a chunk is handed to the callback
+        self._chunk_delivery_mtx = threading.Lock()
         self._callback_battery_mtx = threading.Lock()
         self._callback_disconnect_mtx = threading.Lock()
         self._callback_start_stream_mtx = threading.Lock()
         self._callback_stop_stream_mtx = threading.Lock()
         self._callback_load_config_mtx = threading.Lock()
         self._callback_ota_update_mtx = threading.Lock()
+        self._callback_chunk: Optional[Callable] = None
+        self._callback_battery: Optional[Callable] = None
+        self._callback_start_stream: Optional[Callable] = None
+        self._callback_stop_stream: Optional[Callable] = None
+        self._callback_load_config: Optional[Callable] = None
+        self._callback_ota_update: Optional[Callable] = None
+        self._chunk_dispatcher: Optional[ChunkDispatcher] = None
+        # (chunk_size, [(ctypes array type, numpy dtype) per channel])
+        self._chunk_layout: Optional[tuple] = None
         self._manager = _dll.ba_eeg_manager_new()
         with _managers_mtx:
             _managers[self._manager] = self
@@ -328,9 +335,27 @@ class EEGManager:
         This method must be called exactly once.
         """
         self.disconnect()  # prevent callback deadlock by disconnecting first.
+        with self._callback_chunk_mtx:
+            dispatcher, self._chunk_dispatcher = self._chunk_dispatcher, None
+        if dispatcher is not None:
+            # releases a chunk callback waiting for queue space
+            dispatcher.stop()
         with _managers_mtx:
-            _dll.ba_eeg_manager_free(self._manager)
             del _managers[self._manager]
+        # wait for callbacks that looked the manager up before removal
+        for mtx in (
+            self._callback_chunk_mtx,
+            self._chunk_delivery_mtx,
+            self._callback_battery_mtx,
+            self._callback_disconnect_mtx,
+            self._callback_start_stream_mtx,
+            self._callback_stop_stream_mtx,
+            self._callback_load_config_mtx,
+            self._callback_ota_update_mtx,
+        ):
+            with mtx:
+                pass
+        _dll.ba_eeg_manager_free(self._manager)
 
     def disconnect(self) -> None:
         """Disconnects from the device, if a connection is active."""
@@ -409,6 +434,7 @@ class EEGManager:
             with self._callback_start_stream_mtx:
                 self._callback_start_stream = lambda: None
 
+        self._chunk_layout = None
         if self.is_streaming():
             raise BrainAccessException("Stream already running")
         return _handle_error(
@@ -476,6 +502,7 @@ class EEGManager:
             with self._callback_load_config_mtx:
                 self._callback_load_config = lambda: None
 
+        self._chunk_layout = None
         _handle_error(
             _dll.ba_eeg_manager_load_config(
                 self._manager, _callback_load_config, self._manager
@@ -515,6 +542,7 @@ class EEGManager:
         """
         if self.is_streaming():
             raise BrainAccessException("Cannot change channel state while streaming")
+        self._chunk_layout = None
         _dll.ba_eeg_manager_set_channel_enabled(
             self._manager, ctypes.c_uint16(channel), ctypes.c_bool(state)
         )
@@ -700,7 +728,15 @@ class EEGManager:
         rate_value = StreamRate(_dll.ba_eeg_manager_get_sample_frequency(self._manager))
         return rate_value.to_hz
 
-    def set_callback_chunk(self, f: Callable) -> None:
+    def set_callback_chunk(
+        self,
+        f: Callable,
+        threaded: bool = False,
+        queue_size: int = 64,
+        policy: str = "drop_oldest",
+        contiguous: bool = False,
+        dtype: Any = np.float64,
+    ) -> None:
         """Sets a callback function to be executed when a new data chunk is available.
 
         Warning
@@ -709,18 +745,109 @@ class EEGManager:
         shared data is properly synchronized and that the callback executes
         quickly to avoid blocking communication with the device.
 
+        With `threaded=True` the device thread only copies the chunk into a
+        bounded queue and the callback runs on a dedicated worker thread, so
+        a slow callback no longer delays data delivery. Queue counters are
+        available from `get_chunk_queue_stats`.
+
+        Notes
+        -----
+        Validity of the data passed to the callback:
+
+        - Default: the arrays are views of native memory and are only valid
+          until the callback returns.
+        - `threaded=True`: the arrays are copies owned by the callback.
+        - `contiguous=True`: the block is taken from a pool and is reused
+          for a later chunk once the callback returns. Copy it to keep it.
+
         Parameters
         ----------
         f : callable
             The function to be called. It should accept a list of NumPy arrays
             (one for each channel) and the chunk size as arguments.
             Set to `None` to disable the callback.
+        threaded : bool, optional
+            Run the callback on a worker thread fed by a queue.
+        queue_size : int, optional
+            Maximum number of queued chunks in threaded mode.
+        policy : str, optional
+            What to do when the queue is full in threaded mode:
+            "drop_oldest", "drop_newest" or "block" (wait for the worker).
+        contiguous : bool, optional
+            Pass one array of shape (channels, chunk_size) instead of a list
+            of per-channel arrays.
+        dtype : numpy dtype, optional
+            Data type of the contiguous block, by default float64.
+
+        Raises
+        ------
+        BrainAccessException
+            If the queue policy is unknown.
         """
+        if f is None:
+            callback, dispatcher = None, None
+        else:
+            callback, dispatcher = make_chunk_callback(
+                f, threaded, queue_size, policy, contiguous, dtype
+            )
         with self._callback_chunk_mtx:
-            self._callback_chunk = f
+            previous = self._chunk_dispatcher
+            self._callback_chunk, self._chunk_dispatcher = callback, dispatcher
             _dll.ba_eeg_manager_set_callback_chunk(
                 self._manager, _callback_chunk if f is not None else None, self._manager
             )
+        if previous is not None:
+            # stopped without the lock, its worker may be calling into the
+            # manager; a chunk still passed to it is dropped
+            previous.stop()
+
+    def _get_chunk_layout(self, chunk_size: int) -> list:
+        """Returns the per-channel array types of the current stream.
+
+        The channel data types only change when the device is configured,
+        so they are queried once per stream and reused for every chunk of
+        the same size.
+
+        Parameters
+        ----------
+        chunk_size : int
+            Number of samples in the chunk.
+
+        Returns
+        -------
+        list
+            (ctypes array type, NumPy dtype) pair for each channel.
+        """
+        layout = self._chunk_layout
+        if layout is None or layout[0] != chunk_size:
+            types_ptr = ctypes.POINTER(ctypes.c_uint8)()
+            types_size = ctypes.c_size_t()
+            _dll.ba_eeg_manager_get_stream_channel_data_types(
+                self._manager, ctypes.byref(types_ptr), ctypes.byref(types_size)
+            )
+            types = [_types_map[types_ptr[i]] for i in range(types_size.value)]
+            layout = (
+                chunk_size,
+                [(ctype * chunk_size, np.dtype(ctype)) for ctype in types],
+            )
+            self._chunk_layout = layout
+        return layout[1]
+
+    def get_chunk_queue_stats(self) -> dict:
+        """Returns counters of the threaded chunk queue.
+
+        Returns
+        -------
+        dict
+            Queue depth, maximum depth seen, queue size and the number of
+            delivered, dropped and failed chunks. Empty if the chunk callback
+            is not threaded.
+        """
+        # no callback lock, the dispatcher may be queried from its own worker
+        dispatcher = self._chunk_dispatcher
+        if dispatcher is None:
+            return {}
+        return dispatcher.stats()
 
     def set_callback_battery(self, callback: Union[Callable, None] = None) -> None:
         """Sets a callback function to be executed when the battery status is updated.
@@ -915,6 +1042,7 @@ class EEGManager:
                 raise BrainAccessException(
                     f"{device_model.name} supports sample rates up to 500Hz."
                 )
+        self._chunk_layout = None
         return _handle_error(
             _dll.ba_eeg_manager_set_data_stream_rate(
                 self._manager, ctypes.c_uint8(_sample_rate.value)
@@ -1,4 +1,6 @@
 import typing
+import copy
+import functools
 import time
 import threading
 import numpy as np
@@ -12,8 +14,82 @@ from brainaccess.core.eeg_manager import EEGManager
 from brainaccess.core.impedance_measurement_mode import ImpedanceMeasurementMode
 from brainaccess.core.device_features import DeviceFeatures
 from brainaccess.utils.exceptions import BrainAccessException
+from brainaccess.utils.buffers import RingBuffer, GrowableBuffer, MemmapBuffer
+from brainaccess.utils.annotations import AnnotationIndex
+from brainaccess.utils.gaps import GapIndex
+from brainaccess.utils.clock import SampleClock
+from brainaccess.utils.filters import Decimator, FilterBank
+from brainaccess.utils.aio import ChunkStream, WindowStream
+from brainaccess.utils.scheduler import WindowScheduler
 
 
+class EEGWindow(typing.NamedTuple):
+    """Window of samples returned by `EEG.get_window`.
+
+    Attributes
+    ----------
+    data : np.ndarray
+        Samples, shape (channels, samples).
+    sample_numbers : np.ndarray
+        Device sample number of each column, float64 in any storage type.
+    times : np.ndarray
+        Seconds since the first sample of the stream for each column.
+    valid : np.ndarray, optional
+        False at zero-filled samples and at the first sample after lost
+        ones, None unless requested.
+    """
+
+    data: np.ndarray
+    sample_numbers: np.ndarray
+    times: np.ndarray
+    valid: typing.Optional[np.ndarray] = None
+
+
+def _row_selection(rows: typing.Optional[list]) -> typing.Union[slice, list]:
+    """Returns a slice for contiguous ascending rows so indexing gives a view."""
+    if rows is None:
+        return slice(None)
+    if len(rows) > 0 and list(rows) == list(range(rows[0], rows[0] + len(rows))):
+        return slice(rows[0], rows[0] + len(rows))
+    return list(rows)
+
+
+_core_mtx = threading.Lock()
+_core_users = 0
+
+
+def _init_core() -> None:
+    """Initializes the core library for the first EEG object in the process."""
+    global _core_users
+    with _core_mtx:
+        if _core_users == 0:
+            bacore.init()
+        _core_users += 1
+
+
+def _close_core() -> None:
+    """Closes the core library once the last EEG object is closed."""
+    global _core_users
+    with _core_mtx:
+        if _core_users == 0:
+            return
+        _core_users -= 1
+        if _core_users == 0:
+            bacore.close()
+
+
+@functools.lru_cache(maxsize=None)
+def _standard_montage():
+    """Builds the standard 10-05 montage once per process."""
+    return mne.channels.make_standard_montage("standard_1005")
+
+
+def _read_only(x: np.ndarray) -> np.ndarray:
+    """Returns a read-only view of the array."""
+    x = x.view()
+    x.flags.writeable = False
+    return x
+
 
 class EEG:
     """EEG acquisition class.
@@ -23,14 +99,32 @@ class EEG:
     def __init__(
         self,
         mode: str = "accumulate",
+        threaded_ingest: bool = False,
+        spill_path: typing.Optional[str] = None,
+        dtype: typing.Any = np.float64,
     ) -> None:
         """Creates EEG object and initializes device with default parameters.
 
         Parameters
         ------------
         mode: str
-            Data storage modes accumulate (all data is accumulated in array)
-            or roll (only last x seconds preserved)
+            Data storage modes accumulate (all data is accumulated in array),
+            memmap (all data is accumulated in a memory-mapped file, only the
+            last minute is kept in memory) or roll (only last x seconds
+            preserved)
+        threaded_ingest: bool
+            Store chunks on a worker thread fed by a queue instead of the
+            device thread, see `EEGManager.set_callback_chunk`. The queue
+            blocks the device thread when full, so no data is dropped.
+        spill_path: str, optional
+            File used by the memmap mode, a temporary file removed on
+            `close` if None.
+        dtype: numpy dtype
+            Storage data type of the samples, float32 halves the memory and
+            the cost of window copies. Windows keep this type, data is
+            converted to float64 only for MNE. Chunks are processed and
+            sample numbers are stored in float64, so sample numbers stay
+            exact in any storage type.
 
         """
         self.directory = pathlib.Path.cwd()
@@ -40,8 +134,23 @@ class EEG:
         self.eeg_channels: dict = {}
         self.bias_channels: typing.Optional[list] = None
         self.mode: str = mode
+        self.threaded_ingest = threaded_ingest
+        self.spill_path = spill_path
+        self.dtype = np.dtype(dtype)
         self.gain: GainMode = GainMode.X8
-        bacore.init()
+        self.decimation: int = 1
+        self._decimator: typing.Optional[Decimator] = None
+        self.filters: typing.Optional[dict] = None
+        self.filter_bank: typing.Optional[FilterBank] = None
+        self._filter_rows: list = []
+        # set once the chunk layout and ingest state of a stream are known
+        self._ingest_ready = threading.Event()
+        # chunks received before that, stored by _start_acquisition
+        self._early_chunks: list = []
+        self._early_lock = threading.Lock()
+        # replaced, never mutated, so the ingest thread can iterate it
+        self._chunk_listeners: tuple = ()
+        _init_core()
 
     def setup(
         self,
@@ -61,6 +170,11 @@ class EEG:
         bias: typing.Optional[list] = None,
         gain: int = 8,
         sfreq: int = 250,
+        scan: bool = True,
+        streaming: bool = False,
+        channels: typing.Optional[list] = None,
+        decimation: int = 1,
+        filters: typing.Optional[dict] = None,
     ) -> None:
         """Connects to device and sets channels
 
@@ -78,17 +192,50 @@ class EEG:
             A list of channels to use for bias.
         gain: int
             The gain to use for the EEG channels.
+        sfreq: int
+            The sampling frequency.
+        scan: bool
+            Scan for devices before connecting. Disable when the caller
+            already scanned, e.g. when setting up several devices.
+        streaming: bool
+            Also record the STREAMING channel ("Streaming"), which marks
+            samples the device zero-filled after lost BLE data, so they are
+            reported by `get_gaps` and window validity masks.
+        channels: list, optional
+            Names of the cap and accelerometer channels to record, all if
+            None. Other channels are not enabled on the device, so they are
+            neither transmitted nor buffered. The sample counter is always
+            recorded.
+        decimation: int
+            Low-pass filter and keep every n-th sample before buffering, so
+            data is stored at sfreq / decimation. Sample numbers and
+            annotation timestamps then count samples at the reduced rate.
+        filters: dict, optional
+            Keyword arguments of `brainaccess.utils.filters.FilterBank`, e.g.
+            ``{"notch": (50, 2), "bandpass": (1, 40)}``. EEG channels are then
+            also filtered causally chunk by chunk during ingest and stored
+            next to the raw data, read them with ``get_window(filtered=True)``.
 
         Raises
         ------
         BrainAccessException
-            If no devices are found, could not connect to the device, or the stream is incompatible.
+            If no devices are found, could not connect to the device, the stream is
+            incompatible, a selected channel is unknown, decimation is invalid or
+            the filters are invalid.
         """
+        if int(decimation) != decimation or decimation < 1:
+            raise BrainAccessException("Decimation must be a positive integer")
+        self.decimation = int(decimation)
+        self.filters = dict(filters) if filters else None
+        # a previous setup must not leave its bank and rows behind
+        self.filter_bank = None
+        self._filter_rows = []
         self.mgr = mgr
         self.sfreq = sfreq
-        devices = bacore.scan()
-        if len(devices) == 0:
-            self._error("No devices found")
+        if scan:
+            devices = bacore.scan()
+            if len(devices) == 0:
+                self._error("No devices found")
         self.zeros_at_start = zeros_at_start
         if bias:
             self.bias_channels = bias
@@ -134,22 +281,48 @@ class EEG:
                 self.channels_indexes[eeg_channel.ACCELEROMETER + 0] = 0
                 self.channels_indexes[eeg_channel.ACCELEROMETER + 1] = 0
                 self.channels_indexes[eeg_channel.ACCELEROMETER + 2] = 0
+        if channels is not None:
+            unknown = set(channels) - set(self.eeg_channels.values())
+            if unknown:
+                raise BrainAccessException(f"Unknown channels {sorted(unknown)}")
+            for key, name in list(self.eeg_channels.items()):
+                if name not in channels:
+                    del self.eeg_channels[key]
+                    del self.channels_type[key]
+                    del self.channels_indexes[key]
         self.eeg_channels[eeg_channel.SAMPLE_NUMBER] = "Sample"
         self.channels_type[eeg_channel.SAMPLE_NUMBER] = "Sample"
         self.channels_indexes[eeg_channel.SAMPLE_NUMBER] = 0
+        if streaming:
+            self.eeg_channels[eeg_channel.STREAMING] = "Streaming"
+            self.channels_type[eeg_channel.STREAMING] = "Streaming"
+            self.channels_indexes[eeg_channel.STREAMING] = 0
         eeg_info = self._create_info()
         self.info = eeg_info
         self.chans = len(self.info.ch_names)
         if self.mode == "accumulate":
             self.lock = threading.Lock()
-            self.data: typing.Union[EEGData, EEGData_roll] = EEGData(
-                eeg_info, lock=self.lock, zeros_at_start=zeros_at_start
+            self.data: typing.Union[EEGData, EEGData_mmap, EEGData_roll] = EEGData(
+                eeg_info, lock=self.lock, zeros_at_start=zeros_at_start, dtype=self.dtype
+            )
+        elif self.mode == "memmap":
+            self.lock = threading.Lock()
+            self.data = EEGData_mmap(
+                eeg_info,
+                lock=self.lock,
+                zeros_at_start=zeros_at_start,
+                path=self.spill_path,
+                dtype=self.dtype,
             )
         else:
             self.lock = threading.Lock()
             self.data = EEGData_roll(
-                eeg_info, lock=self.lock, zeros_at_start=zeros_at_start
+                eeg_info, lock=self.lock, zeros_at_start=zeros_at_start, dtype=self.dtype
             )
+        if self.filters:
+            # designed here so invalid filters fail before streaming starts
+            self.filter_bank = FilterBank(eeg_info["sfreq"], **self.filters)
+            self.data.enable_filtered()
 
     def _set_channels(self):
         """Set the channels to be enabled."""
@@ -172,7 +345,9 @@ class EEG:
 
     def close(self):
         """Close device connection."""
-        bacore.close()
+        if hasattr(self, "data"):
+            self.data.close()
+        _close_core()
 
     def _start_acquisition(self):
         """Starts streaming and collecting data"""
@@ -182,18 +357,55 @@ class EEG:
         for idx, value in enumerate(list(self.eeg_channels.keys())):
             if self.channels_type[value] == "EEG":
                 self.mgr.set_channel_gain(value, self.gain)
-        if self.mode == "accumulate":
-            self.mgr.set_callback_chunk(self._acq)
-        else:
-            self.mgr.set_callback_chunk(self._acq_roll)
+        # chunks stay float64 until stored, sample numbers must be exact
+        # for gap detection and decimation
+        self.mgr.set_callback_chunk(
+            self._acq,
+            threaded=self.threaded_ingest,
+            policy="block",
+            contiguous=True,
+        )
         self.mgr.set_sample_rate(self.sfreq)
         self.mgr.load_config()
+        self._ingest_ready.clear()
+        self._early_chunks = []
         try:
             self.mgr.start_stream()
         except Exception:
             raise BrainAccessException("Could not start stream")
+        # chunk rows are only known once streaming, _acq keeps the chunks
+        # arriving until the state below is set
         for key in self.channels_indexes.keys():
             self.channels_indexes[key] = self.mgr.get_channel_index(key)
+        sample_index = self.channels_indexes[eeg_channel.SAMPLE_NUMBER]
+        streaming_index = self.channels_indexes.get(eeg_channel.STREAMING)
+        decimator = None
+        if self.decimation > 1:
+            pick = [sample_index]
+            if streaming_index is not None:
+                pick.append(streaming_index)
+            decimator = Decimator(self.decimation, sample_index, pick_rows=pick)
+        filter_rows = [
+            self.channels_indexes[key]
+            for key, kind in self.channels_type.items()
+            if kind == "EEG"
+        ]
+        with self.lock:
+            self.data.sample_index = sample_index
+            self.data.streaming_index = streaming_index
+            self.data.decimation = self.decimation
+            self._decimator = decimator
+            self._filter_rows = filter_rows
+            if self.filter_bank is not None:
+                self.filter_bank.reset()
+        while True:
+            with self._early_lock:
+                if not self._early_chunks:
+                    self._ingest_ready.set()
+                    break
+                early, self._early_chunks = self._early_chunks, []
+            for chunk in early:
+                self._ingest(chunk, chunk.shape[1])
 
     def start_acquisition(self):
         """Starts streaming and collecting data."""
@@ -209,7 +421,7 @@ class EEG:
 
     def get_annotations(self) -> dict:
         """Returns annotations from the data stream."""
-        self.data.annotations = self.mgr.get_annotations()
+        self.data.update_annotations(self.mgr.get_annotations())
         return self.data.annotations
 
     def annotate(self, msg: str) -> None:
@@ -227,9 +439,11 @@ class EEG:
         tim: typing.Optional[float] = None,
         samples: typing.Optional[int] = None,
         annotations: bool = True,
+        cached: bool = False,
     ) -> mne.io.BaseRaw:
         """Return MNE structure.
         If tim is None, returns all data; otherwise, returns the last `tim` seconds.
+        For periodic analysis prefer `get_window`, which skips MNE construction.
 
         Parameters
         ----------
@@ -239,6 +453,9 @@ class EEG:
             Number of samples.
         annotations: bool
             Whether to include annotations.
+        cached: bool
+            Skip the validation of the info for repeated calls with the same
+            window length. Every call still returns a new object.
 
         Returns
         -------
@@ -251,10 +468,280 @@ class EEG:
         self.data.convert_to_mne(
             tim=tim,
             samples=samples,
+            annotations=annotations,
             channels_indexes=list(self.channels_indexes.values()),
+            cached=cached,
         )
         return self.data.mne_raw
 
+    def get_window(
+        self,
+        seconds: typing.Optional[float] = None,
+        samples: typing.Optional[int] = None,
+        channels: typing.Optional[list] = None,
+        mask: bool = False,
+        filtered: bool = False,
+    ) -> EEGWindow:
+        """Return the newest samples as NumPy arrays without building MNE objects.
+        If seconds and samples are None, returns all stored data.
+
+        Data is a read-only view of the buffer when the storage keeps stored
+        samples unchanged (accumulate mode) and the selected channels are
+        adjacent in the chunk, otherwise it is a copy.
+
+        Parameters
+        ----------
+        seconds: float, optional
+            Window length in seconds.
+        samples: int, optional
+            Window length in samples.
+        channels: list, optional
+            Channel names to include, all channels in MNE order if None.
+        mask: bool
+            Also return which samples are valid, see `get_gaps`.
+        filtered: bool
+            Return EEG channels filtered during ingest, see the `filters`
+            argument of `setup`. Other channels are unchanged.
+
+        Returns
+        -------
+        EEGWindow
+            Data, device sample numbers and times of the window.
+
+        Raises
+        ------
+        BrainAccessException
+            If a channel name is unknown or filtered data is requested
+            without filters.
+        """
+        if seconds:
+            samples = int(seconds * self.data.eeg_info["sfreq"])
+        return self.data.window(
+            samples, self._channel_rows(channels), mask=mask, filtered=filtered
+        )
+
+    def get_window_between(
+        self,
+        t0: float,
+        t1: float,
+        channels: typing.Optional[list] = None,
+        mask: bool = False,
+        filtered: bool = False,
+    ) -> EEGWindow:
+        """Return the samples recorded between two host monotonic times.
+
+        Host times of samples are estimated online from chunk arrival times
+        with drift and jitter correction, see `clock`. Use it to cut the
+        data around host events, e.g. `time.monotonic()` at a user action.
+
+        Parameters
+        ----------
+        t0: float
+            Host monotonic time of the first sample.
+        t1: float
+            Host monotonic time of the last sample.
+        channels: list, optional
+            Channel names to include, all channels in MNE order if None.
+        mask: bool
+            Also return which samples are valid, see `get_gaps`.
+        filtered: bool
+            Return EEG channels filtered during ingest, see `get_window`.
+
+        Returns
+        -------
+        EEGWindow
+            Data, device sample numbers and times of the samples still
+            stored in the range.
+
+        Raises
+        ------
+        BrainAccessException
+            If a channel name is unknown or filtered data is requested
+            without filters.
+        """
+        return self.data.window_between(
+            t0, t1, self._channel_rows(channels), mask=mask, filtered=filtered
+        )
+
+    def stream(
+        self, channels: typing.Optional[list] = None, maxsize: int = 256
+    ) -> ChunkStream:
+        """Iterate over stored chunks on an asyncio event loop.
+
+        Use from a coroutine, ``async for chunk in eeg.stream()``. Chunks
+        are queued from the ingest thread, the oldest are dropped when more
+        than `maxsize` are waiting.
+
+        Parameters
+        ----------
+        channels: list, optional
+            Channel names to include, all channels in MNE order if None.
+        maxsize: int
+            Maximum number of queued chunks.
+
+        Returns
+        -------
+        ChunkStream
+            Async iterator and context manager yielding an `EEGWindow` per
+            chunk.
+        """
+        return ChunkStream(self, channels, maxsize=maxsize)
+
+    def windows(
+        self,
+        length: float,
+        hop: float,
+        channels: typing.Optional[list] = None,
+        mask: bool = False,
+        maxsize: int = 8,
+        filtered: bool = False,
+    ) -> WindowStream:
+        """Iterate over sliding windows on an asyncio event loop.
+
+        Use from a coroutine, ``async for window in eeg.windows(5, 1)``. A
+        window of the newest `length` seconds is taken after every `hop`
+        seconds of new samples, the oldest are dropped when more than
+        `maxsize` are waiting.
+
+        Parameters
+        ----------
+        length: float
+            Window length in seconds.
+        hop: float
+            Seconds of new data between windows.
+        channels: list, optional
+            Channel names to include, all channels in MNE order if None.
+        mask: bool
+            Also return which samples are valid, see `get_gaps`.
+        maxsize: int
+            Maximum number of queued windows.
+        filtered: bool
+            Return EEG channels filtered during ingest, see `get_window`.
+
+        Returns
+        -------
+        WindowStream
+            Async iterator and context manager yielding `EEGWindow` objects.
+        """
+        return WindowStream(
+            self, length, hop, channels, mask=mask, maxsize=maxsize, filtered=filtered
+        )
+
+    def schedule_windows(
+        self,
+        length: int,
+        hop: int,
+        channels: typing.Optional[list] = None,
+        mask: bool = False,
+        filtered: bool = False,
+    ) -> WindowScheduler:
+        """Create a scheduler running analysis callbacks every `hop` samples.
+
+        Replaces polling with `time.sleep` and `get_window`: ticks are
+        counted in stored samples, so windows overlap by exactly
+        `length - hop` samples, and ticks that arrive while the analysis is
+        still running are reported as skipped. Use it as a context manager
+        or call `start` and `stop`::
+
+            with eeg.schedule_windows(length=5 * 250, hop=250) as scheduler:
+                scheduler.add_callback(analyse)
+                ...
+
+        Parameters
+        ----------
+        length: int
+            Window length in samples.
+        hop: int
+            Samples between ticks.
+        channels: list, optional
+            Channel names to include, all channels in MNE order if None.
+        mask: bool
+            Also return which samples are valid, see `get_gaps`.
+        filtered: bool
+            Analyse EEG channels filtered during ingest, see `get_window`.
+
+        Returns
+        -------
+        WindowScheduler
+            Scheduler, not started yet.
+        """
+        return WindowScheduler(self, length, hop, channels, mask=mask, filtered=filtered)
+
+    @property
+    def clock(self) -> SampleClock:
+        """Mapping of device sample numbers to host monotonic time.
+
+        Query it with the lock held or use `get_window_between`.
+        """
+        return self.data.clock
+
+    def get_gaps(self) -> dict:
+        """Returns packet loss counters and gaps of the session.
+
+        Samples are missing when device sample numbers skip and zero-filled
+        when the STREAMING channel, enabled with `setup(streaming=True)`,
+        reads 0.
+
+        Returns
+        -------
+        dict
+            Counters of received, missing and zero-filled samples, and the
+            list of gaps (see `brainaccess.utils.gaps.Gap`).
+        """
+        with self.lock:
+            return {**self.data.gaps.stats(), "list": list(self.data.gaps.gaps)}
+
+    def add_chunk_listener(self, listener: typing.Callable) -> None:
+        """Calls a function with every chunk after it was stored.
+
+        The listener runs on the ingest thread with the same arguments as
+        the chunk callback. It must return quickly and copy the chunk if it
+        keeps it, the chunk buffer is reused afterwards.
+
+        Parameters
+        ----------
+        listener: callable
+            function accepting (chunk, chunk_size), the chunk as stored,
+            i.e. after decimation
+        """
+        self._chunk_listeners = self._chunk_listeners + (listener,)
+
+    def remove_chunk_listener(self, listener: typing.Callable) -> None:
+        """Stops calling a function added with `add_chunk_listener`.
+
+        Parameters
+        ----------
+        listener: callable
+            previously added function
+        """
+        self._chunk_listeners = tuple(
+            x for x in self._chunk_listeners if x != listener
+        )
+
+    def _channel_rows(self, channels: typing.Optional[list] = None) -> list:
+        """Chunk rows of the named channels, all channels in MNE order if None.
+
+        Parameters
+        ----------
+        channels: list, optional
+            channel names
+
+        Raises
+        ------
+        BrainAccessException
+            If a channel name is unknown.
+        """
+        if channels is None:
+            return list(self.channels_indexes.values())
+        names = {
+            self.eeg_channels[key]: value
+            for key, value in self.channels_indexes.items()
+        }
+        try:
+            return [names[name] for name in channels]
+        except KeyError as e:
+            raise BrainAccessException(f"Unknown channel {e}")
+
     def _acq(self, chunk, chunk_size):
         """function to acquire data with callback
         Parameters
@@ -264,10 +751,18 @@ class EEG:
         chunk_size: int
             size of the chunk
         """
-        self.data.data.append(np.array(chunk))
+        if not self._ingest_ready.is_set():
+            with self._early_lock:
+                if not self._ingest_ready.is_set():
+                    # the stream is still starting, keep a copy without
+                    # stalling the delivery thread
+                    self._early_chunks.append(np.array(chunk))
+                    return
+        self._ingest(chunk, chunk_size)
+
+    def _ingest(self, chunk, chunk_size):
+        """Decimates, filters and stores a chunk, then notifies listeners.
 
-    def _acq_roll(self, chunk, chunk_size):
-        """function to acquire fixed size data with callback
         Parameters
         ----------
         chunk
@@ -275,20 +770,44 @@ class EEG:
         chunk_size: int
             size of the chunk
         """
-        self.data.data = np.roll(self.data.data, -chunk_size, axis=1)
-        self.data.data[:, -chunk_size:] = np.array(chunk)
+        if self._decimator is not None:
+            chunk = self._decimator(chunk)
+            chunk_size = chunk.shape[1]
+            if chunk_size == 0:
+                # no sample of the chunk is kept at the reduced rate
+                return
+        with self.lock:
+            # start_acquisition resets the filter bank under the lock
+            filtered = self._filter(chunk)
+            self.data.write(chunk, filtered)
+        for listener in self._chunk_listeners:
+            listener(chunk, chunk_size)
+
+    def _filter(self, chunk) -> typing.Optional[np.ndarray]:
+        """Chunk with the EEG rows filtered by the filter bank, None without filters.
+
+        Parameters
+        ----------
+        chunk
+            data chunk as stored
+        """
+        if self.filter_bank is None:
+            return None
+        filtered = np.array(chunk, dtype=self.dtype)
+        filtered[self._filter_rows] = self.filter_bank(filtered[self._filter_rows])
+        return filtered
 
     def _create_info(self):
         """mne info structure creation"""
         import brainaccess.core.eeg_channel as eeg_channel
 
-        sampling_freq = self.mgr.get_sample_frequency()
+        sampling_freq = self.mgr.get_sample_frequency() / self.decimation
         ch_names = [x for x in self.eeg_channels.values()]
         sample_channels = len(
             [
                 x
                 for x in list(self.eeg_channels.keys())
-                if x == eeg_channel.SAMPLE_NUMBER
+                if x in (eeg_channel.SAMPLE_NUMBER, eeg_channel.STREAMING)
             ]
         )
         digital_channels = len(
@@ -302,7 +821,7 @@ class EEG:
             [
                 x
                 for x in list(self.eeg_channels.keys())
-                if x >= eeg_channel.ACCELEROMETER
+                if eeg_channel.ACCELEROMETER <= x < eeg_channel.STREAMING
             ]
         )
         non_eeg_channels = sample_channels + digital_channels + acc_channels
@@ -311,7 +830,7 @@ class EEG:
         ch_types.extend(["stim"] * digital_channels)
         ch_types.extend(["syst"] * sample_channels)
         eeg_info = mne.create_info(ch_names, ch_types=ch_types, sfreq=sampling_freq)
-        eeg_info.set_montage("standard_1005")
+        eeg_info.set_montage(_standard_montage())
         return eeg_info
 
     def start_impedance_measurement(self):
@@ -326,36 +845,114 @@ class EEG:
         self.mgr.set_impedance_mode(ImpedanceMeasurementMode.OFF)
 
 
-class EEGData_roll:
-    """Data structure to store rolling EEG data buffer"""
-
-    def __init__(self, info, lock, zeros_at_start: int = 1):
-        """Initializes the EEGData_roll object.
+class _EEGDataBase:
+    """Common storage logic of the rolling and accumulating data objects.
 
-        Parameters
-        ----------
-        info : mne.Info
-            The MNE info object.
-        lock : threading.Lock
-            The threading lock.
-        zeros_at_start : int, optional
-            The number of zeros to add at the beginning of the data, by default 1.
+    Subclasses create `self.data`, a buffer exposing `write`, `latest` and
+    `total`, and `self.sample_numbers`, a float64 buffer of the same kind
+    holding the sample number row, with `_new_buffer`. They set
+    `self._offset`, the number of stored positions that precede the first
+    device sample. Sample numbers are read from `self.sample_numbers`, the
+    copy in `self.data` is only exact for float64 storage.
+    """
 
-        Raises
-        ------
-        BrainAccessException
-            If no lock is passed.
-        """
-        if not lock:
-            raise BrainAccessException("No lock passed")
+    def __init__(self, info, lock):
         self.eeg_info: mne.Info = info
         self.mne_raw: mne.io.BaseRaw
         self.chans = len(info.ch_names)
-        self.zeros_at_start = zeros_at_start
-        self.data = np.zeros((self.chans, self.zeros_at_start))
         self.connectivity: list = []
         self.annotations: dict = {}
+        self.annotation_index = AnnotationIndex()
         self.lock = lock
+        self.sample_index: int = 0
+        self.streaming_index: typing.Optional[int] = None
+        # device samples per stored sample
+        self.decimation: int = 1
+        self.gaps = GapIndex()
+        self.clock = SampleClock(info["sfreq"])
+        self.first_sample: typing.Optional[float] = None
+        self.sample_numbers: typing.Any = None
+        self._offset: int = 0
+        # filtered copy of the data, same layout and positions, see enable_filtered
+        self.filtered: typing.Optional[typing.Any] = None
+        # validated RawArray without data, copied by _convert_cached
+        self._cached_raw: typing.Optional[mne.io.RawArray] = None
+        # host monotonic time when the newest sample was stored
+        self.last_write_time: typing.Optional[float] = None
+
+    @property
+    def total(self) -> int:
+        """Number of positions written so far, including the zeros at start."""
+        return self.data.total
+
+    def _new_buffer(self, chans: typing.Optional[int] = None, dtype=None) -> typing.Any:
+        """Creates an empty buffer of the storage mode, with the zeros at start.
+
+        Parameters
+        ----------
+        chans: int, optional
+            number of rows, all chunk rows if None
+        dtype: numpy dtype, optional
+            data type, the storage data type if None
+        """
+        raise NotImplementedError
+
+    def enable_filtered(self) -> None:
+        """Stores a filtered copy of every chunk next to the raw data.
+        Must be called before the first chunk is written.
+        """
+        if self.filtered is None:
+            self.filtered = self._new_buffer()
+
+    def write(self, chunk, filtered=None) -> None:
+        """Stores a device chunk.
+        Must be called with the lock held.
+
+        Parameters
+        ----------
+        chunk
+            data chunk from device, shape (channels, samples)
+        filtered
+            filtered copy of the chunk, stored if `enable_filtered` was
+            called, the raw chunk is stored there if None
+        """
+        sample_numbers = chunk[self.sample_index]
+        if len(sample_numbers) == 0:
+            return
+        if self.first_sample is None:
+            self.first_sample = sample_numbers[0]
+        position = self.data.total
+        self.data.write(chunk)
+        self.sample_numbers.write(sample_numbers[np.newaxis])
+        if self.filtered is not None:
+            self.filtered.write(chunk if filtered is None else filtered)
+        self.last_write_time = time.monotonic()
+        streaming = None
+        if self.streaming_index is not None:
+            streaming = chunk[self.streaming_index]
+        self.gaps.update(sample_numbers, streaming, position)
+        self.clock.update(sample_numbers, position, self.last_write_time)
+        # positions a ring buffer overwrote no longer need host times
+        self.clock.trim(self.data.total - len(self.data))
+
+    def update_annotations(self, annotations: dict) -> None:
+        """Stores annotations returned by the device.
+
+        Parameters
+        ----------
+        annotations: dict
+            dictionary with "annotations" and "timestamps" lists, timestamps
+            in device sample numbers
+        """
+        if self.decimation > 1:
+            annotations = {
+                **annotations,
+                "timestamps": [
+                    x // self.decimation for x in annotations.get("timestamps", [])
+                ],
+            }
+        self.annotations = annotations
+        self.annotation_index.update(annotations)
 
     def save(self, fname: str):
         """Saves the raw data to a file.
@@ -367,6 +964,9 @@ class EEGData_roll:
         with self.lock:
             self.mne_raw.save(fname=fname, verbose=False, overwrite=True, fmt="double")
 
+    def close(self) -> None:
+        """Releases the storage, nothing to do for in-memory buffers."""
+
     def load(self, fname: str):
         """Loads raw data from a file.
 
@@ -377,64 +977,200 @@ class EEGData_roll:
         """
         self.mne_raw = mne.io.read_raw(fname, verbose=False)
 
+    def window(
+        self,
+        samples: typing.Optional[int] = None,
+        rows: typing.Optional[list] = None,
+        until: typing.Optional[float] = None,
+        mask: bool = False,
+        filtered: bool = False,
+    ) -> EEGWindow:
+        """Returns the newest samples with their sample numbers and times.
+
+        Parameters
+        ----------
+        samples: int, optional
+            number of samples till the end, all stored data if None
+        rows: list, optional
+            chunk rows to include, all rows if None
+        until: float, optional
+            host monotonic time of the last sample to include, the newest
+            samples after it are left out, see `SampleClock`
+        mask: bool
+            also return the validity of each sample
+        filtered: bool
+            read the filtered copy, see `enable_filtered`
+        """
+        with self.lock:
+            skip = 0
+            if until is not None:
+                skip = max(0, self.data.total - self.clock.position(until, after=True))
+            return self._window(samples, rows, skip, mask, filtered)
+
+    def window_between(
+        self,
+        t0: float,
+        t1: float,
+        rows: typing.Optional[list] = None,
+        mask: bool = False,
+        filtered: bool = False,
+    ) -> EEGWindow:
+        """Returns the samples recorded between two host times.
+
+        Parameters
+        ----------
+        t0: float
+            host monotonic time of the first sample, included
+        t1: float
+            host monotonic time of the last sample, included
+        rows: list, optional
+            chunk rows to include, all rows if None
+        mask: bool
+            also return the validity of each sample
+        filtered: bool
+            read the filtered copy, see `enable_filtered`
+        """
+        with self.lock:
+            start, stop = self.clock.positions(t0, t1)
+            stop = min(stop, self.data.total)
+            return self._window(
+                max(stop - start, 0), rows, self.data.total - stop, mask, filtered
+            )
+
+    def window_at(
+        self,
+        stop: int,
+        samples: typing.Optional[int] = None,
+        rows: typing.Optional[list] = None,
+        mask: bool = False,
+        filtered: bool = False,
+    ) -> EEGWindow:
+        """Returns the samples ending at a buffer position.
+
+        Parameters
+        ----------
+        stop: int
+            buffer position after the last sample, see `total`
+        samples: int, optional
+            number of samples till the stop, all stored data if None
+        rows: list, optional
+            chunk rows to include, all rows if None
+        mask: bool
+            also return the validity of each sample
+        filtered: bool
+            read the filtered copy, see `enable_filtered`
+        """
+        with self.lock:
+            return self._window(
+                samples, rows, max(self.data.total - stop, 0), mask, filtered
+            )
+
+    def _window(
+        self,
+        samples: typing.Optional[int],
+        rows: typing.Optional[list],
+        skip: int,
+        mask: bool,
+        filtered: bool = False,
+    ) -> EEGWindow:
+        """Builds a window ending `skip` samples before the newest one.
+        Must be called with the lock held.
+        """
+        selection = _row_selection(rows)
+        older, newer = self.data.latest_views(samples, skip)
+        numbers_older, numbers_newer = self.sample_numbers.latest_views(samples, skip)
+        if filtered:
+            if self.filtered is None:
+                raise BrainAccessException("No filters set, see EEG.setup")
+            # same positions as the raw buffer and the sample numbers
+            data_older, data_newer = self.filtered.latest_views(samples, skip)
+        else:
+            data_older, data_newer = older, newer
+        valid = None
+        if mask:
+            stop = self.data.total - min(skip, len(self.data))
+            valid = self.gaps.mask(stop - older.shape[1] - newer.shape[1], stop)
+        if newer.shape[1] == 0 and self.data.stable_views:
+            data = data_older[selection]
+            sample_numbers = _read_only(numbers_older[0])
+            if isinstance(selection, slice):
+                data = _read_only(data)
+        else:
+            data = np.concatenate((data_older[selection], data_newer[selection]), axis=1)
+            sample_numbers = np.concatenate((numbers_older[0], numbers_newer[0]))
+        if self.first_sample is None:
+            times = np.zeros(sample_numbers.shape)
+        else:
+            times = (sample_numbers - self.first_sample) / self.eeg_info["sfreq"]
+        return EEGWindow(data, sample_numbers, times, valid)
+
+    def _window_annotations(self, sample_numbers: np.ndarray, stop: int) -> mne.Annotations:
+        """Annotations inside a window of stored positions.
+
+        Annotations are placed at the first stored sample at or after their
+        sample number, looked up in the stored sample numbers, so lost
+        samples before the window do not shift them.
+
+        Parameters
+        ----------
+        sample_numbers: np.ndarray
+            stored sample numbers of the window
+        stop: int
+            position after the last sample of the window
+        """
+        onset: typing.Any = []
+        description: list = []
+        # skip the zeros stored before the first device sample
+        prefix = min(max(self._offset - (stop - len(sample_numbers)), 0), len(sample_numbers))
+        numbers = sample_numbers[prefix:]
+        if len(numbers):
+            timestamps, description = self.annotation_index.between(
+                numbers[0], numbers[-1] + 1
+            )
+            positions = prefix + np.searchsorted(numbers, timestamps)
+            onset = positions / self.eeg_info["sfreq"]
+        duration = np.repeat(0, len(onset))
+        return mne.Annotations(onset, duration, description)
+
     def convert_to_mne(
         self,
         tim: typing.Optional[float] = None,
         samples: typing.Optional[int] = None,
         annotations: bool = True,
         channels_indexes: typing.Optional[list] = None,
+        cached: bool = False,
     ):
         """Convert arrays to MNE.
-        If tim None returns all data from acquisition start.
+        If tim None returns all stored data.
         Otherwise last tim seconds
 
         Parameters
         ------------
         tim: float, default value = None
-            time in seconds or samples to cut
+            time in seconds till the end to include in the output
         samples: int, default value = None
-            samples or time to cut
+            time in samples till the end to include in the output
         annotations: bool, default value = True
             should annotations be included
         channels_indexes: list, optional
             A list of channel indexes to include.
+        cached: bool, default value = False
+            Refresh the data of a previously created RawArray in place
+            instead of building a new one, see `_convert_cached`.
         """
+        if tim:
+            # convert tim to samples
+            samples = int(tim * self.eeg_info["sfreq"])
+        if cached:
+            self._convert_cached(samples or None, annotations, channels_indexes)
+            return
         with self.lock:
-            length = len(self.data)
-        if length > 0:
-            if annotations:
-                timestamp_correction = np.block(self.data)[0][0]
-                onset = []
-                description = []
-                for idx, annotation in enumerate(self.annotations["annotations"]):
-                    description.append(annotation)
-                    timestamp = self.annotations["timestamps"][idx]
-                    onset.append(
-                        (timestamp + self.zeros_at_start - timestamp_correction)
-                        / self.eeg_info["sfreq"]
-                    )
-                duration = np.repeat(0, len(onset))
-            if tim:
-                # convert tim to samples
-                tim = int(tim * self.eeg_info["sfreq"])
-                with self.lock:
-                    data = np.array(self.data)  # .reshape(self.chans, -1)
-                    data = data[:, -tim:]
-                # fix annotations
-                if annotations:
-                    onset = [x - tim for x in onset]
-                    duration = np.repeat(0, len(onset))
-            elif samples:
-                with self.lock:
-                    data = np.array(self.data)  # .reshape(self.chans, -1)
-                    data = data[:, -samples:]
-                # fix annotations
-                if annotations:
-                    onset = [x - samples for x in onset]
-                    duration = np.repeat(0, len(onset))
-            else:
-                with self.lock:
-                    data = np.array(self.data)  # .reshape(self.chans, -1)
+            # MNE stores float64, convert while copying
+            data = self.data.latest(samples or None, dtype=np.float64)
+            sample_numbers = self.sample_numbers.latest(samples or None)[0]
+            stop = self.data.total
+        if data.shape[1] > 0:
+            data[self.sample_index] = sample_numbers
             # select right order channels
             if channels_indexes:
                 data = data[channels_indexes]
@@ -444,16 +1180,115 @@ class EEGData_roll:
                 verbose=False,
             )
             if annotations:
-                annot = mne.Annotations(onset, duration, description)
+                annot = self._window_annotations(sample_numbers, stop)
                 self.mne_raw.set_annotations(annot, verbose=False)
         else:
             print("No data to convert to MNE structure")
 
+    def _convert_cached(
+        self,
+        samples: typing.Optional[int],
+        annotations: bool,
+        channels_indexes: typing.Optional[list],
+    ):
+        """Build a RawArray of the newest samples from a cached template.
+
+        Building a RawArray validates the info, which costs more than
+        copying a window. The template, a validated RawArray without data,
+        is only created on the first call or when the window length changes.
+        Every call returns a copy of it, with its own info and a new data
+        array filled straight from the buffer, so returned objects stay
+        valid and changes a caller makes to them do not reach later windows.
+
+        Parameters
+        ----------
+        samples: int, optional
+            number of samples till the end, all stored data if None
+        annotations: bool
+            should annotations be included
+        channels_indexes: list, optional
+            A list of channel indexes to include.
+        """
+        rows = channels_indexes or list(range(self.chans))
+        with self.lock:
+            older, newer = self.data.latest_views(samples)
+            split = older.shape[1]
+            length = split + newer.shape[1]
+            if length == 0:
+                print("No data to convert to MNE structure")
+                return
+            template = self._cached_raw
+            if (
+                template is None
+                or template.n_times != length
+                or template.info["nchan"] != len(rows)
+                or template.info["sfreq"] != self.eeg_info["sfreq"]
+            ):
+                template = mne.io.RawArray(
+                    np.zeros((len(rows), length)), self.eeg_info, verbose=False
+                )
+                # only the validated structure is kept, not the samples
+                template._data = np.empty((len(rows), 0))
+                self._cached_raw = template
+            numbers_older, numbers_newer = self.sample_numbers.latest_views(samples)
+            raw = copy.deepcopy(template)
+            raw._data = np.empty((len(rows), length))
+            for idx, row in enumerate(rows):
+                if row == self.sample_index:
+                    raw._data[idx, :split] = numbers_older[0]
+                    raw._data[idx, split:] = numbers_newer[0]
+                else:
+                    raw._data[idx, :split] = older[row]
+                    raw._data[idx, split:] = newer[row]
+            sample_numbers = np.concatenate((numbers_older[0], numbers_newer[0]))
+            stop = self.data.total
+        if annotations:
+            raw.set_annotations(
+                self._window_annotations(sample_numbers, stop), verbose=False
+            )
+        else:
+            raw.set_annotations(None, verbose=False)
+        self.mne_raw = raw
+
+
+class EEGData_roll(_EEGDataBase):
+    """Data structure to store rolling EEG data buffer"""
+
+    def __init__(self, info, lock, zeros_at_start: int = 1, dtype=np.float64):
+        """Initializes the EEGData_roll object.
+
+        Parameters
+        ----------
+        info : mne.Info
+            The MNE info object.
+        lock : threading.Lock
+            The threading lock.
+        zeros_at_start : int, optional
+            Length of the rolling buffer in samples, by default 1.
+        dtype : numpy dtype, optional
+            Storage data type, by default float64.
+
+        Raises
+        ------
+        BrainAccessException
+            If no lock is passed or the buffer length is not positive.
+        """
+        if not lock:
+            raise BrainAccessException("No lock passed")
+        super().__init__(info, lock)
+        self.zeros_at_start = zeros_at_start
+        self.dtype = dtype
+        self.data = self._new_buffer()
+        self.sample_numbers = self._new_buffer(1, np.float64)
+
+    def _new_buffer(self, chans: typing.Optional[int] = None, dtype=None) -> RingBuffer:
+        return RingBuffer(chans or self.chans, self.zeros_at_start, dtype=dtype or self.dtype)
 
-class EEGData:
+
+class EEGData(_EEGDataBase):
     """Object to store EEG data in accumulation mode"""
 
-    def __init__(self, info, lock, zeros_at_start: int = 2):
+    def __init__(self, info, lock, zeros_at_start: int = 2, dtype=np.float64):
         """Initializes the EEGData object.
 
         Parameters
@@ -464,35 +1299,166 @@ class EEGData:
             The threading lock.
         zeros_at_start : int, optional
             The number of zeros to add at the beginning of the data, by default 2.
+        dtype : numpy dtype, optional
+            Storage data type, by default float64.
         """
-        self.eeg_info: mne.Info = info
-        self.mne_raw: mne.io.BaseRaw
-        self.lock = lock
-        chans = len(info.ch_names)
+        super().__init__(info, lock)
         self.zeros_at_start = zeros_at_start
-        self.data: list = [np.zeros((chans, self.zeros_at_start))]
-        self.connectivity: list = []
-        self.annotations: dict = {}
+        self.dtype = dtype
+        self.data = self._new_buffer()
+        self.sample_numbers = self._new_buffer(1, np.float64)
+        self._offset = zeros_at_start
+
+    def _new_buffer(self, chans: typing.Optional[int] = None, dtype=None) -> GrowableBuffer:
+        chans = chans or self.chans
+        # one minute of samples before the first reallocation
+        buffer = GrowableBuffer(
+            chans, capacity=int(self.eeg_info["sfreq"] * 60), dtype=dtype or self.dtype
+        )
+        buffer.write(np.zeros((chans, self.zeros_at_start)))
+        return buffer
+
+
+class _MemmapSource:
+    """Rows of a `MemmapBuffer` read by `_MemmapRaw`.
+
+    Shared between copies of the raw object instead of being deep copied.
+    Reads hold the acquisition lock, ingest may grow and remap the file.
+    """
+
+    def __init__(
+        self,
+        buffer: MemmapBuffer,
+        rows: list,
+        lock,
+        sample_numbers: MemmapBuffer,
+        sample_index: int,
+    ):
+        self.buffer = buffer
+        self.rows = rows
+        self.lock = lock
+        self.sample_numbers = sample_numbers
+        self.sample_index = sample_index
+
+    def __deepcopy__(self, memo):
+        return self
+
+
+class _MemmapRaw(mne.io.BaseRaw):
+    """MNE Raw object reading samples from a `MemmapBuffer` on demand."""
+
+    def __init__(
+        self,
+        info: mne.Info,
+        buffer: MemmapBuffer,
+        rows: list,
+        stop: int,
+        lock,
+        sample_numbers: MemmapBuffer,
+        sample_index: int,
+    ):
+        """Wraps the first `stop` stored samples of the buffer.
 
-    def save(self, fname: str):
-        """Saves the raw data to a file.
         Parameters
-        ------------
-        fname: str
-            filename to save data to
+        ----------
+        info : mne.Info
+            The MNE info object, one channel per row.
+        buffer : MemmapBuffer
+            Buffer holding the samples, must stay open while the data is read.
+        rows : list
+            Buffer rows in channel order.
+        stop : int
+            Number of samples to expose.
+        lock : threading.Lock
+            Lock of the acquisition writing the buffer.
+        sample_numbers : MemmapBuffer
+            Buffer holding the exact sample numbers.
+        sample_index : int
+            Buffer row of the sample numbers, read from `sample_numbers`.
         """
-        with self.lock:
-            self.mne_raw.save(fname=fname, verbose=False, overwrite=True, fmt="double")
+        source = _MemmapSource(buffer, rows, lock, sample_numbers, sample_index)
+        super().__init__(
+            info,
+            preload=False,
+            last_samps=[stop - 1],
+            raw_extras=[{"source": source}],
+            verbose=False,
+        )
 
-    def load(self, fname: str):
-        """Loads raw data from a file.
+    def _read_segment_file(self, data, idx, fi, start, stop, cals, mult):
+        source = self._raw_extras[fi]["source"]
+        # held per segment, so saving a long session does not stall ingest
+        with source.lock:
+            if source.buffer.closed:
+                raise BrainAccessException(
+                    "Recording closed, load the data before EEG.close"
+                )
+            one = np.array(
+                source.buffer.view(start, stop)[source.rows], dtype=np.float64
+            )
+            for idx_row, row in enumerate(source.rows):
+                if row == source.sample_index:
+                    one[idx_row] = source.sample_numbers.view(start, stop)[0]
+        if mult is not None:
+            data[:] = mult @ one[idx]
+        else:
+            data[:] = one[idx] * cals
+
+
+class EEGData_mmap(_EEGDataBase):
+    """Object to store EEG data in accumulation mode in a memory-mapped file"""
+
+    def __init__(
+        self,
+        info,
+        lock,
+        zeros_at_start: int = 2,
+        path: typing.Optional[str] = None,
+        tail_seconds: float = 60,
+        dtype=np.float64,
+    ):
+        """Initializes the EEGData_mmap object.
 
         Parameters
         ----------
-        fname : str
-            The name of the file to load.
+        info : mne.Info
+            The MNE info object.
+        lock : threading.Lock
+            The threading lock.
+        zeros_at_start : int, optional
+            The number of zeros to add at the beginning of the data, by default 2.
+        path : str, optional
+            File to store the samples in, a temporary file if None.
+        tail_seconds : float, optional
+            Newest seconds of data kept in memory, by default 60.
+        dtype : numpy dtype, optional
+            Storage data type, by default float64.
         """
-        self.mne_raw = mne.io.read_raw(fname, verbose=False)
+        super().__init__(info, lock)
+        self.zeros_at_start = zeros_at_start
+        self.dtype = dtype
+        self._tail = int(info["sfreq"] * tail_seconds)
+        self.data = self._new_buffer(path=path)
+        self.sample_numbers = self._new_buffer(1, np.float64)
+        self._offset = zeros_at_start
+
+    def _new_buffer(
+        self,
+        chans: typing.Optional[int] = None,
+        dtype=None,
+        path: typing.Optional[str] = None,
+    ) -> MemmapBuffer:
+        chans = chans or self.chans
+        # the filtered copy and the sample numbers are spilled to temporary files
+        buffer = MemmapBuffer(
+            chans,
+            path=path,
+            tail=self._tail,
+            capacity=self._tail,
+            dtype=dtype or self.dtype,
+        )
+        buffer.write(np.zeros((chans, self.zeros_at_start)))
+        return buffer
 
     def convert_to_mne(
         self,
@@ -500,10 +1466,11 @@ class EEGData:
         samples: typing.Optional[int] = None,
         annotations: bool = True,
         channels_indexes: typing.Optional[list] = None,
+        cached: bool = False,
     ):
         """Convert arrays to MNE.
-        If tim None returns all data from acquisition start.
-        Otherwise last tim seconds
+        The whole session is exported lazily, samples are read from the
+        file when MNE needs them. Windows are copied as in `EEGData`.
 
         Parameters
         ------------
@@ -515,56 +1482,52 @@ class EEGData:
             should annotations be included
         channels_indexes: list, optional
             A list of channel indexes to include.
+        cached: bool, default value = False
+            Refresh a previously created RawArray in place.
         """
+        if tim or samples or cached:
+            super().convert_to_mne(tim, samples, annotations, channels_indexes, cached)
+            return
         with self.lock:
-            _length = len(self.data)
-        if _length > 0:
+            stop = self.data.total
             if annotations:
-                timestamp_correction = np.block(self.data)[0][0]
-                onset = []
-                description = []
-                for idx, annotation in enumerate(self.annotations["annotations"]):
-                    description.append(annotation)
-                    timestamp = self.annotations["timestamps"][idx]
-                    onset.append(
-                        (timestamp + self.zeros_at_start - timestamp_correction)
-                        / self.eeg_info["sfreq"]
-                    )
-                duration = np.repeat(0, len(onset))
-            if tim:
-                # convert tim to samples
-                tim = int(tim * self.eeg_info["sfreq"])
-                data = self._concat_data()
-                data = data[:, -tim:]
-                # fix annotations
-                if annotations:
-                    onset = [x - tim for x in onset]
-                    duration = np.repeat(0, len(onset))
-            elif samples:
-                data = self._concat_data()
-                data = data[:, -samples:]
-                # fix annotations
-                if annotations:
-                    onset = [x - samples for x in onset]
-                    duration = np.repeat(0, len(onset))
-            else:
-                data = self._concat_data()
-            # select right order channels
-            if channels_indexes:
-                data = data[channels_indexes]
-            self.mne_raw = mne.io.RawArray(
-                data,
-                self.eeg_info,
-                verbose=False,
-            )
-            if annotations:
-                annot = mne.Annotations(onset, duration, description)
-                self.mne_raw.set_annotations(annot, verbose=False)
-        else:
+                sample_numbers = np.array(self.sample_numbers.view(0, stop)[0])
+        if stop == 0:
             print("No data to convert to MNE structure")
+            return
+        rows = channels_indexes or list(range(self.chans))
+        self.mne_raw = _MemmapRaw(
+            self.eeg_info,
+            self.data,
+            rows,
+            stop,
+            self.lock,
+            self.sample_numbers,
+            self.sample_index,
+        )
+        if annotations:
+            annot = self._window_annotations(sample_numbers, stop)
+            self.mne_raw.set_annotations(annot, verbose=False)
+
+    def save(self, fname: str):
+        """Saves the raw data to a file.
+        A lazily exported session is read from the file segment by
+        segment, holding the lock only while a segment is copied.
+
+        Parameters
+        ------------
+        fname: str
+            filename to save data to
+        """
+        if not isinstance(getattr(self, "mne_raw", None), _MemmapRaw):
+            super().save(fname)
+            return
+        self.mne_raw.save(fname=fname, verbose=False, overwrite=True, fmt="double")
 
-    def _concat_data(self):
-        """Concatenates the data blocks."""
+    def close(self) -> None:
+        """Flushes and closes the backing files."""
         with self.lock:
-            data = np.block(self.data)
-        return data
+            self.data.close()
+            self.sample_numbers.close()
+            if self.filtered is not None:
+                self.filtered.close()
@@ -0,0 +1,229 @@
+"""asyncio iterators over the data of an `EEG` object.
+
+Chunks are stored on the ingest thread. The iterators register a chunk
+listener that appends to a bounded queue and wakes the event loop with
+`loop.call_soon_threadsafe`, at most once per batch of queued items, so a
+busy loop is never flooded with callbacks. When the consumer falls behind,
+the oldest items are dropped and counted in `dropped`.
+
+Use them as async context managers so the listener is removed when the
+consumer stops::
+
+    async with eeg.windows(length=5, hop=1) as windows:
+        async for window in windows:
+            ...
+"""
+
+import asyncio
+import collections
+import threading
+import typing
+
+import numpy as np
+
+from brainaccess.utils.exceptions import BrainAccessException
+
+
+class _AsyncEEGIterator:
+    """Bounded queue filled from the ingest thread and read on the event loop."""
+
+    def __init__(self, eeg, maxsize: int) -> None:
+        if maxsize < 1:
+            raise BrainAccessException("Queue size must be positive")
+        self.eeg = eeg
+        self.maxsize = maxsize
+        self.dropped = 0
+        self._items: collections.deque = collections.deque()
+        self._mtx = threading.Lock()
+        self._loop: typing.Optional[asyncio.AbstractEventLoop] = None
+        self._ready: typing.Optional[asyncio.Event] = None
+        self._wakeup_pending = False
+        self._closed = False
+
+    def __aiter__(self) -> "_AsyncEEGIterator":
+        self._start()
+        return self
+
+    async def __aenter__(self) -> "_AsyncEEGIterator":
+        self._start()
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback) -> None:
+        await self.aclose()
+
+    async def __anext__(self) -> typing.Any:
+        self._start()
+        while True:
+            with self._mtx:
+                if self._items:
+                    return self._items.popleft()
+                if self._closed:
+                    raise StopAsyncIteration
+                self._ready.clear()
+            await self._ready.wait()
+
+    async def aclose(self) -> None:
+        """Stops receiving data, iteration ends after the queued items."""
+        self.close()
+
+    def close(self) -> None:
+        """Stops receiving data, can be called from any thread."""
+        if self._loop is None or self._closed:
+            self._closed = True
+            return
+        self.eeg.remove_chunk_listener(self._on_chunk)
+        with self._mtx:
+            self._closed = True
+        self._wake()
+
+    @property
+    def pending(self) -> int:
+        """Number of queued items."""
+        return len(self._items)
+
+    def _start(self) -> None:
+        """Binds to the running loop and registers the chunk listener once."""
+        if self._loop is not None or self._closed:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._ready = asyncio.Event()
+        self.eeg.add_chunk_listener(self._on_chunk)
+
+    def _on_chunk(self, chunk, chunk_size: int) -> None:
+        """Chunk listener, runs on the ingest thread."""
+        raise NotImplementedError
+
+    def _push(self, item: typing.Any) -> None:
+        """Queues an item and wakes the loop, runs on the ingest thread."""
+        with self._mtx:
+            if self._closed:
+                return
+            if len(self._items) >= self.maxsize:
+                self._items.popleft()
+                self.dropped += 1
+            self._items.append(item)
+        self._wake()
+
+    def _wake(self) -> None:
+        """Schedules one wakeup of the consumer unless one is pending."""
+        with self._mtx:
+            if self._wakeup_pending:
+                return
+            self._wakeup_pending = True
+        try:
+            self._loop.call_soon_threadsafe(self._set_ready)
+        except RuntimeError:
+            # the loop was closed, nobody is waiting anymore
+            self._closed = True
+
+    def _set_ready(self) -> None:
+        """Wakes the consumer, runs on the event loop."""
+        with self._mtx:
+            self._wakeup_pending = False
+        self._ready.set()
+
+
+class ChunkStream(_AsyncEEGIterator):
+    """Async iterator over stored chunks, returned by `EEG.stream`.
+
+    Yields an `EEGWindow` per chunk holding copies of the selected
+    channels.
+    """
+
+    def __init__(
+        self, eeg, channels: typing.Optional[list] = None, maxsize: int = 256
+    ) -> None:
+        """Initializes the ChunkStream object.
+
+        Parameters
+        ----------
+        eeg : EEG
+            Acquisition to read from.
+        channels : list, optional
+            Channel names to include, all channels in MNE order if None.
+        maxsize : int, optional
+            Maximum number of queued chunks, by default 256.
+        """
+        super().__init__(eeg, maxsize)
+        self.rows = eeg._channel_rows(channels)
+
+    def _on_chunk(self, chunk, chunk_size: int) -> None:
+        from brainaccess.utils.acquisition import EEGWindow
+
+        data = self.eeg.data
+        sample_numbers = np.array(chunk[data.sample_index])
+        first_sample = data.first_sample
+        times = (sample_numbers - first_sample) / data.eeg_info["sfreq"]
+        self._push(
+            EEGWindow(
+                np.array([chunk[row] for row in self.rows], dtype=data.dtype),
+                sample_numbers,
+                times,
+            )
+        )
+
+
+class WindowStream(_AsyncEEGIterator):
+    """Async iterator over sliding windows, returned by `EEG.windows`.
+
+    A window of the newest `length` seconds is taken on the ingest thread
+    every time `hop` seconds of new samples were stored, so windows are
+    spaced by sample count, independent of when the loop gets to them.
+    """
+
+    def __init__(
+        self,
+        eeg,
+        length: float,
+        hop: float,
+        channels: typing.Optional[list] = None,
+        mask: bool = False,
+        maxsize: int = 8,
+        filtered: bool = False,
+    ) -> None:
+        """Initializes the WindowStream object.
+
+        Parameters
+        ----------
+        eeg : EEG
+            Acquisition to read from.
+        length : float
+            Window length in seconds.
+        hop : float
+            Seconds of new data between windows.
+        channels : list, optional
+            Channel names to include, all channels in MNE order if None.
+        mask : bool, optional
+            Include validity masks, see `EEG.get_window`.
+        maxsize : int, optional
+            Maximum number of queued windows, by default 8.
+        filtered : bool, optional
+            Return the data filtered during ingest, see `EEG.get_window`.
+
+        Raises
+        ------
+        BrainAccessException
+            If length or hop are not positive.
+        """
+        super().__init__(eeg, maxsize)
+        sfreq = eeg.data.eeg_info["sfreq"]
+        self.samples = int(length * sfreq)
+        self.hop = int(hop * sfreq)
+        if self.samples < 1 or self.hop < 1:
+            raise BrainAccessException("Window length and hop must be positive")
+        self.rows = eeg._channel_rows(channels)
+        self.mask = mask
+        self.filtered = filtered
+        self._since = 0
+
+    def _on_chunk(self, chunk, chunk_size: int) -> None:
+        self._since += chunk_size
+        if self._since < self.hop:
+            return
+        self._since %= self.hop
+        # views are only returned where stored samples never change
+        self._push(
+            self.eeg.data.window(
+                self.samples, self.rows, mask=self.mask, filtered=self.filtered
+            )
+        )
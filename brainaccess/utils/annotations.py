@@ -0,0 +1,86 @@
+"""Annotation index used by the acquisition classes."""
+
+import bisect
+import typing
+
+
+class AnnotationIndex:
+    """Annotations sorted by the sample number they were recorded at.
+
+    The device always reports its whole annotation history, `update` only
+    inserts the entries that were not indexed yet. Range lookups use
+    bisection, so converting a window only touches the annotations inside
+    it.
+    """
+
+    def __init__(self) -> None:
+        """Initializes an empty AnnotationIndex object."""
+        self.timestamps: list = []
+        self.descriptions: list = []
+        self._seen = 0
+
+    def __len__(self) -> int:
+        return len(self.timestamps)
+
+    def update(self, annotations: dict) -> None:
+        """Indexes annotations returned by `EEGManager.get_annotations`.
+
+        Parameters
+        ----------
+        annotations : dict
+            Dictionary with "annotations" and "timestamps" lists.
+        """
+        timestamps = annotations.get("timestamps", [])
+        descriptions = annotations.get("annotations", [])
+        if len(timestamps) < self._seen:
+            # history was cleared on the device, start over
+            self.clear()
+        for timestamp, description in zip(
+            timestamps[self._seen :], descriptions[self._seen :]
+        ):
+            self.add(timestamp, description)
+        self._seen = len(timestamps)
+
+    def add(self, timestamp: int, description: str) -> None:
+        """Inserts a single annotation keeping the index sorted.
+
+        Parameters
+        ----------
+        timestamp : int
+            Sample number of the annotation.
+        description : str
+            Annotation text.
+        """
+        idx = bisect.bisect_right(self.timestamps, timestamp)
+        self.timestamps.insert(idx, timestamp)
+        self.descriptions.insert(idx, description)
+
+    def between(
+        self, start: float, stop: typing.Optional[float] = None
+    ) -> typing.Tuple[list, list]:
+        """Returns annotations with start <= timestamp < stop.
+
+        Parameters
+        ----------
+        start : float
+            First sample number of the range.
+        stop : float, optional
+            Sample number after the range, open ended if None.
+
+        Returns
+        -------
+        tuple of list
+            Timestamps and descriptions inside the range.
+        """
+        lo = bisect.bisect_left(self.timestamps, start)
+        if stop is None:
+            hi = len(self.timestamps)
+        else:
+            hi = bisect.bisect_left(self.timestamps, stop, lo)
+        return self.timestamps[lo:hi], self.descriptions[lo:hi]
+
+    def clear(self) -> None:
+        """Removes all annotations."""
+        self.timestamps = []
+        self.descriptions = []
+        self._seen = 0
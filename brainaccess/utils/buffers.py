@@ -0,0 +1,621 @@
+"""Sample storage used by the acquisition classes.
+
+Buffers hold multichannel data with shape (channels, samples) and are
+written one device chunk at a time.
+"""
+
+import collections
+import mmap
+import os
+import tempfile
+import typing
+import numpy as np
+
+from brainaccess.utils.exceptions import BrainAccessException
+
+
+class RingBuffer:
+    """Fixed size circular buffer of multichannel samples.
+
+    The storage is allocated once. Writing a chunk copies it behind the
+    write cursor, wrapping around the end of the array, so ingest cost is
+    proportional to the chunk size and does not allocate.
+
+    The buffer is not synchronized, callers sharing it between threads
+    must hold their own lock.
+    """
+
+    # views are overwritten once the buffer wraps
+    stable_views = False
+
+    def __init__(self, chans: int, length: int, dtype=np.float64):
+        """Initializes the RingBuffer object.
+
+        Parameters
+        ----------
+        chans : int
+            Number of channels (rows).
+        length : int
+            Capacity of the buffer in samples.
+        dtype : numpy dtype, optional
+            Storage data type, by default float64.
+
+        Raises
+        ------
+        BrainAccessException
+            If the buffer length is not positive.
+        """
+        if length < 1:
+            raise BrainAccessException("Ring buffer length must be positive")
+        self.chans = chans
+        self.length = length
+        self._buffer = np.zeros((chans, length), dtype=dtype)
+        self._cursor = 0
+        self._size = 0
+        self.total = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def dtype(self) -> np.dtype:
+        """Storage data type."""
+        return self._buffer.dtype
+
+    def write(self, chunk: typing.Union[np.ndarray, typing.Sequence]) -> None:
+        """Appends a chunk, overwriting the oldest samples when full.
+
+        Parameters
+        ----------
+        chunk : np.ndarray or sequence of np.ndarray
+            Array of shape (channels, n) or one 1D array per channel.
+        """
+        if isinstance(chunk, np.ndarray):
+            n = chunk.shape[-1]
+        else:
+            n = len(chunk[0]) if len(chunk) else 0
+        if n == 0:
+            return
+        self.total += n
+        offset = 0
+        if n > self.length:
+            # only the newest samples fit
+            offset = n - self.length
+            n = self.length
+        first = min(n, self.length - self._cursor)
+        second = n - first
+        if isinstance(chunk, np.ndarray):
+            self._buffer[:, self._cursor : self._cursor + first] = chunk[
+                :, offset : offset + first
+            ]
+            if second:
+                self._buffer[:, :second] = chunk[:, offset + first : offset + n]
+        else:
+            for idx, row in enumerate(chunk):
+                self._buffer[idx, self._cursor : self._cursor + first] = row[
+                    offset : offset + first
+                ]
+                if second:
+                    self._buffer[idx, :second] = row[offset + first : offset + n]
+        self._cursor = (self._cursor + n) % self.length
+        self._size = min(self._size + n, self.length)
+
+    def latest_views(
+        self, samples: typing.Optional[int] = None, skip: int = 0
+    ) -> typing.Tuple[np.ndarray, np.ndarray]:
+        """Returns the newest samples as two views in chronological order.
+
+        The second view is empty unless the requested range wraps around
+        the end of the storage. Views are overwritten by later writes.
+
+        Parameters
+        ----------
+        samples : int, optional
+            Number of newest samples, all stored samples if None.
+        skip : int, optional
+            Number of newest samples to leave out, by default 0.
+
+        Returns
+        -------
+        tuple of np.ndarray
+            Older and newer part, each of shape (channels, n).
+        """
+        skip = min(skip, self._size)
+        if samples is None or samples > self._size - skip:
+            samples = self._size - skip
+        stop = self._cursor - skip
+        if stop < 0:
+            stop += self.length
+        start = stop - samples
+        if start >= 0:
+            return (
+                self._buffer[:, start:stop],
+                self._buffer[:, stop:stop],
+            )
+        return self._buffer[:, start:], self._buffer[:, :stop]
+
+    def latest(
+        self, samples: typing.Optional[int] = None, skip: int = 0, dtype=None
+    ) -> np.ndarray:
+        """Returns a contiguous copy of the newest samples.
+
+        Parameters
+        ----------
+        samples : int, optional
+            Number of newest samples, all stored samples if None.
+        skip : int, optional
+            Number of newest samples to leave out, by default 0.
+        dtype : numpy dtype, optional
+            Data type of the copy, the storage data type if None.
+
+        Returns
+        -------
+        np.ndarray
+            Data array, shape (channels, samples).
+        """
+        older, newer = self.latest_views(samples, skip)
+        out = np.empty(
+            (self.chans, older.shape[1] + newer.shape[1]),
+            dtype=self._buffer.dtype if dtype is None else dtype,
+        )
+        out[:, : older.shape[1]] = older
+        out[:, older.shape[1] :] = newer
+        return out
+
+    def clear(self) -> None:
+        """Drops all stored samples."""
+        self._cursor = 0
+        self._size = 0
+        self.total = 0
+
+
+class GrowableBuffer:
+    """Contiguous multichannel buffer with amortized growth.
+
+    Samples are appended behind the write cursor. When the storage is full
+    its capacity is doubled, so appending costs O(chunk) amortized and the
+    whole recording always lives in one array.
+
+    Stored samples are never modified, views returned by this class stay
+    valid after later writes. The buffer is not synchronized, callers
+    sharing it between threads must hold their own lock.
+    """
+
+    stable_views = True
+
+    def __init__(self, chans: int, capacity: int = 4096, dtype=np.float64):
+        """Initializes the GrowableBuffer object.
+
+        Parameters
+        ----------
+        chans : int
+            Number of channels (rows).
+        capacity : int, optional
+            Initial capacity in samples, by default 4096.
+        dtype : numpy dtype, optional
+            Storage data type, by default float64.
+        """
+        self.chans = chans
+        self._buffer = np.zeros((chans, max(capacity, 1)), dtype=dtype)
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def total(self) -> int:
+        """Number of samples written since creation."""
+        return self._size
+
+    @property
+    def dtype(self) -> np.dtype:
+        """Storage data type."""
+        return self._buffer.dtype
+
+    @property
+    def capacity(self) -> int:
+        """Currently allocated capacity in samples."""
+        return self._buffer.shape[1]
+
+    def _reserve(self, samples: int) -> None:
+        """Grows the storage to hold at least `samples` samples."""
+        capacity = self.capacity
+        if samples <= capacity:
+            return
+        while capacity < samples:
+            capacity *= 2
+        buffer = np.empty((self.chans, capacity), dtype=self._buffer.dtype)
+        buffer[:, : self._size] = self._buffer[:, : self._size]
+        self._buffer = buffer
+
+    def write(self, chunk: typing.Union[np.ndarray, typing.Sequence]) -> None:
+        """Appends a chunk.
+
+        Parameters
+        ----------
+        chunk : np.ndarray or sequence of np.ndarray
+            Array of shape (channels, n) or one 1D array per channel.
+        """
+        if isinstance(chunk, np.ndarray):
+            n = chunk.shape[-1]
+        else:
+            n = len(chunk[0]) if len(chunk) else 0
+        if n == 0:
+            return
+        self._reserve(self._size + n)
+        if isinstance(chunk, np.ndarray):
+            self._buffer[:, self._size : self._size + n] = chunk
+        else:
+            for idx, row in enumerate(chunk):
+                self._buffer[idx, self._size : self._size + n] = row
+        self._size += n
+
+    def view(self, start: int = 0, stop: typing.Optional[int] = None) -> np.ndarray:
+        """Returns a view of stored samples between two positions.
+
+        Parameters
+        ----------
+        start : int, optional
+            First sample position, by default 0.
+        stop : int, optional
+            Position after the last sample, all stored samples if None.
+
+        Returns
+        -------
+        np.ndarray
+            Data view, shape (channels, stop - start).
+        """
+        if stop is None or stop > self._size:
+            stop = self._size
+        return self._buffer[:, start:stop]
+
+    def latest_views(
+        self, samples: typing.Optional[int] = None, skip: int = 0
+    ) -> typing.Tuple[np.ndarray, np.ndarray]:
+        """Returns the newest samples as two views in chronological order.
+
+        Mirrors `RingBuffer.latest_views`, the second view is always empty.
+
+        Parameters
+        ----------
+        samples : int, optional
+            Number of newest samples, all stored samples if None.
+        skip : int, optional
+            Number of newest samples to leave out, by default 0.
+
+        Returns
+        -------
+        tuple of np.ndarray
+            Older and newer part, each of shape (channels, n).
+        """
+        stop = self._size - min(skip, self._size)
+        if samples is None or samples > stop:
+            samples = stop
+        return (
+            self._buffer[:, stop - samples : stop],
+            self._buffer[:, stop:stop],
+        )
+
+    def latest(
+        self, samples: typing.Optional[int] = None, skip: int = 0, dtype=None
+    ) -> np.ndarray:
+        """Returns a contiguous copy of the newest samples.
+
+        Parameters
+        ----------
+        samples : int, optional
+            Number of newest samples, all stored samples if None.
+        skip : int, optional
+            Number of newest samples to leave out, by default 0.
+        dtype : numpy dtype, optional
+            Data type of the copy, the storage data type if None.
+
+        Returns
+        -------
+        np.ndarray
+            Data array, shape (channels, samples).
+        """
+        return np.array(self.latest_views(samples, skip)[0], dtype=dtype)
+
+    def clear(self) -> None:
+        """Drops all stored samples, keeping the allocated storage."""
+        self._size = 0
+
+
+class MemmapBuffer:
+    """Append-only multichannel buffer backed by a memory-mapped file.
+
+    Samples are written straight into a file mapping, frame by frame
+    (samples x channels on disk), so the recording survives a crash of
+    the process and reads return views of the mapping without copying.
+    The file grows by doubling. Only the newest `tail` samples are kept
+    resident: older pages are flushed to disk and released from memory,
+    the operating system reads them back when accessed.
+
+    Stored samples are never modified, views stay valid after later
+    writes. The buffer is not synchronized, callers sharing it between
+    threads must hold their own lock.
+    """
+
+    stable_views = True
+
+    def __init__(
+        self,
+        chans: int,
+        path: typing.Optional[typing.Union[str, os.PathLike]] = None,
+        tail: int = 15000,
+        capacity: int = 15000,
+        dtype=np.float64,
+    ):
+        """Creates the backing file.
+
+        Parameters
+        ----------
+        chans : int
+            Number of channels (rows).
+        path : str or os.PathLike, optional
+            File to write, an existing file is overwritten. A temporary file
+            removed by `close` is used if None.
+        tail : int, optional
+            Number of newest samples kept in memory, by default 15000.
+        capacity : int, optional
+            Initial capacity in samples, by default 15000.
+        dtype : numpy dtype, optional
+            Storage data type, by default float64.
+        """
+        self.chans = chans
+        self.tail = tail
+        self._dtype = np.dtype(dtype)
+        self._frame = chans * self._dtype.itemsize
+        self.temporary = path is None
+        if path is None:
+            fd, path = tempfile.mkstemp(prefix="brainaccess-", suffix=".dat")
+            self._file = os.fdopen(fd, "r+b")
+        else:
+            self._file = open(path, "w+b")
+        self.path = str(path)
+        self._size = 0
+        # first byte not yet flushed and released
+        self._released = 0
+        self._map: typing.Optional[mmap.mmap] = None
+        self._array = np.empty((0, chans), dtype=self._dtype)
+        self._map_file(max(capacity, 1))
+
+    def __len__(self) -> int:
+        return self._size
+
+    @property
+    def total(self) -> int:
+        """Number of samples written since creation."""
+        return self._size
+
+    @property
+    def dtype(self) -> np.dtype:
+        """Storage data type."""
+        return self._dtype
+
+    @property
+    def capacity(self) -> int:
+        """Current file capacity in samples."""
+        return self._array.shape[0]
+
+    @property
+    def closed(self) -> bool:
+        """True after `close`."""
+        return self._file.closed
+
+    def _map_file(self, capacity: int) -> None:
+        """Resizes the file and maps it again.
+
+        The previous mapping stays alive while views of it exist.
+        """
+        if os.name != "nt":
+            # on Windows mapping past the end extends the file
+            self._file.truncate(capacity * self._frame)
+        self._map = mmap.mmap(self._file.fileno(), capacity * self._frame)
+        self._array = np.frombuffer(self._map, dtype=self._dtype).reshape(
+            capacity, self.chans
+        )
+
+    def _reserve(self, samples: int) -> None:
+        """Grows the file to hold at least `samples` samples."""
+        capacity = self.capacity
+        if samples <= capacity:
+            return
+        while capacity < samples:
+            capacity *= 2
+        self._map_file(capacity)
+
+    def write(self, chunk: typing.Union[np.ndarray, typing.Sequence]) -> None:
+        """Appends a chunk.
+
+        Parameters
+        ----------
+        chunk : np.ndarray or sequence of np.ndarray
+            Array of shape (channels, n) or one 1D array per channel.
+        """
+        if isinstance(chunk, np.ndarray):
+            n = chunk.shape[-1]
+        else:
+            n = len(chunk[0]) if len(chunk) else 0
+        if n == 0:
+            return
+        self._reserve(self._size + n)
+        frames = self._array[self._size : self._size + n]
+        if isinstance(chunk, np.ndarray):
+            frames[:] = chunk.T
+        else:
+            for idx, row in enumerate(chunk):
+                frames[:, idx] = row
+        self._size += n
+        if (self._size - self.tail) * self._frame - self._released > self.tail * self._frame:
+            self._release(self._size - self.tail)
+
+    def _release(self, samples: int) -> None:
+        """Flushes samples before `samples` and drops them from memory."""
+        granularity = mmap.ALLOCATIONGRANULARITY
+        stop = samples * self._frame // granularity * granularity
+        if stop <= self._released:
+            return
+        self._map.flush(self._released, stop - self._released)
+        if hasattr(self._map, "madvise"):
+            self._map.madvise(mmap.MADV_DONTNEED, self._released, stop - self._released)
+        self._released = stop
+
+    def flush(self) -> None:
+        """Writes all stored samples to disk."""
+        if self._map is not None:
+            self._map.flush()
+
+    def view(self, start: int = 0, stop: typing.Optional[int] = None) -> np.ndarray:
+        """Returns a view of stored samples between two positions.
+
+        Parameters
+        ----------
+        start : int, optional
+            First sample position, by default 0.
+        stop : int, optional
+            Position after the last sample, all stored samples if None.
+
+        Returns
+        -------
+        np.ndarray
+            Data view, shape (channels, stop - start).
+        """
+        if stop is None or stop > self._size:
+            stop = self._size
+        return self._array[start:stop].T
+
+    def latest_views(
+        self, samples: typing.Optional[int] = None, skip: int = 0
+    ) -> typing.Tuple[np.ndarray, np.ndarray]:
+        """Returns the newest samples as two views in chronological order.
+
+        Mirrors `RingBuffer.latest_views`, the second view is always empty.
+
+        Parameters
+        ----------
+        samples : int, optional
+            Number of newest samples, all stored samples if None.
+        skip : int, optional
+            Number of newest samples to leave out, by default 0.
+
+        Returns
+        -------
+        tuple of np.ndarray
+            Older and newer part, each of shape (channels, n).
+        """
+        stop = self._size - min(skip, self._size)
+        if samples is None or samples > stop:
+            samples = stop
+        return self.view(stop - samples, stop), self.view(stop, stop)
+
+    def latest(
+        self, samples: typing.Optional[int] = None, skip: int = 0, dtype=None
+    ) -> np.ndarray:
+        """Returns a contiguous copy of the newest samples.
+
+        Parameters
+        ----------
+        samples : int, optional
+            Number of newest samples, all stored samples if None.
+        skip : int, optional
+            Number of newest samples to leave out, by default 0.
+        dtype : numpy dtype, optional
+            Data type of the copy, the storage data type if None.
+
+        Returns
+        -------
+        np.ndarray
+            Data array, shape (channels, samples).
+        """
+        return np.array(self.latest_views(samples, skip)[0], dtype=dtype, order="C")
+
+    def clear(self) -> None:
+        """Drops all stored samples, keeping the file."""
+        self._size = 0
+        self._released = 0
+
+    def close(self) -> None:
+        """Flushes and closes the file, removing it if it is temporary.
+
+        Views returned earlier keep the mapping alive until released.
+        """
+        if self._file.closed:
+            return
+        self.flush()
+        self._array = np.empty((0, self.chans), dtype=self._dtype)
+        try:
+            self._map.close()
+        except BufferError:
+            # views still exported, the mapping is closed with them
+            pass
+        self._map = None
+        try:
+            self._file.truncate(self._size * self._frame)
+        except OSError:
+            pass
+        self._file.close()
+        if self.temporary:
+            try:
+                os.remove(self.path)
+            except OSError:
+                pass
+
+
+class BufferPool:
+    """Recycles arrays of a fixed dtype to avoid per-chunk allocation.
+
+    Arrays handed out by `acquire` must be given back with `release` once
+    they are no longer used. An array of a different shape than requested
+    is dropped and replaced, so the pool adapts when the stream layout
+    changes.
+    """
+
+    def __init__(self, dtype=np.float64, size: int = 16):
+        """Initializes an empty BufferPool object.
+
+        Parameters
+        ----------
+        dtype : numpy dtype, optional
+            Data type of the arrays, by default float64.
+        size : int, optional
+            Maximum number of idle arrays kept for reuse, by default 16.
+        """
+        self.dtype = np.dtype(dtype)
+        self.size = size
+        self.allocated = 0
+        self._free: collections.deque = collections.deque()
+
+    def acquire(self, shape: tuple) -> np.ndarray:
+        """Returns an uninitialized array of the given shape.
+
+        Parameters
+        ----------
+        shape : tuple
+            Array shape.
+
+        Returns
+        -------
+        np.ndarray
+            Reused or newly allocated array.
+        """
+        try:
+            buffer = self._free.pop()
+        except IndexError:
+            buffer = None
+        if buffer is None or buffer.shape != shape:
+            buffer = np.empty(shape, dtype=self.dtype)
+            self.allocated += 1
+        return buffer
+
+    def release(self, buffer: np.ndarray) -> None:
+        """Returns an array to the pool.
+
+        Parameters
+        ----------
+        buffer : np.ndarray
+            Array previously returned by `acquire`.
+        """
+        if len(self._free) < self.size:
+            self._free.append(buffer)
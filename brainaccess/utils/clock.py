@@ -0,0 +1,243 @@
+"""Mapping of device sample numbers to host time."""
+
+import array
+import bisect
+import math
+import typing
+
+import numpy as np
+
+
+class SampleClock:
+    """Online estimate of the host monotonic time of device samples.
+
+    Samples only carry the device sample counter, chunks arrive with
+    transport jitter and the device crystal drifts against the host clock.
+    Every chunk adds one observation, the host time its last sample was
+    stored at. A recursive least squares fit with exponential forgetting
+    tracks host time as offset + rate * device time, so the mapping follows
+    drift while the jitter of single chunks averages out. Observations
+    further than `outlier` times the residual RMS from the fit are clipped
+    before updating, so a delayed burst of chunks does not pull the fit.
+
+    The fitted time of the newest sample of every chunk is kept with its
+    buffer position, host time queries bisect these anchors. Storage that
+    drops old samples calls `trim`, so the anchors stay bounded.
+
+    The offset includes the mean transport latency, which is the same for
+    all devices on one host, so times of different devices are comparable.
+    """
+
+    def __init__(
+        self, sfreq: float, memory: float = 30.0, outlier: float = 3.0
+    ) -> None:
+        """Initializes an empty SampleClock object.
+
+        Parameters
+        ----------
+        sfreq : float
+            Nominal sampling frequency of the device.
+        memory : float, optional
+            Half-life of observations in seconds of device time, by default
+            30 s.
+        outlier : float, optional
+            Residuals are clipped to this many RMS residuals, by default 3.
+        """
+        self.sfreq = sfreq
+        self.memory = memory
+        self.outlier = outlier
+        self.reset()
+
+    def reset(self) -> None:
+        """Forgets all observations, e.g. after the device counter restarted."""
+        self.observations = 0
+        # host time of the reference sample and host seconds per device second
+        self.offset = 0.0
+        self.rate = 1.0
+        self.jitter = 0.0
+        self._ref_sample = 0.0
+        self._ref_time = 0.0
+        self._cov = np.zeros((2, 2))
+        self._last_sample: typing.Optional[float] = None
+        self._start = 0
+        # fitted host time of the last sample of each chunk and the buffer
+        # position after it
+        self._times = array.array("d")
+        self._stops = array.array("q")
+
+    @property
+    def period(self) -> float:
+        """Host seconds between consecutive samples."""
+        return self.rate / self.sfreq
+
+    @property
+    def last_time(self) -> typing.Optional[float]:
+        """Fitted host time of the newest sample, None before the first chunk."""
+        return self._times[-1] if self._times else None
+
+    def update(self, sample_numbers: np.ndarray, position: int, host_time: float) -> None:
+        """Adds the observation of a stored chunk.
+
+        Parameters
+        ----------
+        sample_numbers : np.ndarray
+            Device sample numbers of the chunk.
+        position : int
+            Buffer position of the first sample of the chunk.
+        host_time : float
+            Host monotonic time the chunk was stored at.
+        """
+        n = len(sample_numbers)
+        if n == 0:
+            return
+        last = float(sample_numbers[-1])
+        if self._last_sample is not None and last <= self._last_sample:
+            # the device counter restarted, the old mapping no longer applies
+            self.reset()
+        if self._last_sample is None:
+            self._ref_sample = last
+            self._ref_time = host_time
+            self._start = position
+            # the offset is unknown, the rate is close to nominal
+            self._cov = np.diag([1e4, 4e-2])
+            forget = 1.0
+        else:
+            forget = 0.5 ** ((last - self._last_sample) / self.sfreq / self.memory)
+        self._last_sample = last
+        x = np.array([1.0, (last - self._ref_sample) / self.sfreq])
+        t = host_time - self._ref_time
+        error = t - (self.offset + self.rate * x[1])
+        if self.observations > 10 and self.jitter > 0:
+            limit = self.outlier * self.jitter
+            error = min(max(error, -limit), limit)
+        px = self._cov @ x
+        gain = px / (forget + x @ px)
+        self.offset += gain[0] * error
+        self.rate += gain[1] * error
+        self._cov = (self._cov - np.outer(gain, px)) / forget
+        self.jitter = math.sqrt(forget * self.jitter**2 + (1 - forget) * error**2)
+        self.observations += 1
+        fitted = self._ref_time + self.offset + self.rate * x[1]
+        if self._times:
+            # keep anchors sorted when the fit moves back
+            fitted = max(fitted, self._times[-1])
+        self._times.append(fitted)
+        self._stops.append(position + n)
+
+    def trim(self, position: int) -> None:
+        """Forgets the anchors of chunks stored before a buffer position.
+
+        Anchors are deleted in batches of at least half of them, so the
+        cost per chunk stays constant. Earlier host times map to the first
+        position still covered.
+
+        Parameters
+        ----------
+        position : int
+            First buffer position still stored.
+        """
+        count = min(bisect.bisect_right(self._stops, position), len(self._stops) - 1)
+        if count <= 0 or 2 * count < len(self._stops):
+            return
+        self._start = self._stops[count - 1]
+        del self._times[:count]
+        del self._stops[:count]
+
+    def host_time(self, sample_numbers: typing.Any) -> typing.Any:
+        """Maps device sample numbers to host monotonic time.
+
+        Parameters
+        ----------
+        sample_numbers : float or np.ndarray
+            Device sample numbers.
+
+        Returns
+        -------
+        float or np.ndarray
+            Host times according to the current fit.
+        """
+        device = (np.asarray(sample_numbers) - self._ref_sample) / self.sfreq
+        return self._ref_time + self.offset + self.rate * device
+
+    def sample_number(self, host_time: typing.Any) -> typing.Any:
+        """Maps host monotonic times to (fractional) device sample numbers.
+
+        Parameters
+        ----------
+        host_time : float or np.ndarray
+            Host monotonic times.
+
+        Returns
+        -------
+        float or np.ndarray
+            Device sample numbers according to the current fit.
+        """
+        device = (np.asarray(host_time) - self._ref_time - self.offset) / self.rate
+        return self._ref_sample + device * self.sfreq
+
+    def position(self, host_time: float, after: bool = False) -> int:
+        """Buffer position of the first sample at or after a host time.
+
+        Runs in O(log n) in the number of chunks.
+
+        Parameters
+        ----------
+        host_time : float
+            Host monotonic time.
+        after : bool, optional
+            Return the first sample strictly after the time instead.
+
+        Returns
+        -------
+        int
+            Buffer position, clipped to the observed samples. Times inside
+            lost data map to the first sample after the loss.
+        """
+        if not self._times:
+            return self._start
+        find = bisect.bisect_right if after else bisect.bisect_left
+        idx = find(self._times, host_time)
+        if idx == len(self._times):
+            return self._stops[-1]
+        # samples back from the last one of chunk idx
+        back = (self._times[idx] - host_time) / self.period
+        last = self._stops[idx] - 1
+        if after:
+            pos = math.floor(last - back) + 1
+        else:
+            pos = math.ceil(last - back)
+        first = self._stops[idx - 1] if idx else self._start
+        return max(pos, first)
+
+    def positions(self, t0: float, t1: float) -> typing.Tuple[int, int]:
+        """Buffer positions of the samples between two host times.
+
+        Parameters
+        ----------
+        t0 : float
+            Host monotonic time of the start, included.
+        t1 : float
+            Host monotonic time of the end, included.
+
+        Returns
+        -------
+        tuple
+            start and stop position, stop excluded.
+        """
+        start = self.position(t0)
+        return start, max(start, self.position(t1, after=True))
+
+    def stats(self) -> dict:
+        """Returns the current fit.
+
+        Returns
+        -------
+        dict
+            Drift in parts per million, residual jitter in seconds and the
+            number of observations.
+        """
+        return {
+            "drift_ppm": float((self.rate - 1.0) * 1e6),
+            "jitter_s": float(self.jitter),
+            "observations": self.observations,
+        }
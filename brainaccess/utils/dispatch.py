@@ -0,0 +1,314 @@
+"""Queued delivery of device chunks to Python callbacks.
+
+The native library calls chunk callbacks on its own thread. A slow
+callback delays the delivery of the following packets, so `ChunkDispatcher`
+only copies the chunk into a bounded queue on that thread and runs the
+callback on a dedicated worker thread.
+"""
+
+import collections
+import threading
+import traceback
+import typing
+
+import numpy as np
+
+from brainaccess.utils.exceptions import BrainAccessException
+from brainaccess.utils.buffers import BufferPool
+
+POLICIES = ("drop_oldest", "drop_newest", "block")
+
+
+class ChunkDispatcher:
+    """Bounded queue with a worker thread that feeds a chunk callback.
+
+    When the queue is full the policy decides what happens to a new chunk:
+
+    - "drop_oldest": the oldest queued chunk is discarded.
+    - "drop_newest": the new chunk is discarded.
+    - "block": the producing thread waits until the worker frees a slot.
+
+    Dropped chunks are counted in `dropped`, chunks whose callback raised in
+    `errors` and all others in `delivered`.
+    """
+
+    def __init__(
+        self,
+        callback: typing.Callable,
+        maxsize: int = 64,
+        policy: str = "drop_oldest",
+        release: typing.Optional[typing.Callable] = None,
+    ) -> None:
+        """Creates the queue and starts the worker thread.
+
+        Parameters
+        ----------
+        callback : callable
+            Function called with (chunk, chunk_size) on the worker thread.
+        maxsize : int, optional
+            Maximum number of queued chunks, by default 64.
+        policy : str, optional
+            Overflow policy, one of "drop_oldest", "drop_newest" or "block".
+        release : callable, optional
+            Called with the chunk once it was delivered or dropped, used to
+            return pooled buffers.
+
+        Raises
+        ------
+        BrainAccessException
+            If the policy is unknown or maxsize is not positive.
+        """
+        if policy not in POLICIES:
+            raise BrainAccessException(f"Unknown dispatch policy {policy}")
+        if maxsize < 1:
+            raise BrainAccessException("Queue size must be positive")
+        self.callback = callback
+        self.release = release
+        self.maxsize = maxsize
+        self.policy = policy
+        self.dropped = 0
+        self.delivered = 0
+        self.errors = 0
+        self.max_depth = 0
+        self._queue: collections.deque = collections.deque()
+        self._cond = threading.Condition()
+        self._running = True
+        self._thread = threading.Thread(
+            target=self._run, name="brainaccess-chunk-dispatch", daemon=True
+        )
+        self._thread.start()
+
+    @property
+    def depth(self) -> int:
+        """Number of chunks waiting for the worker."""
+        return len(self._queue)
+
+    def submit(self, chunk: typing.Sequence, chunk_size: int) -> bool:
+        """Copies a chunk and queues it for the worker.
+
+        Parameters
+        ----------
+        chunk : sequence of np.ndarray
+            Chunk as delivered by the device, one array per channel. The
+            arrays are copied, so they may point to native memory.
+        chunk_size : int
+            Number of samples in the chunk.
+
+        Returns
+        -------
+        bool
+            False if the chunk was dropped.
+        """
+        item = ([np.array(channel) for channel in chunk], chunk_size)
+        return self.put(item)
+
+    def put_chunk(self, chunk: typing.Any, chunk_size: int) -> bool:
+        """Queues a chunk the caller no longer uses, without copying it.
+
+        Parameters
+        ----------
+        chunk : Any
+            Chunk data, owned by the queue from now on.
+        chunk_size : int
+            Number of samples in the chunk.
+
+        Returns
+        -------
+        bool
+            False if the chunk was dropped.
+        """
+        return self.put((chunk, chunk_size))
+
+    def put(self, item: tuple) -> bool:
+        """Queues an already copied (chunk, chunk_size) pair.
+
+        Parameters
+        ----------
+        item : tuple
+            Arguments of the callback.
+
+        Returns
+        -------
+        bool
+            False if the item was dropped.
+        """
+        dropped = None
+        with self._cond:
+            if not self._running:
+                dropped = item
+            elif len(self._queue) >= self.maxsize:
+                if self.policy == "drop_newest":
+                    dropped = item
+                elif self.policy == "drop_oldest":
+                    dropped = self._queue.popleft()
+                else:
+                    while self._running and len(self._queue) >= self.maxsize:
+                        self._cond.wait()
+                    if not self._running:
+                        dropped = item
+            if dropped is not item:
+                self._queue.append(item)
+                self.max_depth = max(self.max_depth, len(self._queue))
+                self._cond.notify_all()
+            if dropped is not None:
+                self.dropped += 1
+        if dropped is not None and self.release is not None:
+            self.release(dropped[0])
+        return dropped is not item
+
+    def stats(self) -> dict:
+        """Returns queue counters.
+
+        Returns
+        -------
+        dict
+            depth, max_depth, maxsize, delivered, dropped and errors.
+        """
+        with self._cond:
+            return {
+                "depth": len(self._queue),
+                "max_depth": self.max_depth,
+                "maxsize": self.maxsize,
+                "delivered": self.delivered,
+                "dropped": self.dropped,
+                "errors": self.errors,
+            }
+
+    def stop(self, drain: bool = True, timeout: typing.Optional[float] = None) -> None:
+        """Stops the worker thread.
+
+        Parameters
+        ----------
+        drain : bool, optional
+            Deliver the queued chunks before stopping, by default True.
+        timeout : float, optional
+            Maximum time to wait for the worker in seconds.
+        """
+        dropped: list = []
+        with self._cond:
+            if not drain:
+                self.dropped += len(self._queue)
+                dropped = list(self._queue)
+                self._queue.clear()
+            self._running = False
+            self._cond.notify_all()
+        if self.release is not None:
+            for item in dropped:
+                self.release(item[0])
+        if threading.current_thread() is not self._thread:
+            self._thread.join(timeout)
+
+    def _run(self) -> None:
+        """Worker loop delivering queued chunks to the callback."""
+        while True:
+            with self._cond:
+                while self._running and not self._queue:
+                    self._cond.wait()
+                if not self._queue:
+                    return
+                item = self._queue.popleft()
+                self._cond.notify_all()
+            failed = False
+            try:
+                self.callback(*item)
+            except Exception:
+                failed = True
+                traceback.print_exc()
+            finally:
+                if self.release is not None:
+                    self.release(item[0])
+            with self._cond:
+                if failed:
+                    self.errors += 1
+                else:
+                    self.delivered += 1
+
+
+class ChunkPacker:
+    """Copies per-channel chunk arrays into one contiguous pooled block.
+
+    The block has shape (channels, chunk_size) and comes from a
+    `BufferPool`. It is handed to `deliver` and returned to the pool when
+    `deliver` returns, unless `release_after` is False, in which case the
+    receiver must release it.
+    """
+
+    def __init__(
+        self,
+        deliver: typing.Callable,
+        pool: BufferPool,
+        release_after: bool = True,
+    ) -> None:
+        """Initializes the ChunkPacker object.
+
+        Parameters
+        ----------
+        deliver : callable
+            Function called with (block, chunk_size).
+        pool : BufferPool
+            Pool the blocks are taken from.
+        release_after : bool, optional
+            Return the block to the pool after `deliver` returns.
+        """
+        self.deliver = deliver
+        self.pool = pool
+        self.release_after = release_after
+
+    def __call__(self, chunk: typing.Sequence, chunk_size: int) -> None:
+        block = self.pool.acquire((len(chunk), chunk_size))
+        for idx, channel in enumerate(chunk):
+            block[idx] = channel
+        if not self.release_after:
+            self.deliver(block, chunk_size)
+            return
+        try:
+            self.deliver(block, chunk_size)
+        finally:
+            self.pool.release(block)
+
+
+def make_chunk_callback(
+    f: typing.Callable,
+    threaded: bool = False,
+    queue_size: int = 64,
+    policy: str = "drop_oldest",
+    contiguous: bool = False,
+    dtype: typing.Any = np.float64,
+) -> typing.Tuple[typing.Callable, typing.Optional[ChunkDispatcher]]:
+    """Wraps a chunk callback according to the delivery options.
+
+    See `EEGManager.set_callback_chunk` for the meaning of the options.
+
+    Parameters
+    ----------
+    f : callable
+        User callback accepting (chunk, chunk_size).
+    threaded : bool, optional
+        Run the callback on a worker thread fed by a queue.
+    queue_size : int, optional
+        Maximum number of queued chunks in threaded mode.
+    policy : str, optional
+        Queue overflow policy in threaded mode.
+    contiguous : bool, optional
+        Pass one (channels, chunk_size) array instead of a list of arrays.
+    dtype : numpy dtype, optional
+        Data type of the contiguous block.
+
+    Returns
+    -------
+    tuple
+        Callable to invoke with each device chunk and the dispatcher that
+        must be stopped when the callback is replaced, or None.
+    """
+    if contiguous:
+        pool = BufferPool(dtype, size=queue_size + 2)
+        if threaded:
+            dispatcher = ChunkDispatcher(
+                f, maxsize=queue_size, policy=policy, release=pool.release
+            )
+            return ChunkPacker(dispatcher.put_chunk, pool, release_after=False), dispatcher
+        return ChunkPacker(f, pool), None
+    if threaded:
+        dispatcher = ChunkDispatcher(f, maxsize=queue_size, policy=policy)
+        return dispatcher.submit, dispatcher
+    return f, None
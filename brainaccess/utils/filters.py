@@ -0,0 +1,250 @@
+"""Streaming filters applied to device chunks."""
+
+import functools
+import typing
+
+import numpy as np
+from scipy import signal  # type: ignore
+
+from brainaccess.utils.exceptions import BrainAccessException
+
+# number of distinct filter designs kept by design_sos
+DESIGN_CACHE_SIZE = 64
+
+
+def design_sos(
+    sfreq: float,
+    btype: str,
+    freqs: typing.Union[float, typing.Sequence[float]],
+    order: int = 4,
+) -> np.ndarray:
+    """Butterworth filter as second-order sections, designed once per parameters.
+
+    Designs are kept in a least-recently-used cache of `DESIGN_CACHE_SIZE`
+    entries keyed by (sfreq, btype, freqs, order), so filtering repeatedly
+    with the same parameters only pays for applying the filter.
+
+    Parameters
+    ----------
+    sfreq : float
+        Sampling frequency.
+    btype : str
+        "lowpass", "highpass", "bandpass" or "bandstop".
+    freqs : float or sequence of float
+        Cutoff frequency, or low and high cutoffs of band filters.
+    order : int, optional
+        Butterworth order, by default 4.
+
+    Returns
+    -------
+    np.ndarray
+        Array of shape (sections, 6), a copy of the cached design, since
+        scipy filters do not accept read-only coefficients.
+
+    Raises
+    ------
+    BrainAccessException
+        If a frequency is outside (0, sfreq / 2) or the band is empty.
+    """
+    freqs = tuple(float(x) for x in np.atleast_1d(freqs))
+    return _design_sos(float(sfreq), btype, freqs, int(order)).copy()
+
+
+def design_cache_info() -> typing.Any:
+    """Hits, misses and size of the `design_sos` cache."""
+    return _design_sos.cache_info()
+
+
+def clear_design_cache() -> None:
+    """Empties the `design_sos` cache."""
+    _design_sos.cache_clear()
+
+
+@functools.lru_cache(maxsize=DESIGN_CACHE_SIZE)
+def _design_sos(sfreq: float, btype: str, freqs: tuple, order: int) -> np.ndarray:
+    """Cached design, arguments normalized by `design_sos`."""
+    nyquist = sfreq / 2
+    if any(x <= 0 or x >= nyquist for x in freqs) or list(freqs) != sorted(set(freqs)):
+        raise BrainAccessException(f"Invalid {btype} frequencies {list(freqs)} at {sfreq} Hz")
+    wn = freqs[0] if len(freqs) == 1 else list(freqs)
+    sos = signal.butter(order, wn, btype=btype, fs=sfreq, output="sos")
+    # shared by the cache, callers get copies
+    sos.setflags(write=False)
+    return sos
+
+
+class Decimator:
+    """Anti-aliased decimation of a chunked stream.
+
+    Signal rows are low-pass filtered with a Chebyshev type I filter, the
+    one `scipy.signal.decimate` uses, before keeping every `factor`-th
+    sample. The filter state is kept between chunks, so the output equals
+    filtering the whole stream at once.
+
+    Kept samples are chosen by device sample number (multiples of `factor`),
+    so the output stays aligned after lost packets. The sample number row
+    is divided by `factor`, the output counts samples at the output rate.
+    Other rows listed in `pick_rows`, e.g. the STREAMING channel, are only
+    subsampled.
+    """
+
+    def __init__(
+        self,
+        factor: int,
+        sample_index: int,
+        pick_rows: typing.Sequence[int] = (),
+        order: int = 8,
+    ) -> None:
+        """Designs the anti-aliasing filter.
+
+        Parameters
+        ----------
+        factor : int
+            Decimation factor.
+        sample_index : int
+            Row of the device sample numbers.
+        pick_rows : sequence of int, optional
+            Further rows that are subsampled without filtering.
+        order : int, optional
+            Order of the anti-aliasing filter, by default 8.
+
+        Raises
+        ------
+        BrainAccessException
+            If the factor is not a positive integer.
+        """
+        if int(factor) != factor or factor < 1:
+            raise BrainAccessException("Decimation factor must be a positive integer")
+        self.factor = int(factor)
+        self.sample_index = sample_index
+        self.pick_rows = sorted({sample_index, *pick_rows})
+        self.sos = signal.cheby1(order, 0.05, 0.8 / self.factor, output="sos")
+        self._zi: typing.Optional[np.ndarray] = None
+        self._rows: typing.Optional[list] = None
+
+    def reset(self) -> None:
+        """Clears the filter state, e.g. when a new stream starts."""
+        self._zi = None
+
+    def __call__(self, chunk: np.ndarray) -> np.ndarray:
+        """Filters and decimates a chunk.
+
+        Parameters
+        ----------
+        chunk : np.ndarray
+            Chunk of shape (rows, samples).
+
+        Returns
+        -------
+        np.ndarray
+            New array of shape (rows, kept samples), may have no samples.
+        """
+        chunk = np.asarray(chunk)
+        if chunk.shape[1] == 0:
+            return chunk.copy()
+        if self._rows is None or len(self._rows) + len(self.pick_rows) != len(chunk):
+            self._rows = [x for x in range(len(chunk)) if x not in self.pick_rows]
+            self._zi = None
+        signal_rows = chunk[self._rows]
+        if self._zi is None:
+            # start in steady state at the first sample, no step response
+            self._zi = (
+                signal.sosfilt_zi(self.sos)[:, None, :] * signal_rows[:, :1][None]
+            )
+        filtered, self._zi = signal.sosfilt(
+            self.sos, signal_rows, axis=1, zi=self._zi
+        )
+        keep = np.flatnonzero(chunk[self.sample_index] % self.factor == 0)
+        out = chunk[:, keep]
+        out[self._rows] = filtered[:, keep]
+        out[self.sample_index] //= self.factor
+        return out
+
+
+class FilterBank:
+    """Causal Butterworth filters of a chunked stream.
+
+    Notch (band-stop), band-pass, high-pass and low-pass sections are
+    cascaded into one second-order-section filter. The state of every
+    channel is kept between chunks, so each sample is filtered once, at a
+    cost proportional to the chunk size, and the output equals filtering
+    the whole stream at once, without edge transients at chunk or window
+    borders.
+
+    Unlike the zero-phase filters of `brainaccess.connect.processor` the
+    output is delayed by the group delay of the filters.
+    """
+
+    def __init__(
+        self,
+        sfreq: float,
+        notch: typing.Optional[typing.Tuple[float, float]] = None,
+        bandpass: typing.Optional[typing.Tuple[float, float]] = None,
+        highpass: typing.Optional[float] = None,
+        lowpass: typing.Optional[float] = None,
+        order: int = 4,
+    ) -> None:
+        """Designs the filter cascade.
+
+        Parameters
+        ----------
+        sfreq : float
+            Sampling frequency of the filtered stream.
+        notch : tuple of float, optional
+            Center frequency and width of the band to remove, e.g. (50, 2).
+        bandpass : tuple of float, optional
+            Low and high cutoff frequencies of the band to keep.
+        highpass : float, optional
+            Cutoff frequency of the high-pass filter.
+        lowpass : float, optional
+            Cutoff frequency of the low-pass filter.
+        order : int, optional
+            Butterworth order of each filter, by default 4.
+
+        Raises
+        ------
+        BrainAccessException
+            If no filter is given or a frequency is outside (0, sfreq / 2).
+        """
+        self.sfreq = float(sfreq)
+        sections = []
+        if notch is not None:
+            center, width = notch
+            band = (center - width / 2, center + width / 2)
+            sections.append(design_sos(self.sfreq, "bandstop", band, order))
+        if bandpass is not None:
+            sections.append(design_sos(self.sfreq, "bandpass", bandpass, order))
+        if highpass is not None:
+            sections.append(design_sos(self.sfreq, "highpass", highpass, order))
+        if lowpass is not None:
+            sections.append(design_sos(self.sfreq, "lowpass", lowpass, order))
+        if not sections:
+            raise BrainAccessException("No filter given")
+        self.sos = np.vstack(sections)
+        self._zi: typing.Optional[np.ndarray] = None
+
+    def reset(self) -> None:
+        """Clears the filter state, e.g. when a new stream starts."""
+        self._zi = None
+
+    def __call__(self, chunk: np.ndarray) -> np.ndarray:
+        """Filters a chunk, continuing from the previous one.
+
+        Parameters
+        ----------
+        chunk : np.ndarray
+            Chunk of shape (channels, samples).
+
+        Returns
+        -------
+        np.ndarray
+            New float64 array of the shape of the chunk.
+        """
+        chunk = np.asarray(chunk, dtype=np.float64)
+        if chunk.shape[1] == 0:
+            return chunk.copy()
+        if self._zi is None or self._zi.shape[1] != len(chunk):
+            # start in steady state at the first sample, no step response
+            self._zi = signal.sosfilt_zi(self.sos)[:, None, :] * chunk[:, :1][None]
+        filtered, self._zi = signal.sosfilt(self.sos, chunk, axis=1, zi=self._zi)
+        return filtered
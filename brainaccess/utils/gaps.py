@@ -0,0 +1,163 @@
+"""Detection of lost and zero-filled samples during ingest."""
+
+import bisect
+import typing
+
+import numpy as np
+
+
+class Gap(typing.NamedTuple):
+    """A discontinuity in the stored stream.
+
+    Attributes
+    ----------
+    position : int
+        Buffer position of the first stored sample after the gap, or of the
+        first zero-filled sample.
+    sample_number : int
+        Device sample number at that position.
+    missing : int
+        Number of samples that never arrived, 0 for zero-filled ranges.
+    zero_filled : int
+        Number of stored samples the device marked as not streamed.
+    """
+
+    position: int
+    sample_number: int
+    missing: int
+    zero_filled: int
+
+
+class GapIndex:
+    """Index of missing and zero-filled samples of a stream.
+
+    Updated with every chunk. Samples are missing when the device sample
+    numbers skip, they are zero-filled when the STREAMING channel reads 0,
+    which the device does when BLE data was lost and replaced by zeros.
+
+    Invalid stored positions are kept as sorted, merged ranges: every
+    zero-filled sample and the first sample after missing ones, since
+    nothing before it is continuous with it.
+    """
+
+    def __init__(self) -> None:
+        """Initializes an empty GapIndex object."""
+        self.gaps: typing.List[Gap] = []
+        self.samples = 0
+        self.missing_samples = 0
+        self.zero_filled_samples = 0
+        self._last: typing.Optional[float] = None
+        # invalid [start, stop) position ranges
+        self._starts: list = []
+        self._stops: list = []
+
+    def update(
+        self,
+        sample_numbers: np.ndarray,
+        streaming: typing.Optional[np.ndarray],
+        position: int,
+    ) -> None:
+        """Checks a chunk for gaps.
+
+        Parameters
+        ----------
+        sample_numbers : np.ndarray
+            Device sample numbers of the chunk.
+        streaming : np.ndarray, optional
+            STREAMING channel of the chunk, 0 where samples were zero-filled.
+        position : int
+            Buffer position of the first sample of the chunk.
+        """
+        n = len(sample_numbers)
+        if n == 0:
+            return
+        self.samples += n
+        first = sample_numbers[0]
+        last = self._last
+        self._last = sample_numbers[-1]
+        contiguous = (last is None or first == last + 1) and (
+            sample_numbers[-1] - first == n - 1
+        )
+        zero_filled = streaming is not None and not streaming.min() > 0
+        if contiguous and not zero_filled:
+            return
+        if not contiguous:
+            steps = np.diff(sample_numbers, prepend=first - 1 if last is None else last)
+            for idx in np.flatnonzero(steps != 1):
+                # a step back means the device counter restarted
+                missing = max(int(steps[idx]) - 1, 0)
+                self.missing_samples += missing
+                self.gaps.append(
+                    Gap(position + int(idx), int(sample_numbers[idx]), missing, 0)
+                )
+                self._invalidate(position + int(idx), position + int(idx) + 1)
+        if zero_filled:
+            mask = np.concatenate(([False], np.asarray(streaming) <= 0, [False]))
+            edges = np.flatnonzero(np.diff(mask.astype(np.int8)))
+            for start, stop in zip(edges[::2], edges[1::2]):
+                count = int(stop - start)
+                self.zero_filled_samples += count
+                self._invalidate(position + int(start), position + int(stop))
+                previous = self.gaps[-1] if self.gaps else None
+                if (
+                    previous is not None
+                    and previous.missing == 0
+                    and previous.position + previous.zero_filled == position + start
+                ):
+                    # a zero-filled run continued from the previous chunk
+                    self.gaps[-1] = previous._replace(
+                        zero_filled=previous.zero_filled + count
+                    )
+                    continue
+                self.gaps.append(
+                    Gap(position + int(start), int(sample_numbers[start]), 0, count)
+                )
+
+    def _invalidate(self, start: int, stop: int) -> None:
+        """Adds an invalid range, merging it with the last one if adjacent."""
+        if self._stops and start <= self._stops[-1]:
+            self._stops[-1] = max(self._stops[-1], stop)
+            return
+        self._starts.append(start)
+        self._stops.append(stop)
+
+    def mask(self, start: int, stop: int) -> np.ndarray:
+        """Validity of stored positions.
+
+        Parameters
+        ----------
+        start : int
+            First buffer position.
+        stop : int
+            Position after the last one.
+
+        Returns
+        -------
+        np.ndarray
+            Boolean array of length stop - start, False at invalid samples.
+        """
+        valid = np.ones(max(stop - start, 0), dtype=bool)
+        idx = max(bisect.bisect_right(self._starts, start) - 1, 0)
+        while idx < len(self._starts) and self._starts[idx] < stop:
+            lo = max(self._starts[idx], start)
+            hi = min(self._stops[idx], stop)
+            if hi > lo:
+                valid[lo - start : hi - start] = False
+            idx += 1
+        return valid
+
+    def stats(self) -> dict:
+        """Returns session counters.
+
+        Returns
+        -------
+        dict
+            Number of received samples, missing samples, zero-filled samples
+            and gaps.
+        """
+        return {
+            "samples": self.samples,
+            "missing_samples": self.missing_samples,
+            "zero_filled_samples": self.zero_filled_samples,
+            "gaps": len(self.gaps),
+        }
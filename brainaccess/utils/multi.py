@@ -0,0 +1,263 @@
+"""Acquisition from several devices in one process.
+
+`MultiEEG` runs one `EEG` object per device and reads windows of all
+devices as one (device, channel, time) array, aligned on the host clock
+of each device (see `brainaccess.utils.clock`).
+"""
+
+import typing
+import numpy as np
+
+import brainaccess.core as bacore
+from brainaccess.core.eeg_manager import EEGManager
+from brainaccess.utils.acquisition import EEG
+from brainaccess.utils.exceptions import BrainAccessException
+
+
+class MultiEEGWindow(typing.NamedTuple):
+    """Aligned windows returned by `MultiEEG.get_windows`.
+
+    Attributes
+    ----------
+    data : np.ndarray
+        Samples, shape (devices, channels, samples).
+    sample_numbers : np.ndarray
+        Device sample numbers, shape (devices, samples).
+    times : np.ndarray
+        Host monotonic time of each column, shared by all devices.
+    valid : np.ndarray, optional
+        Validity of each sample, shape (devices, samples), None unless
+        requested.
+    """
+
+    data: np.ndarray
+    sample_numbers: np.ndarray
+    times: np.ndarray
+    valid: typing.Optional[np.ndarray] = None
+
+
+class MultiEEG:
+    """Acquisition from several devices in one process.
+
+    Owns one `EEGManager` and one `EEG` object per device. Windows of all
+    devices are aligned on the host clock and returned as one array, so
+    analysis can run vectorized across devices.
+    """
+
+    def __init__(
+        self,
+        mode: str = "roll",
+        buffer_seconds: float = 60.0,
+        threaded_ingest: bool = True,
+        dtype: typing.Any = np.float64,
+    ) -> None:
+        """Creates MultiEEG object.
+
+        Parameters
+        ------------
+        mode: str
+            Data storage mode of every device, accumulate or roll.
+        buffer_seconds: float
+            Length of the rolling buffers in seconds.
+        threaded_ingest: bool
+            Store chunks on worker threads, see `EEG`.
+        dtype: numpy dtype
+            Storage data type of every device, see `EEG`.
+        """
+        self.mode = mode
+        self.buffer_seconds = buffer_seconds
+        self.threaded_ingest = threaded_ingest
+        self.dtype = dtype
+        self.devices: typing.Dict[str, EEG] = {}
+        self.managers: typing.Dict[str, EEGManager] = {}
+        self.sfreq: int = 250
+
+    def __enter__(self) -> "MultiEEG":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.close()
+
+    def setup(
+        self,
+        devices: typing.Union[list, dict],
+        cap: typing.Optional[dict] = None,
+        bias: typing.Optional[list] = None,
+        gain: int = 8,
+        sfreq: int = 250,
+        managers: typing.Optional[dict] = None,
+    ) -> None:
+        """Connects to all devices and sets channels.
+
+        If setting up a device fails, the devices connected so far are
+        disconnected again before the error is raised.
+
+        Parameters
+        ------------
+        devices: list or dict
+            Device names, or a dictionary mapping device names to caps.
+        cap: dict, optional
+            Cap used for devices given without one, see `EEG.setup`.
+        bias: list, optional
+            A list of channels to use for bias.
+        gain: int
+            The gain to use for the EEG channels.
+        sfreq: int
+            The sampling frequency, shared by all devices.
+        managers: dict, optional
+            Managers to use instead of new `EEGManager` objects, by device
+            name, e.g. `ReplayEEGManager` objects. These devices are not
+            scanned for. The managers are destroyed by `close`.
+
+        Raises
+        ------
+        BrainAccessException
+            If a device is not found or could not be connected.
+        """
+        if not isinstance(devices, dict):
+            devices = {name: cap for name in devices}
+        managers = dict(managers or {})
+        self.sfreq = sfreq
+        eegs = {
+            name: EEG(
+                mode=self.mode, threaded_ingest=self.threaded_ingest, dtype=self.dtype
+            )
+            for name in devices
+        }
+        zeros_at_start = int(self.buffer_seconds * sfreq) if self.mode == "roll" else 0
+        try:
+            wanted = [name for name in devices if name not in managers]
+            if wanted:
+                found = [device.name for device in bacore.scan()]
+                missing = [name for name in wanted if name not in found]
+                if missing:
+                    raise BrainAccessException(f"Devices not found: {missing}")
+            for name, device_cap in devices.items():
+                mgr = managers.pop(name, None) or EEGManager()
+                self.managers[name] = mgr
+                self.devices[name] = eegs[name]
+                kwargs: dict = {"cap": device_cap} if device_cap else {}
+                eegs[name].setup(
+                    mgr,
+                    device_name=name,
+                    zeros_at_start=zeros_at_start,
+                    bias=bias,
+                    gain=gain,
+                    sfreq=sfreq,
+                    scan=False,
+                    **kwargs,
+                )
+        except Exception:
+            # disconnect the devices set up so far and release the core
+            for name in devices:
+                mgr = self.managers.pop(name, None)
+                if mgr is not None:
+                    mgr.destroy()
+                self.devices.pop(name, None)
+                eegs[name].close()
+            raise
+
+    def start_acquisition(self) -> None:
+        """Starts streaming on all devices."""
+        for eeg in self.devices.values():
+            eeg.start_acquisition()
+
+    def stop_acquisition(self) -> None:
+        """Stops streaming on all devices."""
+        for eeg in self.devices.values():
+            eeg.stop_acquisition()
+
+    def annotate(self, msg: str) -> None:
+        """Adds an annotation to the data stream of every device.
+        Parameters
+        ----------
+        msg: str
+            annotation to send
+        """
+        for eeg in self.devices.values():
+            eeg.annotate(msg)
+
+    def close(self) -> None:
+        """Disconnects all devices and releases the core library."""
+        for mgr in self.managers.values():
+            mgr.destroy()
+        for eeg in self.devices.values():
+            eeg.close()
+        self.managers = {}
+        self.devices = {}
+
+    def get_windows(
+        self,
+        seconds: typing.Optional[float] = None,
+        samples: typing.Optional[int] = None,
+        channels: typing.Optional[list] = None,
+        mask: bool = False,
+    ) -> MultiEEGWindow:
+        """Return the newest samples of all devices aligned on the host clock.
+
+        Every window ends at the newest host time covered by all devices, so
+        columns with the same index were sampled at the same host time within
+        one sample period. Host times of samples come from the drift and
+        jitter corrected clock of each device (`EEG.clock`). Windows are
+        shortened to the shortest device.
+
+        Parameters
+        ----------
+        seconds: float, optional
+            Window length in seconds.
+        samples: int, optional
+            Window length in samples.
+        channels: list, optional
+            Channel names to include, the EEG channels of each device if None.
+        mask: bool
+            Also return the validity of each sample, see `EEG.get_gaps`.
+
+        Returns
+        -------
+        MultiEEGWindow
+            Data of shape (devices, channels, samples) in `devices` order.
+
+        Raises
+        ------
+        BrainAccessException
+            If a device has no data yet or the channel counts differ.
+        """
+        if seconds:
+            samples = int(seconds * self.sfreq)
+        ends = {}
+        for name, eeg in self.devices.items():
+            with eeg.lock:
+                ends[name] = eeg.clock.last_time
+            if ends[name] is None:
+                raise BrainAccessException(f"No data from device {name}")
+        until = min(ends.values())
+        windows = []
+        for eeg in self.devices.values():
+            names = channels
+            if names is None:
+                names = [
+                    name
+                    for key, name in eeg.eeg_channels.items()
+                    if eeg.channels_type[key] == "EEG"
+                ]
+            windows.append(
+                eeg.data.window(
+                    samples, eeg._channel_rows(names), until=until, mask=mask
+                )
+            )
+        if len({window.data.shape[0] for window in windows}) > 1:
+            raise BrainAccessException("Devices have different channel counts")
+        length = min(window.data.shape[1] for window in windows)
+        data = np.stack([window.data[:, window.data.shape[1] - length :]
+                         for window in windows])
+        sample_numbers = np.stack(
+            [window.sample_numbers[len(window.sample_numbers) - length :]
+             for window in windows]
+        )
+        valid = None
+        if mask:
+            valid = np.stack(
+                [window.valid[len(window.valid) - length :] for window in windows]
+            )
+        times = until - np.arange(length - 1, -1, -1) / self.sfreq
+        return MultiEEGWindow(data, sample_numbers, times, valid)
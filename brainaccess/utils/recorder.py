@@ -0,0 +1,359 @@
+"""Incremental session recording.
+
+`SessionRecorder` writes a running acquisition to disk every few seconds
+from a background thread. The file is append-only:
+
+- a header with the channel layout,
+- data blocks holding consecutive samples of all chunk rows, followed by
+  the sample numbers in float64, exact in any storage type,
+- annotation blocks holding device annotations,
+- on a clean stop, an index of all blocks followed by a trailer.
+
+Every block carries its length and a CRC32 checksum. When the trailer is
+missing, e.g. after a crash, `read_session` scans the blocks and keeps all
+complete ones, so at most the last flush interval is lost. `export_fif`
+converts a recording to FIF.
+"""
+
+import collections
+import json
+import os
+import struct
+import threading
+import typing
+import zlib
+
+import mne  # type: ignore
+import numpy as np
+
+from brainaccess.utils.exceptions import BrainAccessException
+
+MAGIC = b"BAREC001"
+TRAILER_MAGIC = b"BARECEND"
+DATA = b"D"
+ANNOTATIONS = b"A"
+INDEX = b"I"
+# block type, payload length, CRC32 of the payload
+_BLOCK = struct.Struct("<cII")
+# position of the first sample, number of samples
+_DATA = struct.Struct("<qI")
+# index offset
+_TRAILER = struct.Struct("<Q")
+
+
+class Session(typing.NamedTuple):
+    """Recording read back by `read_session`.
+
+    Attributes
+    ----------
+    header : dict
+        Channel names and types, sampling frequency and chunk rows.
+    data : np.ndarray
+        Samples in channel order, shape (channels, samples).
+    annotations : list
+        (device sample number, description) pairs.
+    complete : bool
+        False if the recording was not stopped cleanly.
+    sample_numbers : np.ndarray, optional
+        Device sample number of each sample in float64, the sample row of
+        the data can be rounded in float32 recordings.
+    """
+
+    header: dict
+    data: np.ndarray
+    annotations: list
+    complete: bool
+    sample_numbers: typing.Optional[np.ndarray] = None
+
+
+class SessionRecorder:
+    """Writes chunks and annotations of an `EEG` object to disk while streaming.
+
+    Chunks are copied into a queue by a listener on the ingest thread and
+    written by a background thread every `interval` seconds, so disk writes
+    never block the chunk callback. At most `max_pending` chunks are queued,
+    when the disk does not keep up newer chunks are dropped and counted in
+    `dropped_chunks`.
+
+    Start the recorder after `EEG.start_acquisition`, once the chunk layout
+    is known.
+    """
+
+    def __init__(
+        self, eeg, path: str, interval: float = 2.0, max_pending: int = 1024
+    ) -> None:
+        """Initializes the SessionRecorder object.
+
+        Parameters
+        ----------
+        eeg : EEG
+            Acquisition to record.
+        path : str
+            File to write, an existing file is overwritten.
+        interval : float, optional
+            Seconds between flushes to disk, by default 2.
+        max_pending : int, optional
+            Maximum number of chunks waiting to be written, by default 1024.
+        """
+        self.eeg = eeg
+        self.path = str(path)
+        self.interval = interval
+        self.max_pending = max_pending
+        self.written_samples = 0
+        self.dropped_chunks = 0
+        self._pending: collections.deque = collections.deque()
+        self._annotations_seen = 0
+        self._index: list = []
+        self._file: typing.Optional[typing.BinaryIO] = None
+        self._stop = threading.Event()
+        self._thread: typing.Optional[threading.Thread] = None
+        self._dtype = np.dtype("<f8")
+
+    def __enter__(self) -> "SessionRecorder":
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.stop()
+
+    @property
+    def pending(self) -> int:
+        """Number of chunks waiting to be written."""
+        return len(self._pending)
+
+    def start(self) -> None:
+        """Writes the header and starts recording.
+
+        Raises
+        ------
+        BrainAccessException
+            If the recorder is already running.
+        """
+        if self._thread is not None:
+            raise BrainAccessException("Recorder already running")
+        info = self.eeg.info
+        self._dtype = self.eeg.data.data.dtype.newbyteorder("<")
+        header = {
+            "ch_names": info.ch_names,
+            "ch_types": info.get_channel_types(),
+            "sfreq": info["sfreq"],
+            "rows": [int(x) for x in self.eeg.channels_indexes.values()],
+            "sample_index": int(self.eeg.data.sample_index),
+            "chans": int(self.eeg.chans),
+            "dtype": self._dtype.str,
+            "sample_numbers": "<f8",
+        }
+        payload = json.dumps(header).encode()
+        self._file = open(self.path, "wb")
+        self._file.write(MAGIC + struct.pack("<I", len(payload)) + payload)
+        self._stop.clear()
+        self.eeg.add_chunk_listener(self._on_chunk)
+        self._thread = threading.Thread(
+            target=self._run, name="brainaccess-recorder", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Writes the remaining data and the index, then closes the file."""
+        if self._thread is None:
+            return
+        self.eeg.remove_chunk_listener(self._on_chunk)
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+        self._flush()
+        offset = self._file.tell()
+        self._write_block(INDEX, json.dumps(self._index).encode())
+        self._file.write(_TRAILER.pack(offset) + TRAILER_MAGIC)
+        self._file.close()
+        self._file = None
+
+    def _on_chunk(self, chunk, chunk_size: int) -> None:
+        """Queues a copy of the chunk, runs on the ingest thread."""
+        if len(self._pending) >= self.max_pending:
+            # the writer is stalled, drop instead of growing without bound
+            self.dropped_chunks += 1
+            return
+        sample_numbers = np.array(chunk[self.eeg.data.sample_index], dtype="<f8")
+        self._pending.append((np.array(chunk, dtype=self._dtype), sample_numbers))
+
+    def _run(self) -> None:
+        """Flushes queued data every interval until stopped."""
+        while not self._stop.wait(self.interval):
+            self._flush()
+
+    def _flush(self) -> None:
+        """Writes queued chunks and new annotations and syncs the file."""
+        chunks = []
+        while self._pending:
+            chunks.append(self._pending.popleft())
+        if chunks:
+            data = np.concatenate([chunk for chunk, _ in chunks], axis=1)
+            sample_numbers = np.concatenate([numbers for _, numbers in chunks])
+            payload = (
+                _DATA.pack(self.written_samples, data.shape[1])
+                + data.tobytes()
+                + sample_numbers.tobytes()
+            )
+            self._write_block(DATA, payload, self.written_samples, data.shape[1])
+            self.written_samples += data.shape[1]
+        try:
+            annotations = self.eeg.mgr.get_annotations()
+        except Exception:
+            annotations = {}
+        timestamps = annotations.get("timestamps", [])
+        if len(timestamps) < self._annotations_seen:
+            # history was cleared on the device
+            self._annotations_seen = 0
+        # stored sample numbers count decimated samples
+        new = [
+            (timestamp // self.eeg.decimation, description)
+            for timestamp, description in zip(
+                timestamps[self._annotations_seen :],
+                annotations.get("annotations", [])[self._annotations_seen :],
+            )
+        ]
+        if new:
+            self._write_block(ANNOTATIONS, json.dumps(new).encode())
+            self._annotations_seen = len(timestamps)
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def _write_block(
+        self, kind: bytes, payload: bytes, position: int = 0, samples: int = 0
+    ) -> None:
+        """Appends one block and records it in the index."""
+        self._index.append([self._file.tell(), kind.decode(), position, samples])
+        self._file.write(_BLOCK.pack(kind, len(payload), zlib.crc32(payload)))
+        self._file.write(payload)
+
+
+def _read_blocks(f: typing.BinaryIO, start: int, end: int) -> typing.Iterator:
+    """Yields (type, payload) of complete blocks between two offsets."""
+    f.seek(start)
+    while f.tell() + _BLOCK.size <= end:
+        kind, length, crc = _BLOCK.unpack(f.read(_BLOCK.size))
+        payload = f.read(length)
+        if len(payload) < length or zlib.crc32(payload) != crc:
+            # truncated by a crash
+            return
+        yield kind, payload
+
+
+def read_session(path: str) -> Session:
+    """Reads a recording written by `SessionRecorder`.
+
+    Parameters
+    ----------
+    path : str
+        Recording file.
+
+    Returns
+    -------
+    Session
+        Header, samples in channel order, annotations and sample numbers.
+        Recordings without a float64 sample number copy take the sample
+        numbers from the data.
+
+    Raises
+    ------
+    BrainAccessException
+        If the file is not a recording.
+    """
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise BrainAccessException(f"{path} is not a session recording")
+        (length,) = struct.unpack("<I", f.read(4))
+        header = json.loads(f.read(length))
+        start = f.tell()
+        f.seek(0, os.SEEK_END)
+        end = f.tell()
+        complete = False
+        if end - start >= _TRAILER.size + len(TRAILER_MAGIC):
+            f.seek(end - len(TRAILER_MAGIC))
+            if f.read(len(TRAILER_MAGIC)) == TRAILER_MAGIC:
+                f.seek(end - len(TRAILER_MAGIC) - _TRAILER.size)
+                (end,) = _TRAILER.unpack(f.read(_TRAILER.size))
+                complete = True
+        chunks = []
+        numbers = []
+        annotations: list = []
+        for kind, payload in _read_blocks(f, start, end):
+            if kind == DATA:
+                _, samples = _DATA.unpack_from(payload)
+                count = header["chans"] * samples
+                data = np.frombuffer(
+                    payload, dtype=header["dtype"], count=count, offset=_DATA.size
+                )
+                chunks.append(data.reshape(header["chans"], samples))
+                if "sample_numbers" in header:
+                    numbers.append(
+                        np.frombuffer(
+                            payload,
+                            dtype=header["sample_numbers"],
+                            count=samples,
+                            offset=_DATA.size + data.nbytes,
+                        )
+                    )
+            elif kind == ANNOTATIONS:
+                annotations.extend(tuple(x) for x in json.loads(payload))
+    if chunks:
+        data = np.concatenate(chunks, axis=1)
+    else:
+        data = np.zeros((header["chans"], 0))
+    if numbers:
+        sample_numbers = np.concatenate(numbers).astype(np.float64)
+    else:
+        sample_numbers = data[header["sample_index"]].astype(np.float64)
+    return Session(header, data[header["rows"]], annotations, complete, sample_numbers)
+
+
+def session_to_mne(path: str) -> mne.io.RawArray:
+    """Loads a recording as an MNE Raw object with annotations.
+
+    Parameters
+    ----------
+    path : str
+        Recording file.
+
+    Returns
+    -------
+    mne.io.RawArray
+        Recorded data, annotation onsets relative to the first sample. An
+        annotation is placed at the first written sample at or after its
+        sample number, so onsets stay correct after lost samples.
+    """
+    from brainaccess.utils.acquisition import _standard_montage
+
+    session = read_session(path)
+    header = session.header
+    info = mne.create_info(
+        header["ch_names"], ch_types=header["ch_types"], sfreq=header["sfreq"]
+    )
+    info.set_montage(_standard_montage())
+    data = np.array(session.data, dtype=np.float64)
+    numbers = session.sample_numbers
+    if header["sample_index"] in header["rows"]:
+        data[header["rows"].index(header["sample_index"])] = numbers
+    raw = mne.io.RawArray(data, info, verbose=False)
+    if session.annotations and session.data.shape[1]:
+        positions = np.searchsorted(numbers, [x[0] for x in session.annotations])
+        onset = np.minimum(positions, len(numbers) - 1) / header["sfreq"]
+        description = [x[1] for x in session.annotations]
+        raw.set_annotations(
+            mne.Annotations(onset, np.zeros(len(onset)), description), verbose=False
+        )
+    return raw
+
+
+def export_fif(path: str, fname: str) -> None:
+    """Converts a recording to a FIF file.
+
+    Parameters
+    ----------
+    path : str
+        Recording file.
+    fname : str
+        FIF file to write, overwritten if it exists.
+    """
+    session_to_mne(path).save(fname, overwrite=True, fmt="double", verbose=False)
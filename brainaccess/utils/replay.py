@@ -0,0 +1,639 @@
+"""Simulated device that replays recorded sessions.
+
+`ReplayEEGManager` implements the part of the `EEGManager` API used by
+`EEG`, so acquisition code can run and be benchmarked without a headset:
+
+    mgr = ReplayEEGManager("hotb_starter_code/gojdatests/dura.fif", speed=10)
+    eeg = EEG()
+    eeg.setup(mgr, device_name="replay", cap=cap, scan=False)
+
+Recordings are FIF files saved by `EEG` or CSV exports with one column per
+channel. Values are replayed unchanged.
+"""
+
+import bisect
+import pathlib
+import threading
+import time
+import typing
+
+import mne
+import numpy as np
+import pandas as pd
+
+import brainaccess.core.eeg_channel as eeg_channel
+from brainaccess.core.battery_info import BatteryInfo
+from brainaccess.core.device_features import DeviceFeatures
+from brainaccess.core.device_info import DeviceInfo
+from brainaccess.core.device_model import DeviceModel
+from brainaccess.utils.dispatch import ChunkDispatcher, make_chunk_callback
+from brainaccess.utils.exceptions import BrainAccessException
+
+# CSV columns that are not electrode measurements
+_CSV_SPECIAL = {"time", "Sample", "Streaming", "Battery"}
+
+
+def _device_model(electrodes: int) -> DeviceModel:
+    """Smallest device model with enough electrodes."""
+    if electrodes <= 4:
+        return DeviceModel.HALO
+    if electrodes <= 8:
+        return DeviceModel.MINI
+    if electrodes <= 16:
+        return DeviceModel.MIDI
+    return DeviceModel.MAXI
+
+
+class Recording(typing.NamedTuple):
+    """Recorded session prepared for replay.
+
+    Attributes
+    ----------
+    sfreq : float
+        Sampling frequency.
+    electrodes : dict
+        Electrode name to 1D data.
+    channels : dict
+        Device channel id to 1D data for non electrode channels.
+    samples : np.ndarray
+        Device sample numbers.
+    annotations : list
+        (sample position, description) pairs.
+    battery : int
+        Battery level reported by the simulated device.
+    """
+
+    sfreq: float
+    electrodes: dict
+    channels: dict
+    samples: np.ndarray
+    annotations: list
+    battery: int
+
+
+def load_recording(source: typing.Union[str, pathlib.Path, mne.io.BaseRaw]) -> Recording:
+    """Loads a FIF or CSV recording for replay.
+
+    Parameters
+    ----------
+    source : str, pathlib.Path or mne.io.BaseRaw
+        Path to a .fif or .csv file, or a loaded MNE Raw object.
+
+    Returns
+    -------
+    Recording
+        Recording data.
+
+    Raises
+    ------
+    BrainAccessException
+        If the file type is not supported.
+    """
+    if isinstance(source, mne.io.BaseRaw):
+        return _from_raw(source)
+    path = pathlib.Path(source)
+    if path.suffix == ".fif":
+        return _from_raw(mne.io.read_raw_fif(path, preload=True, verbose=False))
+    if path.suffix == ".csv":
+        return _from_csv(path)
+    raise BrainAccessException(f"Unsupported recording type {path.suffix}")
+
+
+def _from_raw(raw: mne.io.BaseRaw) -> Recording:
+    """Recording from an MNE Raw object saved by `EEG`."""
+    data = raw.get_data()
+    names = raw.info["ch_names"]
+    types = raw.get_channel_types()
+    electrodes = {}
+    channels = {}
+    samples = np.arange(raw.n_times, dtype=np.float64)
+    for idx, (name, kind) in enumerate(zip(names, types)):
+        if kind == "eeg":
+            electrodes[name] = data[idx]
+        elif name == "Sample":
+            samples = data[idx]
+        elif name == "Streaming":
+            channels[eeg_channel.STREAMING] = data[idx]
+        elif name.startswith("Accel_"):
+            axis = "xyz".index(name[-1])
+            channels[eeg_channel.ACCELEROMETER + axis] = data[idx]
+    sfreq = raw.info["sfreq"]
+    annotations = [
+        (int(round((onset - raw.first_time) * sfreq)), description)
+        for onset, description in zip(
+            raw.annotations.onset, raw.annotations.description
+        )
+    ]
+    return Recording(sfreq, electrodes, channels, samples, annotations, 100)
+
+
+def _from_csv(path: pathlib.Path) -> Recording:
+    """Recording from a CSV export with time, channel and Sample columns."""
+    df = pd.read_csv(path, index_col=0)
+    if "time" in df and len(df) > 1:
+        sfreq = float(round(1 / np.median(np.diff(df["time"].to_numpy()))))
+    else:
+        sfreq = 250.0
+    electrodes = {}
+    channels = {}
+    for name in df.columns:
+        if name in _CSV_SPECIAL or name.startswith("contact_"):
+            continue
+        if name.startswith("Accel_"):
+            axis = "xyz".index(name[-1])
+            channels[eeg_channel.ACCELEROMETER + axis] = df[name].to_numpy(float)
+        else:
+            electrodes[name] = df[name].to_numpy(float)
+    for idx, name in enumerate(electrodes):
+        if f"contact_{name}" in df:
+            channels[eeg_channel.ELECTRODE_CONTACT + idx] = df[
+                f"contact_{name}"
+            ].to_numpy(float)
+    if "Streaming" in df:
+        channels[eeg_channel.STREAMING] = df["Streaming"].to_numpy(float)
+    if "Sample" in df:
+        samples = df["Sample"].to_numpy(float)
+    else:
+        samples = np.arange(len(df), dtype=np.float64)
+    battery = int(df["Battery"].iloc[-1]) if "Battery" in df and len(df) else 100
+    return Recording(sfreq, electrodes, channels, samples, [], battery)
+
+
+class ReplayEEGManager:
+    """Drop-in replacement for `EEGManager` replaying a recording.
+
+    Chunks are delivered from a background thread like the native library
+    does. Electrode channels are taken from the recording by name: electrode
+    `n` of the cap replays the recording channel with the cap's name, or the
+    n-th electrode of the recording when no cap is given. Enabled channels
+    missing from the recording are streamed as zeros, except STREAMING,
+    which then marks every sample as valid.
+
+    Faults can be injected to test error handling: `packet_loss` drops
+    random chunks (their sample numbers are skipped, or the samples are
+    zero-filled with `zero_fill`, as with a real device),
+    `disconnect_after` and `inject_disconnect` end the connection and call
+    the disconnect callback.
+    """
+
+    def __init__(
+        self,
+        source: typing.Union[str, pathlib.Path, mne.io.BaseRaw],
+        speed: typing.Optional[float] = 1.0,
+        chunk_size: int = 10,
+        cap: typing.Optional[dict] = None,
+        loop: bool = False,
+        packet_loss: float = 0.0,
+        disconnect_after: typing.Optional[float] = None,
+        zero_fill: bool = False,
+        device_model: typing.Optional[DeviceModel] = None,
+        seed: typing.Optional[int] = None,
+    ) -> None:
+        """Loads the recording.
+
+        Parameters
+        ----------
+        source : str, pathlib.Path or mne.io.BaseRaw
+            Recording to replay, see `load_recording`.
+        speed : float, optional
+            Replay speed relative to real time, by default 1.0. None replays
+            as fast as possible.
+        chunk_size : int, optional
+            Samples per chunk, by default 10.
+        cap : dict, optional
+            Electrode number to recording channel name, normally the cap
+            passed to `EEG.setup`.
+        loop : bool, optional
+            Restart from the beginning at the end of the recording instead
+            of stopping the stream.
+        packet_loss : float, optional
+            Probability of dropping each chunk, by default 0.
+        disconnect_after : float, optional
+            Disconnect after this many seconds of replayed data.
+        zero_fill : bool, optional
+            Deliver dropped chunks as zeros with the STREAMING channel at 0,
+            as the device does after lost BLE data, instead of skipping them.
+        device_model : DeviceModel, optional
+            Reported device model, chosen from the electrode count if None.
+        seed : int, optional
+            Seed of the packet loss generator.
+
+        Raises
+        ------
+        BrainAccessException
+            If the recording cannot be loaded or an option is invalid.
+        """
+        if chunk_size < 1:
+            raise BrainAccessException("Chunk size must be positive")
+        if speed is not None and speed <= 0:
+            raise BrainAccessException("Replay speed must be positive")
+        if not 0 <= packet_loss < 1:
+            raise BrainAccessException("Packet loss must be in [0, 1)")
+        try:
+            self.recording = load_recording(source)
+        except BrainAccessException:
+            raise
+        except Exception as e:
+            # empty or corrupt files fail inside the readers
+            raise BrainAccessException(f"Could not load recording {source}: {e}")
+        self.speed = speed
+        self.chunk_size = chunk_size
+        self.loop = loop
+        self.packet_loss = packet_loss
+        self.disconnect_after = disconnect_after
+        self.zero_fill = zero_fill
+        self.dropped_chunks = 0
+        self.device_name: typing.Optional[str] = None
+        names = list(self.recording.electrodes)
+        if cap is None:
+            cap = dict(enumerate(names))
+        self.cap = cap
+        self.device_model = device_model or _device_model(
+            max(len(names), max(cap, default=-1) + 1)
+        )
+        self._rng = np.random.default_rng(seed)
+        self._connected = False
+        self._enabled: set = set()
+        self._layout: list = []
+        self._annotations: list = []
+        self._annotations_mtx = threading.Lock()
+        self._position = 0
+        self._callback_chunk_mtx = threading.Lock()
+        self._callback_chunk: typing.Optional[typing.Callable] = None
+        self._chunk_dispatcher: typing.Optional[ChunkDispatcher] = None
+        self._callback_disconnect: typing.Callable = lambda: None
+        self._stop = threading.Event()
+        self._thread: typing.Optional[threading.Thread] = None
+
+    def __enter__(self) -> "ReplayEEGManager":
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.destroy()
+
+    def destroy(self) -> None:
+        """Stops the replay and the chunk queue."""
+        self.disconnect()
+        with self._callback_chunk_mtx:
+            if self._chunk_dispatcher is not None:
+                self._chunk_dispatcher.stop()
+                self._chunk_dispatcher = None
+
+    def connect(self, bt_device_name: str) -> int:
+        """Connects to the simulated device, any name is accepted.
+
+        Parameters
+        ----------
+        bt_device_name : str
+            Device name reported back by the manager.
+
+        Returns
+        -------
+        int
+            Always 0.
+        """
+        self.device_name = bt_device_name
+        self._connected = True
+        return 0
+
+    def disconnect(self) -> None:
+        """Stops the replay and disconnects."""
+        self._halt()
+        self._connected = False
+        self.clear_annotations()
+
+    def inject_disconnect(self) -> None:
+        """Simulates a lost connection.
+
+        The replay stops and the disconnect callback is called, as when a
+        device goes out of range.
+        """
+        self.disconnect()
+        self._callback_disconnect()
+
+    def is_connected(self) -> bool:
+        """Checks if the simulated device is connected."""
+        return self._connected
+
+    def is_streaming(self) -> bool:
+        """Checks if the replay is running."""
+        return self._thread is not None and self._thread.is_alive()
+
+    def start_stream(self, callback: typing.Optional[typing.Callable] = None) -> bool:
+        """Starts replaying the recording from the beginning.
+
+        Parameters
+        ----------
+        callback : callable, optional
+            Called once the stream has started.
+
+        Returns
+        -------
+        bool
+            True if the stream was started.
+
+        Raises
+        ------
+        BrainAccessException
+            If not connected or the stream is already running.
+        """
+        if not self._connected:
+            raise BrainAccessException("Device not connected")
+        if self.is_streaming():
+            raise BrainAccessException("Stream already running")
+        self._layout = sorted(self._enabled)
+        self._position = 0
+        self._stop.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="brainaccess-replay", daemon=True
+        )
+        self._thread.start()
+        if callback is not None:
+            callback()
+        return True
+
+    def stop_stream(self, callback: typing.Optional[typing.Callable] = None) -> bool:
+        """Stops the replay.
+
+        Parameters
+        ----------
+        callback : callable, optional
+            Called once the stream has stopped.
+
+        Returns
+        -------
+        bool
+            True if the stream was stopped.
+
+        Raises
+        ------
+        BrainAccessException
+            If the stream is not running.
+        """
+        if not self.is_streaming():
+            raise BrainAccessException("Stream not running")
+        self._halt()
+        if callback is not None:
+            callback()
+        return True
+
+    def _halt(self) -> None:
+        """Stops the replay thread and resets the channel settings."""
+        self._stop.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join()
+        self._thread = None
+        self._enabled = set()
+
+    def load_config(self, callback: typing.Optional[typing.Callable] = None) -> None:
+        """Accepts the configuration, nothing is sent anywhere."""
+        if callback is not None:
+            callback()
+
+    def get_battery_info(self) -> BatteryInfo:
+        """Battery level stored in the recording, 100 if unknown."""
+        return BatteryInfo(level=self.recording.battery)
+
+    def set_channel_enabled(self, channel: int, state: bool) -> None:
+        """Enables or disables a channel for the next stream.
+
+        Parameters
+        ----------
+        channel : int
+            The ID of the channel.
+        state : bool
+            True to enable the channel.
+        """
+        if state:
+            self._enabled.add(channel)
+        else:
+            self._enabled.discard(channel)
+
+    def set_channel_gain(self, channel: int, gain: typing.Any) -> None:
+        """Accepted for compatibility, recorded data is not rescaled."""
+
+    def set_channel_bias(self, channel: int, bias: typing.Any) -> None:
+        """Accepted for compatibility, has no effect."""
+
+    def set_impedance_mode(self, mode: typing.Any) -> None:
+        """Accepted for compatibility, has no effect."""
+
+    def set_sample_rate(self, sample_rate: int) -> bool:
+        """Checks the requested rate against the recording.
+
+        Parameters
+        ----------
+        sample_rate : int
+            The requested sampling rate.
+
+        Raises
+        ------
+        BrainAccessException
+            If the rate differs from the recording, which is not resampled.
+        """
+        if sample_rate != self.recording.sfreq:
+            raise BrainAccessException(
+                f"Recording was sampled at {self.recording.sfreq:g} Hz"
+            )
+        return True
+
+    def get_sample_frequency(self) -> int:
+        """Sampling frequency of the recording."""
+        return int(self.recording.sfreq)
+
+    def get_device_info(self) -> DeviceInfo:
+        """Device information of the simulated device."""
+        info = DeviceInfo()
+        info.device_model = self.device_model
+        info.sample_per_packet = self.chunk_size
+        return info
+
+    def get_device_features(self) -> DeviceFeatures:
+        """Features of the simulated device model."""
+        return DeviceFeatures(self.get_device_info())
+
+    def get_channel_index(self, channel: int) -> int:
+        """Gets the index of a channel within the replayed chunks.
+
+        Parameters
+        ----------
+        channel : int
+            The ID of the channel.
+
+        Returns
+        -------
+        int
+            Row of the channel in the chunk.
+
+        Raises
+        ------
+        BrainAccessException
+            If the channel is not streaming.
+        """
+        try:
+            return self._layout.index(channel)
+        except ValueError:
+            raise BrainAccessException(
+                "Channel does not exist or is not currently streaming"
+            )
+
+    def set_callback_chunk(
+        self,
+        f: typing.Optional[typing.Callable],
+        threaded: bool = False,
+        queue_size: int = 64,
+        policy: str = "drop_oldest",
+        contiguous: bool = False,
+        dtype: typing.Any = np.float64,
+    ) -> None:
+        """Sets the chunk callback, see `EEGManager.set_callback_chunk`."""
+        with self._callback_chunk_mtx:
+            if self._chunk_dispatcher is not None:
+                self._chunk_dispatcher.stop()
+                self._chunk_dispatcher = None
+            if f is None:
+                self._callback_chunk = None
+            else:
+                self._callback_chunk, self._chunk_dispatcher = make_chunk_callback(
+                    f, threaded, queue_size, policy, contiguous, dtype
+                )
+
+    def get_chunk_queue_stats(self) -> dict:
+        """Returns counters of the threaded chunk queue, see `EEGManager`."""
+        with self._callback_chunk_mtx:
+            if self._chunk_dispatcher is None:
+                return {}
+            return self._chunk_dispatcher.stats()
+
+    def set_callback_battery(self, callback: typing.Optional[typing.Callable] = None) -> None:
+        """Accepted for compatibility, the battery level does not change."""
+
+    def set_callback_disconnect(
+        self, callback: typing.Optional[typing.Callable] = None
+    ) -> None:
+        """Sets the function called when a disconnect is injected."""
+        self._callback_disconnect = callback if callback is not None else lambda: None
+
+    def annotate(self, annotation: str) -> None:
+        """Adds an annotation at the current replay position.
+
+        Parameters
+        ----------
+        annotation : str
+            The text of the annotation.
+
+        Raises
+        ------
+        BrainAccessException
+            If the annotation is None or empty.
+        """
+        if annotation is None:
+            raise BrainAccessException("Annotation cannot be None")
+        if len(annotation) == 0:
+            raise BrainAccessException("Annotation cannot be empty")
+        with self._annotations_mtx:
+            self._annotations.append((self._sample_number(self._position), annotation))
+
+    def get_annotations(self) -> dict:
+        """Annotations made so far, including the recorded ones replayed."""
+        with self._annotations_mtx:
+            return {
+                "annotations": [x[1] for x in self._annotations],
+                "timestamps": [x[0] for x in self._annotations],
+            }
+
+    def clear_annotations(self) -> None:
+        """Clears all existing annotations."""
+        with self._annotations_mtx:
+            self._annotations = []
+
+    def _sample_number(self, position: int) -> int:
+        """Device sample number at an absolute replay position."""
+        samples = self.recording.samples
+        n = len(samples)
+        if n == 0:
+            return position
+        if not self.loop:
+            position = min(position, n - 1)
+        loops, idx = divmod(position, n)
+        span = samples[-1] - samples[0] + 1
+        return int(samples[idx] + loops * span)
+
+    def _rows(self) -> list:
+        """Recorded data of each streamed channel, in chunk order."""
+        n = len(self.recording.samples)
+        rows = []
+        for channel in self._layout:
+            if channel == eeg_channel.SAMPLE_NUMBER:
+                rows.append(None)
+            elif channel == eeg_channel.STREAMING:
+                # recorded zero-filled samples stay invalid, all valid otherwise
+                rows.append(self.recording.channels.get(channel, np.ones(n)))
+            elif (
+                eeg_channel.ELECTRODE_MEASUREMENT
+                <= channel
+                < eeg_channel.ELECTRODE_CONTACT_P
+            ):
+                name = self.cap.get(channel - eeg_channel.ELECTRODE_MEASUREMENT)
+                rows.append(self.recording.electrodes.get(name, np.zeros(n)))
+            else:
+                rows.append(self.recording.channels.get(channel, np.zeros(n)))
+        return rows
+
+    def _run(self) -> None:
+        """Replay loop delivering chunks at the configured speed."""
+        rows = self._rows()
+        samples = self.recording.samples
+        n = len(samples)
+        span = samples[-1] - samples[0] + 1 if n else 0
+        recorded = sorted(self.recording.annotations)
+        onsets = [x[0] for x in recorded]
+        sfreq = self.recording.sfreq
+        stop_at = None
+        if self.disconnect_after is not None:
+            stop_at = int(self.disconnect_after * sfreq)
+        start = time.monotonic()
+        while not self._stop.is_set():
+            position = self._position
+            if n == 0 or (not self.loop and position >= n):
+                break
+            if stop_at is not None and position >= stop_at:
+                # disconnect joins this thread, run it elsewhere
+                threading.Thread(target=self.inject_disconnect, daemon=True).start()
+                break
+            loops, idx = divmod(position, n)
+            size = min(self.chunk_size, n - idx)
+            if self.speed is not None:
+                delay = start + (position + size) / (sfreq * self.speed)
+                delay -= time.monotonic()
+                if delay > 0 and self._stop.wait(delay):
+                    break
+            self._position = position + size
+            lo = bisect.bisect_left(onsets, idx)
+            hi = bisect.bisect_left(onsets, idx + size, lo)
+            if hi > lo:
+                with self._annotations_mtx:
+                    for onset, description in recorded[lo:hi]:
+                        self._annotations.append(
+                            (int(samples[onset] + loops * span), description)
+                        )
+            lost = self.packet_loss and self._rng.random() < self.packet_loss
+            if lost:
+                self.dropped_chunks += 1
+                if not self.zero_fill:
+                    continue
+            chunk = [
+                row[idx : idx + size]
+                if row is not None
+                else samples[idx : idx + size] + loops * span
+                for row in rows
+            ]
+            if lost:
+                chunk = [
+                    row if channel == eeg_channel.SAMPLE_NUMBER else np.zeros(size)
+                    for channel, row in zip(self._layout, chunk)
+                ]
+            with self._callback_chunk_mtx:
+                if self._callback_chunk is not None:
+                    self._callback_chunk(chunk, size)
@@ -0,0 +1,198 @@
+"""Analysis callbacks triggered by the number of stored samples."""
+
+import threading
+import time
+import traceback
+import typing
+
+from brainaccess.utils.exceptions import BrainAccessException
+
+
+class WindowScheduler:
+    """Runs analysis callbacks on sliding windows every `hop` samples.
+
+    Ticks are counted in stored samples, not wall-clock time: tick k fires
+    when `k * hop` samples were stored after `start`, and its window holds
+    the `length` samples ending exactly there. Consecutive windows therefore
+    overlap by exactly `length - hop` samples whatever the callback
+    latency. Windows are shorter until `length` samples were stored.
+
+    Callbacks run on a worker thread so analysis never delays ingest. If a
+    tick is due while the previous one is still being analysed, it waits;
+    if another tick arrives meanwhile, the waiting one is skipped and
+    counted in `skipped`, so the analysis always resumes at the newest
+    tick.
+
+    Windows are read-only views of the buffer in the accumulate and memmap
+    modes, and copies in the roll mode, where the buffer is overwritten.
+    """
+
+    def __init__(
+        self,
+        eeg,
+        length: int,
+        hop: int,
+        channels: typing.Optional[list] = None,
+        mask: bool = False,
+        filtered: bool = False,
+    ) -> None:
+        """Initializes the WindowScheduler object.
+
+        Parameters
+        ----------
+        eeg : EEG
+            Acquisition to analyse.
+        length : int
+            Window length in samples.
+        hop : int
+            Samples between ticks.
+        channels : list, optional
+            Channel names to include, all channels in MNE order if None.
+        mask : bool, optional
+            Include validity masks, see `EEG.get_window`.
+        filtered : bool, optional
+            Analyse the data filtered during ingest, see `EEG.get_window`.
+
+        Raises
+        ------
+        BrainAccessException
+            If length or hop are not positive.
+        """
+        if length < 1 or hop < 1:
+            raise BrainAccessException("Window length and hop must be positive")
+        self.eeg = eeg
+        self.length = int(length)
+        self.hop = int(hop)
+        self.rows = eeg._channel_rows(channels)
+        self.mask = mask
+        self.filtered = filtered
+        self.ticks = 0
+        self.skipped = 0
+        self.errors = 0
+        self.max_duration = 0.0
+        # callbacks replaced, never mutated, so the worker can iterate them
+        self._callbacks: tuple = ()
+        self._next = 0
+        self._pending: typing.Optional[typing.Tuple[int, int]] = None
+        self._cond = threading.Condition()
+        self._running = False
+        self._thread: typing.Optional[threading.Thread] = None
+
+    def __enter__(self) -> "WindowScheduler":
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        self.stop()
+
+    def add_callback(self, callback: typing.Callable) -> None:
+        """Registers an analysis function.
+
+        Parameters
+        ----------
+        callback : callable
+            Function called with (window, tick), the `EEGWindow` and the
+            number of the tick, counting from 1. Ticks missing in the
+            sequence were skipped.
+        """
+        self._callbacks = self._callbacks + (callback,)
+
+    def remove_callback(self, callback: typing.Callable) -> None:
+        """Unregisters a function added with `add_callback`.
+
+        Parameters
+        ----------
+        callback : callable
+            previously added function
+        """
+        self._callbacks = tuple(x for x in self._callbacks if x != callback)
+
+    def start(self) -> None:
+        """Starts counting samples from the newest stored one.
+
+        Raises
+        ------
+        BrainAccessException
+            If the scheduler is already running.
+        """
+        if self._thread is not None:
+            raise BrainAccessException("Scheduler already running")
+        with self.eeg.lock:
+            self._next = self.eeg.data.total + self.hop
+        self._running = True
+        self._thread = threading.Thread(
+            target=self._run, name="brainaccess-window-scheduler", daemon=True
+        )
+        self._thread.start()
+        self.eeg.add_chunk_listener(self._on_chunk)
+
+    def stop(self, timeout: typing.Optional[float] = None) -> None:
+        """Stops the scheduler after the running analysis.
+
+        Parameters
+        ----------
+        timeout : float, optional
+            Maximum time to wait for the worker in seconds.
+        """
+        if self._thread is None:
+            return
+        self.eeg.remove_chunk_listener(self._on_chunk)
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        if threading.current_thread() is not self._thread:
+            self._thread.join(timeout)
+        self._thread = None
+
+    def stats(self) -> dict:
+        """Returns tick counters.
+
+        Returns
+        -------
+        dict
+            ticks, skipped, errors and the longest analysis in seconds.
+        """
+        with self._cond:
+            return {
+                "ticks": self.ticks,
+                "skipped": self.skipped,
+                "errors": self.errors,
+                "max_duration_s": self.max_duration,
+            }
+
+    def _on_chunk(self, chunk, chunk_size: int) -> None:
+        """Chunk listener, runs on the ingest thread after the chunk was stored."""
+        # only the ingest thread writes, so total is stable here
+        stop = self.eeg.data.total
+        if stop < self._next:
+            return
+        with self._cond:
+            while self._next <= stop:
+                self.ticks += 1
+                if self._pending is not None:
+                    self.skipped += 1
+                self._pending = (self.ticks, self._next)
+                self._next += self.hop
+            self._cond.notify_all()
+
+    def _run(self) -> None:
+        """Worker loop running the callbacks for the newest pending tick."""
+        while True:
+            with self._cond:
+                while self._running and self._pending is None:
+                    self._cond.wait()
+                if not self._running:
+                    return
+                tick, stop = self._pending
+                self._pending = None
+            start = time.perf_counter()
+            window = self.eeg.data.window_at(
+                stop, self.length, self.rows, self.mask, self.filtered
+            )
+            for callback in self._callbacks:
+                try:
+                    callback(window, tick)
+                except Exception:
+                    self.errors += 1
+                    traceback.print_exc()
+            self.max_duration = max(self.max_duration, time.perf_counter() - start)
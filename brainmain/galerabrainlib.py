@@ -40,6 +40,16 @@ def fif_to_df(raw):
     df=df.drop(4,axis=1)
     df = df.set_axis(["time","O1","O2","Fp2","Fp1"], axis=1)
     return df
+def window_to_df(window):
+    data=window.data
+    if window.valid is not None and not window.valid.all():
+        # lost and zero-filled samples would show up as huge derivatives
+        idx=np.arange(data.shape[1])
+        data=np.array([np.interp(idx,idx[window.valid],ch[window.valid]) for ch in data])
+    df=pd.DataFrame(data.T)
+    df.insert(0, 'time', window.times)
+    df = df.set_axis(["time","O1","O2","Fp2","Fp1"], axis=1)
+    return df
 def pochodnia(df):
     t_df=pd.DataFrame(df["time"])
     df=calculate_derivatives_exclude_time(df)
@@ -48,7 +58,13 @@ def pochodnia(df):
     df=sigma3(df)
     return df
 def contr(raw):
-    df=fif_to_df(raw)
+    return focus_score(fif_to_df(raw))
+def contr_window(window):
+    # None if too much of the window was lost to score it
+    if window.valid is not None and window.valid.mean()<0.5:
+        return None
+    return focus_score(window_to_df(window))
+def focus_score(df):
     df=pochodnia(df)
     df=abs(df)
     sr=df.std()/df.mean()
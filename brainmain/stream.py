@@ -9,6 +9,7 @@ import numpy as np
 import requests
 from brainaccess.utils import acquisition
 from brainaccess.core.eeg_manager import EEGManager
+from brainaccess.utils.replay import ReplayEEGManager
 import json
 import galerabrainlib as g
 
@@ -32,38 +33,42 @@ cap: dict = {
  7: "O2",
 }
 
-def run_eeg_acquisition(timme=5):
+def run_eeg_acquisition(timme=5, device_name="BA HALO 089", replay=None):
     # matplotlib.use("TKAgg", force=True)
+    # replay: path of a .fif/.csv recording to stream instead of the headset
     eeg = acquisition.EEG()
-    device_name = "BA HALO 089"
 
     global activate
 
     try:
-        with EEGManager() as mgr:
-            eeg.setup(mgr, device_name=device_name, cap=halo, sfreq=250)
+        if replay:
+            manager = ReplayEEGManager(replay, cap=halo, loop=True)
+        else:
+            manager = EEGManager()
+        with manager as mgr:
+            eeg.setup(mgr, device_name=device_name, cap=halo, sfreq=250, scan=not replay)
             eeg.start_acquisition()
             print("Acquisition started")
 
             foc = pd.DataFrame({"i", "foc"})
-            i = 0
             annotation = 1
 
             print("Starting in 5 seconds")
             time.sleep(5)
 
-            while True:
-                time.sleep(1)
-
+            def score(window, tick):
+                # runs every second of samples on the scheduler thread
+                nonlocal foc, annotation
                 eeg.annotate(str(annotation))
-                mmm = eeg.get_mne(tim=5)
-                f_i = g.contr(mmm)
+                annotation += 1
+                f_i = g.contr_window(window)
+                if f_i is None:
+                    print("Too many samples lost, skipping window")
+                    return
 
-                new_row = pd.DataFrame({"i": [i], "foc": [f_i]})
+                new_row = pd.DataFrame({"i": [tick - 1], "foc": [f_i]})
                 foc = pd.concat([foc, new_row], ignore_index=True)
 
-                i += 1
-
                 to_send = {"attentionScore": f_i}
 
                 try:
@@ -71,10 +76,14 @@ def run_eeg_acquisition(timme=5):
                 except Exception as e:
                     print(f"Failed to send stats: {e}")
 
-                annotation += 1
-
-                if not getattr(threading.current_thread(), "do_run", True):
-                    break
+            with eeg.schedule_windows(
+                length=5 * eeg.sfreq, hop=eeg.sfreq, channels=list(halo.values()), mask=True
+            ) as scheduler:
+                scheduler.add_callback(score)
+                while getattr(threading.current_thread(), "do_run", True):
+                    time.sleep(0.1)
+            if scheduler.skipped:
+                print(f"Scoring too slow, skipped {scheduler.skipped} windows")
 
             eeg.stop_acquisition()
             mgr.disconnect()
@@ -10,13 +10,14 @@ import numpy as np
 import time
 import threading
 import matplotlib.pyplot as plt
-from scipy.signal import butter, sosfiltfilt
+from scipy.signal import sosfiltfilt
 from brainaccess import core
 from brainaccess.core.eeg_manager import EEGManager
 import brainaccess.core.eeg_channel as eeg_channel
 from brainaccess.core.gain_mode import (
     GainMode,
 )
+from brainaccess.utils.filters import design_sos
 
 
 matplotlib.use("TKAgg", force=True)
@@ -25,12 +26,8 @@ matplotlib.use("TKAgg", force=True)
 def butter_bandpass(
     lowcut: float, highcut: float, fs: int, order: int = 2
 ) -> np.ndarray:
-    """Design a bandpass Butterworth filter."""
-    nyq = 0.5 * fs
-    low = lowcut / nyq
-    high = highcut / nyq
-    sos = butter(order, [low, high], analog=False, btype="bandpass", output="sos")
-    return sos
+    """Design a bandpass Butterworth filter, cached after the first call."""
+    return design_sos(fs, "bandpass", (lowcut, highcut), order)
 
 
 def butter_bandpass_filter(
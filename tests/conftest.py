@@ -0,0 +1,75 @@
+"""Shared fixtures.
+
+The package loads the BrainAccess core library on import, from the working
+directory or `brainaccess/lib`. Tests are not collected when it is not
+loadable, run them from the directory holding the library.
+"""
+
+import time
+import typing
+
+import mne
+import numpy as np
+import pytest
+
+try:
+    from brainaccess.utils import acquisition
+    from brainaccess.utils.replay import ReplayEEGManager
+
+    _missing = None
+except Exception as e:  # pragma: no cover - depends on the platform
+    _missing = f"BrainAccess core library not loadable, tests skipped: {e}"
+    collect_ignore_glob = ["test_*.py"]
+
+
+def pytest_report_header(config):
+    return _missing
+
+CAP = {0: "Fp1", 1: "Fp2", 2: "O1", 3: "O2"}
+SFREQ = 250
+
+
+def make_raw(seconds: float = 10, extra: typing.Optional[dict] = None) -> mne.io.RawArray:
+    """Recording of the CAP electrodes, a 10 Hz rhythm on an offset per channel."""
+    n = int(seconds * SFREQ)
+    t = np.arange(n) / SFREQ
+    data = [1e-5 * np.sin(2 * np.pi * 10 * t) + 1e-4 * (idx + 1) for idx in range(len(CAP))]
+    names = list(CAP.values())
+    types = ["eeg"] * len(CAP)
+    for name, row in (extra or {}).items():
+        data.append(row)
+        names.append(name)
+        types.append("misc")
+    info = mne.create_info(names, SFREQ, types)
+    return mne.io.RawArray(np.vstack(data), info, verbose=False)
+
+
+@pytest.fixture
+def replay():
+    """Runs an `EEG` over a replayed recording until the replay ends."""
+    eegs = []
+
+    def run(
+        recording=None,
+        mode: str = "accumulate",
+        manager: typing.Optional[dict] = None,
+        **setup,
+    ) -> "acquisition.EEG":
+        eeg = acquisition.EEG(mode=mode)
+        eegs.append(eeg)
+        mgr = ReplayEEGManager(
+            make_raw() if recording is None else recording,
+            cap=CAP,
+            speed=None,
+            **(manager or {}),
+        )
+        with mgr:
+            eeg.setup(mgr, "replay", cap=CAP, sfreq=SFREQ, scan=False, **setup)
+            eeg.start_acquisition()
+            while mgr.is_streaming():
+                time.sleep(0.005)
+        return eeg
+
+    yield run
+    for eeg in eegs:
+        eeg.close()
@@ -0,0 +1,30 @@
+from brainaccess.utils.annotations import AnnotationIndex
+
+
+def _index():
+    index = AnnotationIndex()
+    index.update({"timestamps": [50, 10, 30], "annotations": ["c", "a", "b"]})
+    return index
+
+
+def test_between_is_half_open():
+    index = _index()
+    assert index.between(10, 50) == ([10, 30], ["a", "b"])
+    assert index.between(11, 51) == ([30, 50], ["b", "c"])
+    assert index.between(31) == ([50], ["c"])
+    assert index.between(60, 70) == ([], [])
+
+
+def test_update_only_adds_new_entries():
+    index = _index()
+    index.update(
+        {"timestamps": [50, 10, 30, 20], "annotations": ["c", "a", "b", "d"]}
+    )
+    assert index.timestamps == [10, 20, 30, 50]
+    assert index.descriptions == ["a", "d", "b", "c"]
+
+
+def test_cleared_history_starts_over():
+    index = _index()
+    index.update({"timestamps": [5], "annotations": ["x"]})
+    assert index.between(0) == ([5], ["x"])
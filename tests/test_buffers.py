@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+
+from brainaccess.utils.buffers import GrowableBuffer, RingBuffer
+
+
+def _chunk(start: int, n: int, chans: int = 2) -> np.ndarray:
+    return np.vstack([np.arange(start, start + n) + 1000 * row for row in range(chans)])
+
+
+def test_ring_buffer_wraps():
+    buffer = RingBuffer(2, 10)
+    for start in range(0, 23, 7):
+        buffer.write(_chunk(start, 7))
+    assert buffer.total == 28
+    assert len(buffer) == 10
+    np.testing.assert_array_equal(buffer.latest(), _chunk(18, 10))
+    older, newer = buffer.latest_views()
+    # the newest samples wrap around the end of the storage
+    assert older.shape[1] > 0 and newer.shape[1] > 0
+
+
+@pytest.mark.parametrize("samples, skip", [(4, 0), (4, 3), (None, 5), (10, 8), (3, 20)])
+def test_ring_buffer_latest_skip(samples, skip):
+    buffer = RingBuffer(2, 10)
+    for start in range(0, 23, 7):
+        buffer.write(_chunk(start, 7))
+    stored = _chunk(18, 10)
+    stop = 10 - min(skip, 10)
+    start = 0 if samples is None else max(stop - samples, 0)
+    np.testing.assert_array_equal(buffer.latest(samples, skip), stored[:, start:stop])
+
+
+def test_ring_buffer_chunk_longer_than_buffer():
+    buffer = RingBuffer(2, 5)
+    buffer.write(_chunk(0, 3))
+    buffer.write(_chunk(3, 12))
+    np.testing.assert_array_equal(buffer.latest(), _chunk(10, 5))
+    assert buffer.total == 15
+
+
+def test_ring_buffer_rows_and_dtype():
+    buffer = RingBuffer(2, 10, dtype=np.float32)
+    buffer.write([np.arange(4), np.arange(4) + 1000])
+    np.testing.assert_array_equal(buffer.latest(), _chunk(0, 4))
+    assert buffer.latest(dtype=np.float64).dtype == np.float64
+    assert buffer.latest().dtype == np.float32
+
+
+def test_growable_buffer_views_stay_valid():
+    buffer = GrowableBuffer(2, capacity=4)
+    buffer.write(_chunk(0, 3))
+    view = buffer.latest_views()[0]
+    for start in range(3, 100, 7):
+        buffer.write(_chunk(start, 7))
+    np.testing.assert_array_equal(view, _chunk(0, 3))
+    np.testing.assert_array_equal(buffer.latest(5, skip=2), _chunk(94, 5))
@@ -0,0 +1,60 @@
+import numpy as np
+import pytest
+
+from brainaccess.utils.clock import SampleClock
+
+SFREQ = 250
+# chunks arrive up to 4 ms late, 2 ms on average
+LATENCY = 0.002
+
+
+def _feed(clock, first, chunks, start_time, position=0, size=10, drift=1.0):
+    rng = np.random.default_rng(first)
+    for idx in range(chunks):
+        numbers = np.arange(first + idx * size, first + (idx + 1) * size)
+        host = start_time + drift * (numbers[-1] - first) / SFREQ
+        clock.update(numbers, position + idx * size, host + rng.uniform(0, 2 * LATENCY))
+
+
+def test_tracks_drift():
+    clock = SampleClock(SFREQ)
+    _feed(clock, 0, 1500, 100.0, drift=1.0001)
+    assert clock.stats()["drift_ppm"] == pytest.approx(100, abs=10)
+    expected = 100.0 + LATENCY + 1.0001 * 14999 / SFREQ
+    assert clock.host_time(14999) == pytest.approx(expected, abs=5e-4)
+    assert clock.sample_number(clock.host_time(1234)) == pytest.approx(1234)
+    assert abs(clock.position(clock.host_time(14000)) - 14000) <= 1
+
+
+def test_counter_restart_resets():
+    clock = SampleClock(SFREQ)
+    _feed(clock, 1000, 100, 100.0)
+    assert clock.observations == 100
+    # the device restarted counting at 0, later in host time
+    _feed(clock, 0, 20, 200.0, position=1000)
+    assert clock.observations == 20
+    assert clock.host_time(0) == pytest.approx(200.0, abs=0.01)
+    # positions before the restart are not mapped anymore
+    assert clock.position(0.0) == 1000
+    start, stop = clock.positions(200.0 + LATENCY, 200.0 + LATENCY + 99 / SFREQ)
+    assert abs(start - 1000) <= 1 and abs(stop - 1100) <= 1
+
+
+def test_trim_keeps_anchors_bounded():
+    clock = SampleClock(SFREQ)
+    rng = np.random.default_rng(0)
+    for idx in range(1500):
+        numbers = np.arange(idx * 10, (idx + 1) * 10)
+        clock.update(numbers, idx * 10, 100.0 + numbers[-1] / SFREQ + rng.uniform(0, 0.004))
+        # a ring buffer of 1000 samples
+        clock.trim(max((idx + 1) * 10 - 1000, 0))
+        assert len(clock._times) <= 201
+    assert abs(clock.position(clock.host_time(14500)) - 14500) <= 1
+    # times before the kept anchors map to the oldest position still covered
+    assert 14000 - 1000 <= clock.position(0.0) <= 14000
+
+
+def test_roll_mode_trims_anchors(replay):
+    eeg = replay(mode="roll", zeros_at_start=200)
+    assert eeg.data.clock.observations == 250
+    assert len(eeg.data.clock._times) <= 2 * 200 // 10 + 1
@@ -0,0 +1,207 @@
+import ctypes
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from brainaccess.core import eeg_manager
+from brainaccess.utils.buffers import BufferPool
+from brainaccess.utils.dispatch import ChunkDispatcher, ChunkPacker, make_chunk_callback
+from brainaccess.utils.exceptions import BrainAccessException
+
+
+class Receiver:
+    """Callback that waits until released and records the chunks."""
+
+    def __init__(self, fail=()):
+        self.chunks = []
+        self.started = threading.Event()
+        self.go = threading.Event()
+        self.fail = fail
+
+    def __call__(self, chunk, chunk_size):
+        self.started.set()
+        self.go.wait(5)
+        if chunk in self.fail:
+            raise ValueError(chunk)
+        self.chunks.append(chunk)
+
+
+def _busy(policy, maxsize=2, **kwargs):
+    """Dispatcher whose worker holds chunk 0, with a full queue behind it."""
+    receiver = Receiver(**kwargs)
+    released = []
+    dispatcher = ChunkDispatcher(receiver, maxsize, policy, release=released.append)
+    assert dispatcher.put_chunk(0, 1)
+    assert receiver.started.wait(5)
+    for chunk in range(1, maxsize + 1):
+        assert dispatcher.put_chunk(chunk, 1)
+    return dispatcher, receiver, released
+
+
+def _wait_idle(dispatcher, chunks=4):
+    for _ in range(500):
+        stats = dispatcher.stats()
+        done = stats["delivered"] + stats["errors"] + stats["dropped"]
+        if stats["depth"] == 0 and done == chunks:
+            return stats
+        time.sleep(0.01)
+    raise AssertionError(dispatcher.stats())
+
+
+def test_drop_newest():
+    dispatcher, receiver, released = _busy("drop_newest")
+    assert not dispatcher.put_chunk(3, 1)
+    assert released == [3]
+    receiver.go.set()
+    stats = _wait_idle(dispatcher)
+    dispatcher.stop()
+    assert receiver.chunks == [0, 1, 2]
+    assert released == [3, 0, 1, 2]
+    assert (stats["dropped"], stats["delivered"], stats["max_depth"]) == (1, 3, 2)
+
+
+def test_drop_oldest():
+    dispatcher, receiver, released = _busy("drop_oldest")
+    assert dispatcher.put_chunk(3, 1)
+    assert released == [1]
+    receiver.go.set()
+    stats = _wait_idle(dispatcher)
+    dispatcher.stop()
+    assert receiver.chunks == [0, 2, 3]
+    assert (stats["dropped"], stats["delivered"]) == (1, 3)
+
+
+def test_block_waits_for_the_worker():
+    dispatcher, receiver, released = _busy("block")
+    producer = threading.Thread(target=dispatcher.put_chunk, args=(3, 1))
+    producer.start()
+    producer.join(0.1)
+    assert producer.is_alive()
+    receiver.go.set()
+    producer.join(5)
+    assert not producer.is_alive()
+    stats = _wait_idle(dispatcher)
+    dispatcher.stop()
+    assert receiver.chunks == [0, 1, 2, 3]
+    assert stats["dropped"] == 0
+
+
+def test_stop_releases_a_blocked_producer():
+    dispatcher, receiver, released = _busy("block")
+    result = []
+    producer = threading.Thread(target=lambda: result.append(dispatcher.put_chunk(3, 1)))
+    producer.start()
+    producer.join(0.1)
+    dispatcher.stop(drain=False, timeout=0)
+    producer.join(5)
+    assert result == [False]
+    receiver.go.set()
+    dispatcher.stop()
+
+
+def test_stop_without_drain_drops_queued_chunks():
+    dispatcher, receiver, released = _busy("drop_newest")
+    dispatcher.stop(drain=False, timeout=0)
+    assert sorted(released) == [1, 2]
+    receiver.go.set()
+    dispatcher.stop()
+    assert receiver.chunks == [0]
+    assert not dispatcher.put_chunk(4, 1)
+    stats = dispatcher.stats()
+    assert (stats["dropped"], stats["delivered"]) == (3, 1)
+
+
+def test_stop_with_drain_delivers_queued_chunks():
+    dispatcher, receiver, released = _busy("drop_newest")
+    receiver.go.set()
+    dispatcher.stop()
+    assert receiver.chunks == [0, 1, 2]
+    assert released == [0, 1, 2]
+
+
+def test_failed_chunks_are_not_delivered(capsys):
+    dispatcher, receiver, released = _busy("drop_newest", fail=(1,))
+    receiver.go.set()
+    dispatcher.stop()
+    stats = dispatcher.stats()
+    assert (stats["errors"], stats["delivered"]) == (1, 2)
+    assert released == [0, 1, 2]
+    assert "ValueError" in capsys.readouterr().err
+
+
+def test_invalid_options():
+    with pytest.raises(BrainAccessException):
+        ChunkDispatcher(print, policy="drop_all")
+    with pytest.raises(BrainAccessException):
+        ChunkDispatcher(print, maxsize=0)
+
+
+def test_packer_returns_blocks_to_the_pool():
+    pool = BufferPool(np.float32, size=4)
+    received = []
+    packer = ChunkPacker(lambda block, n: received.append(block.copy()), pool)
+    chunk = [np.arange(3.0), np.arange(3.0) + 10]
+    for _ in range(5):
+        packer(chunk, 3)
+    assert pool.allocated == 1
+    np.testing.assert_array_equal(received[-1], np.vstack(chunk))
+    assert received[-1].dtype == np.float32
+
+
+def test_packer_keeps_blocks_for_the_receiver():
+    pool = BufferPool(size=4)
+    received = []
+    packer = ChunkPacker(lambda block, n: received.append(block), pool, release_after=False)
+    packer([np.zeros(3)], 3)
+    packer([np.ones(3)], 3)
+    assert pool.allocated == 2
+    assert received[0] is not received[1]
+
+
+def test_threaded_contiguous_releases_after_delivery():
+    received = []
+    callback, dispatcher = make_chunk_callback(
+        lambda block, n: received.append(block.copy()),
+        threaded=True,
+        queue_size=4,
+        contiguous=True,
+    )
+    for idx in range(20):
+        callback([np.full(2, idx), np.full(2, -idx)], 2)
+        # let the worker catch up so blocks are reused
+        for _ in range(500):
+            if dispatcher.stats()["delivered"] == idx + 1:
+                break
+            time.sleep(0.001)
+    dispatcher.stop()
+    assert len(received) == 20
+    np.testing.assert_array_equal(received[7], [[7, 7], [-7, -7]])
+    assert callback.pool.allocated <= 2
+
+
+def test_blocked_device_thread_lets_the_worker_query_the_manager():
+    mgr = eeg_manager.EEGManager()
+    depths = []
+
+    def callback(chunk, chunk_size):
+        # the device thread is waiting for queue space by now
+        time.sleep(0.01)
+        depths.append(mgr.get_chunk_queue_stats()["depth"])
+
+    mgr.set_callback_chunk(callback, threaded=True, queue_size=1, policy="block")
+    pointers = (ctypes.c_void_p * 1)()
+
+    def device():
+        for _ in range(10):
+            eeg_manager._callback_chunk(pointers, 4, mgr._manager)
+
+    thread = threading.Thread(target=device, daemon=True)
+    thread.start()
+    thread.join(5)
+    try:
+        assert not thread.is_alive()
+        assert len(depths) >= 8
+    finally:
+        mgr.destroy()
@@ -0,0 +1,78 @@
+import numpy as np
+import pytest
+
+from brainaccess.utils.filters import (
+    Decimator,
+    FilterBank,
+    clear_design_cache,
+    design_cache_info,
+    design_sos,
+)
+
+SAMPLE_ROW = 2
+
+
+def _stream(n: int = 1000) -> np.ndarray:
+    rng = np.random.default_rng(0)
+    chunk = rng.standard_normal((3, n))
+    chunk[SAMPLE_ROW] = np.arange(n)
+    return chunk
+
+
+def _decimate(stream: np.ndarray, size: int, factor: int = 2) -> np.ndarray:
+    decimator = Decimator(factor, SAMPLE_ROW)
+    parts = [decimator(stream[:, x : x + size]) for x in range(0, stream.shape[1], size)]
+    return np.concatenate(parts, axis=1)
+
+
+@pytest.mark.parametrize("size", [1, 3, 7])
+def test_decimator_chunked_equals_whole(size):
+    stream = _stream()
+    whole = _decimate(stream, stream.shape[1])
+    np.testing.assert_allclose(_decimate(stream, size), whole)
+    np.testing.assert_array_equal(whole[SAMPLE_ROW], np.arange(500))
+
+
+def test_decimator_odd_chunk_keeps_nothing():
+    decimator = Decimator(2, SAMPLE_ROW)
+    chunk = _stream(2)[:, 1:]
+    assert decimator(chunk).shape == (3, 0)
+
+
+def test_decimator_empty_chunk():
+    decimator = Decimator(2, SAMPLE_ROW)
+    assert decimator(np.zeros((3, 0))).shape == (3, 0)
+    # the state is still initialised by the first real chunk
+    assert decimator(_stream(4)).shape == (3, 2)
+
+
+def test_decimator_invalid_factor():
+    with pytest.raises(Exception):
+        Decimator(1.5, SAMPLE_ROW)
+
+
+@pytest.mark.parametrize("size", [1, 17, 250])
+def test_filter_bank_chunked_equals_whole(size):
+    stream = _stream(2000)[:2]
+    bank = FilterBank(250, notch=(50, 2), bandpass=(1, 40))
+    whole = bank(stream)
+    bank.reset()
+    parts = [bank(stream[:, x : x + size]) for x in range(0, stream.shape[1], size)]
+    np.testing.assert_allclose(np.concatenate(parts, axis=1), whole)
+
+
+def test_filter_bank_invalid():
+    with pytest.raises(Exception):
+        FilterBank(250)
+    with pytest.raises(Exception):
+        FilterBank(250, lowpass=200)
+
+
+def test_design_sos_cache():
+    clear_design_cache()
+    first = design_sos(250, "lowpass", 40)
+    np.testing.assert_array_equal(design_sos(250.0, "lowpass", [40.0]), first)
+    info = design_cache_info()
+    assert (info.hits, info.misses) == (1, 1)
+    with pytest.raises(Exception):
+        design_sos(250, "bandpass", (40, 1))
@@ -0,0 +1,44 @@
+import numpy as np
+
+from brainaccess.utils.gaps import Gap, GapIndex
+
+
+def test_contiguous_stream_has_no_gaps():
+    index = GapIndex()
+    for start in range(0, 100, 10):
+        index.update(np.arange(start, start + 10), np.ones(10), start)
+    assert index.gaps == []
+    assert index.mask(0, 100).all()
+
+
+def test_missing_samples_invalidate_first_sample_after():
+    index = GapIndex()
+    index.update(np.arange(0, 10), None, 0)
+    # samples 10-14 never arrived
+    index.update(np.arange(15, 25), None, 10)
+    assert index.gaps == [Gap(10, 15, 5, 0)]
+    assert index.stats()["missing_samples"] == 5
+    valid = index.mask(5, 15)
+    np.testing.assert_array_equal(np.flatnonzero(~valid), [5])
+
+
+def test_zero_filled_runs_across_chunks():
+    index = GapIndex()
+    streaming = np.ones(30)
+    streaming[8:23] = 0
+    for start in range(0, 30, 10):
+        index.update(
+            np.arange(start, start + 10), streaming[start : start + 10], start
+        )
+    assert index.gaps == [Gap(8, 8, 0, 15)]
+    np.testing.assert_array_equal(index.mask(0, 30), streaming > 0)
+    np.testing.assert_array_equal(index.mask(10, 20), np.zeros(10, dtype=bool))
+    np.testing.assert_array_equal(index.mask(25, 35), np.ones(10, dtype=bool))
+
+
+def test_counter_restart():
+    index = GapIndex()
+    index.update(np.arange(100, 110), None, 0)
+    index.update(np.arange(0, 10), None, 10)
+    assert index.gaps == [Gap(10, 0, 0, 0)]
+    assert index.stats()["missing_samples"] == 0
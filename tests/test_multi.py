@@ -0,0 +1,68 @@
+import time
+
+import numpy as np
+import pytest
+
+from brainaccess.utils import acquisition
+from brainaccess.utils.exceptions import BrainAccessException
+from brainaccess.utils.multi import MultiEEG
+from brainaccess.utils.replay import ReplayEEGManager
+from conftest import CAP, SFREQ, make_raw
+
+# seconds device B starts streaming after device A
+OFFSET = 0.4
+
+
+def _managers(seconds=2):
+    recording = make_raw(seconds=seconds)
+    other = make_raw(seconds=seconds)
+    # tell the devices apart
+    other._data[: len(CAP)] *= -1
+    return {
+        "A": ReplayEEGManager(recording, cap=CAP, speed=1),
+        "B": ReplayEEGManager(other, cap=CAP, speed=1),
+    }
+
+
+def test_aligned_windows():
+    managers = _managers()
+    with MultiEEG(mode="accumulate") as multi:
+        multi.setup(["A", "B"], cap=CAP, sfreq=SFREQ, managers=managers)
+        start = time.monotonic()
+        multi.devices["A"].start_acquisition()
+        time.sleep(OFFSET)
+        offset = (time.monotonic() - start) * SFREQ
+        multi.devices["B"].start_acquisition()
+        while any(mgr.is_streaming() for mgr in managers.values()):
+            time.sleep(0.01)
+        windows = multi.get_windows(samples=200)
+        assert windows.data.shape == (2, len(CAP), 200)
+        assert windows.sample_numbers.shape == (2, 200)
+        # A finished first, B is OFFSET behind in its own sample numbers
+        lag = windows.sample_numbers[0] - windows.sample_numbers[1]
+        assert np.abs(lag - offset).max() <= 3
+        np.testing.assert_array_equal(np.diff(windows.sample_numbers, axis=1), 1)
+        for row, name in enumerate(["A", "B"]):
+            window = multi.devices[name].get_window(channels=list(CAP.values()))
+            start = np.searchsorted(window.sample_numbers, windows.sample_numbers[row][0])
+            np.testing.assert_array_equal(windows.data[row], window.data[:, start : start + 200])
+        assert np.all(windows.data[0].mean(axis=1) > 0)
+        assert np.all(windows.data[1].mean(axis=1) < 0)
+        np.testing.assert_allclose(np.diff(windows.times), 1 / SFREQ)
+    assert multi.devices == {} and multi.managers == {}
+
+
+def test_failed_setup_disconnects_devices(monkeypatch):
+    managers = _managers()
+
+    def fail(name):
+        raise RuntimeError("connection refused")
+
+    monkeypatch.setattr(managers["B"], "connect", fail)
+    users = acquisition._core_users
+    multi = MultiEEG()
+    with pytest.raises(BrainAccessException):
+        multi.setup(["A", "B"], cap=CAP, sfreq=SFREQ, managers=managers)
+    assert not managers["A"].is_connected()
+    assert multi.devices == {} and multi.managers == {}
+    assert acquisition._core_users == users
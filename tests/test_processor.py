@@ -0,0 +1,158 @@
+import numpy as np
+import pytest
+
+try:
+    from brainaccess.connect import processor
+except Exception as e:  # pragma: no cover - depends on the platform
+    pytest.skip(f"BrainAccess connect library not loadable: {e}", allow_module_level=True)
+
+SFREQ = 250
+
+# functions whose native call takes separate input and output pointers
+TRANSFORMS = {
+    "detrend": processor.detrend,
+    "demean": processor.demean,
+    "standardize": processor.standardize,
+    "ewma": processor.ewma,
+    "ewma_standardize": processor.ewma_standardize,
+}
+
+
+def _data(shape, seed=0):
+    rng = np.random.default_rng(seed)
+    return 1e-5 * rng.standard_normal(shape) + rng.standard_normal(shape[:-1] + (1,))
+
+
+@pytest.mark.parametrize("name", TRANSFORMS)
+@pytest.mark.parametrize("shape", [(1, 1), (3, 7), (8, 1250), (2, 100000), (5, 4, 1250)])
+def test_inplace_matches_separate_output(name, shape):
+    func = TRANSFORMS[name]
+    x = _data(shape)
+    expected = func(x)
+    out = np.empty_like(x)
+    assert func(x, out=out) is out
+    y = x.copy()
+    assert func(y, inplace=True) is y
+    np.testing.assert_array_equal(out, expected)
+    np.testing.assert_array_equal(y, expected)
+
+
+def test_destination_checked():
+    x = _data((2, 10))
+    with pytest.raises(Exception):
+        processor.demean(x, out=np.empty((2, 10), dtype=np.float32))
+    with pytest.raises(Exception):
+        processor.demean(x, out=np.empty((2, 10)), inplace=True)
+    with pytest.raises(Exception):
+        processor.demean(x.astype(np.float32), inplace=True)
+
+
+def _layouts(shape):
+    """Contiguous float64 data and a float32 view of a wider buffer."""
+    x = _data(shape)
+    wide = np.zeros(shape[:-1] + (2 * shape[-1],), dtype=np.float32)
+    wide[..., : shape[-1]] = x
+    return {"float64": x, "float32_view": wide[..., : shape[-1]]}
+
+
+@pytest.mark.parametrize("layout", ["float64", "float32_view"])
+def test_reductions_match_numpy(layout):
+    x = _layouts((4, 1250))[layout]
+    ref = x.astype(np.float64)
+    np.testing.assert_allclose(processor.mean(x), ref.mean(axis=-1))
+    np.testing.assert_allclose(processor.median(x), np.median(ref, axis=-1))
+    minmax = processor.get_minmax(x)
+    np.testing.assert_allclose(minmax["min"], ref.min(axis=-1))
+    np.testing.assert_allclose(minmax["max"], ref.max(axis=-1))
+    np.testing.assert_allclose(
+        processor.demean(x), ref - ref.mean(axis=-1, keepdims=True), atol=1e-12
+    )
+    assert x.dtype == (np.float64 if layout == "float64" else np.float32)
+
+
+ND_FUNCTIONS = {
+    **TRANSFORMS,
+    "mean": processor.mean,
+    "std": processor.std,
+    "median": processor.median,
+    "mad": processor.mad,
+    "get_signal_quality": processor.get_signal_quality,
+    "filter_notch": lambda x: processor.filter_notch(x, SFREQ, 50, 2),
+    "filter_bandpass": lambda x: processor.filter_bandpass(x, SFREQ, 1, 40),
+    "filter_highpass": lambda x: processor.filter_highpass(x, SFREQ, 1),
+    "filter_lowpass": lambda x: processor.filter_lowpass(x, SFREQ, 40),
+}
+
+
+@pytest.mark.parametrize("name", ND_FUNCTIONS)
+def test_epochs_match_per_epoch_calls(name):
+    func = ND_FUNCTIONS[name]
+    epochs = _data((3, 4, 1250))
+    expected = np.stack([func(epoch) for epoch in epochs])
+    np.testing.assert_allclose(func(epochs), expected, rtol=1e-12, atol=1e-15)
+
+
+def test_epochs_fft_and_minmax():
+    epochs = _data((3, 4, 500))
+    fft = processor.fft(epochs, SFREQ)
+    minmax = processor.get_minmax(epochs)
+    for idx, epoch in enumerate(epochs):
+        np.testing.assert_allclose(fft["mag"][idx], processor.fft(epoch, SFREQ)["mag"])
+        np.testing.assert_allclose(fft["phase"][idx], processor.fft(epoch, SFREQ)["phase"])
+        np.testing.assert_allclose(minmax["max"][idx], processor.get_minmax(epoch)["max"])
+
+
+def test_cut_into_epochs_keeps_leading_axes():
+    data = _data((2, 4, 10 * SFREQ))
+    epochs = processor.cut_into_epochs(data, SFREQ, epoch_length=2, overlap=0.5)
+    assert epochs.shape == (10, 2, 4, 2 * SFREQ)
+    for idx, device in enumerate(data):
+        expected = processor.cut_into_epochs(device, SFREQ, epoch_length=2, overlap=0.5)
+        np.testing.assert_array_equal(epochs[:, idx], expected)
+
+
+@pytest.mark.parametrize("normalize", [False, True])
+def test_get_bands_matches_per_epoch_loop(normalize):
+    data = _data((4, 20 * SFREQ))
+    bands = processor.get_bands(data, SFREQ, normalize=normalize)
+    epochs = processor.cut_into_epochs(data, SFREQ, overlap=0.1)
+    expected = np.mean(
+        [
+            processor.get_pow_freq_bands(processor.demean(epoch), SFREQ, normalize=normalize)
+            for epoch in epochs
+        ],
+        axis=0,
+    )
+    for idx, name in enumerate(["delta", "theta", "alpha", "beta", "gamma"]):
+        np.testing.assert_allclose(bands[name], expected[:, idx])
+
+
+def test_design_filter_cached():
+    from scipy import signal
+
+    sos = processor.design_filter(SFREQ, "bandpass", (1, 40))
+    np.testing.assert_allclose(
+        sos, signal.butter(4, [1, 40], btype="bandpass", fs=SFREQ, output="sos")
+    )
+    # callers get copies, changing one does not reach the cache
+    sos[:] = 0
+    again = processor.design_filter(float(SFREQ), "bandpass", [1.0, 40.0])
+    assert again.any()
+
+
+@pytest.mark.parametrize("shape", [(4, 1250), (3, 4, 1250)])
+def test_filter_sos_matches_scipy(shape):
+    from scipy import signal
+
+    x = _data(shape)
+    sos = processor.design_filter(SFREQ, "highpass", 1)
+    expected = signal.sosfiltfilt(sos, x, axis=-1)
+    np.testing.assert_allclose(processor.filter_sos(x, sos), expected)
+    y = x.copy()
+    assert processor.filter_sos(y, sos, inplace=True) is y
+    np.testing.assert_allclose(y, expected)
+    # float32 views are converted
+    np.testing.assert_allclose(
+        processor.filter_sos(_layouts(shape)["float32_view"], sos),
+        signal.sosfiltfilt(sos, _layouts(shape)["float32_view"].astype(np.float64), axis=-1),
+    )
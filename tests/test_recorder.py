@@ -0,0 +1,121 @@
+import json
+import shutil
+import time
+
+import mne
+import numpy as np
+
+from brainaccess.utils import acquisition
+from brainaccess.utils.recorder import (
+    _BLOCK,
+    _TRAILER,
+    TRAILER_MAGIC,
+    SessionRecorder,
+    read_session,
+    session_to_mne,
+)
+from brainaccess.utils.replay import ReplayEEGManager
+from conftest import CAP, SFREQ, make_raw
+
+
+def _record(path: str, recording=None, manager=None, recorder=None, **setup):
+    """Records a replay, annotated once it ended."""
+    eeg = acquisition.EEG()
+    if recording is None:
+        recording = make_raw(seconds=4)
+    with ReplayEEGManager(recording, cap=CAP, speed=20, **(manager or {})) as mgr:
+        eeg.setup(mgr, "replay", cap=CAP, sfreq=SFREQ, scan=False, **setup)
+        eeg.start_acquisition()
+        with SessionRecorder(eeg, path, **(recorder or {"interval": 0.02})) as rec:
+            while mgr.is_streaming():
+                time.sleep(0.005)
+            eeg.annotate("end")
+    eeg.recorder = rec
+    return eeg
+
+
+def _stored(eeg, session) -> np.ndarray:
+    """Samples of the EEG buffer at the recorded sample numbers."""
+    window = eeg.get_window(channels=session.header["ch_names"])
+    row = session.header["ch_names"].index("Sample")
+    start = np.searchsorted(window.sample_numbers, session.data[row][0])
+    return window.data[:, start : start + session.data.shape[1]]
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / "session.bar")
+    eeg = _record(path)
+    try:
+        session = read_session(path)
+        assert session.complete
+        assert session.header["ch_names"] == eeg.info.ch_names
+        assert session.data.shape[1] > 0
+        np.testing.assert_array_equal(session.data, _stored(eeg, session))
+        row = session.header["ch_names"].index("Sample")
+        np.testing.assert_array_equal(session.sample_numbers, session.data[row])
+        assert session.sample_numbers.dtype == np.float64
+        assert [x[1] for x in session.annotations] == ["end"]
+        raw = session_to_mne(path)
+        assert raw.annotations.description.tolist() == ["end"]
+    finally:
+        eeg.close()
+
+
+def test_truncated_recording_keeps_complete_blocks(tmp_path):
+    path = str(tmp_path / "session.bar")
+    eeg = _record(path)
+    try:
+        session = read_session(path)
+        with open(path, "rb") as f:
+            content = f.read()
+        offset = _TRAILER.unpack_from(content, len(content) - len(TRAILER_MAGIC) - _TRAILER.size)[0]
+        index = json.loads(content[offset + _BLOCK.size : -_TRAILER.size - len(TRAILER_MAGIC)])
+        blocks = [x for x in index if x[1] == "D"]
+        assert len(blocks) > 1
+        # crash while writing the last data block
+        last = blocks[-1]
+        cut = str(tmp_path / "cut.bar")
+        shutil.copy(path, cut)
+        with open(cut, "r+b") as f:
+            f.truncate(last[0] + _BLOCK.size + 10)
+        truncated = read_session(cut)
+        assert not truncated.complete
+        assert truncated.data.shape[1] == last[2]
+        np.testing.assert_array_equal(truncated.data, session.data[:, : last[2]])
+        assert truncated.annotations == []
+    finally:
+        eeg.close()
+
+
+def test_annotation_onsets_after_lost_samples(tmp_path):
+    path = str(tmp_path / "session.bar")
+    recording = make_raw(seconds=4)
+    recording.set_annotations(mne.Annotations([3.0], [0.0], ["late"]))
+    eeg = _record(path, recording, manager={"packet_loss": 0.3, "seed": 1})
+    try:
+        session = read_session(path)
+        numbers = session.data[session.header["ch_names"].index("Sample")]
+        sample = dict((x[1], x[0]) for x in session.annotations)["late"]
+        assert sample == 3 * SFREQ
+        position = np.searchsorted(numbers, sample)
+        # lost samples before the annotation
+        assert position < sample - numbers[0]
+        raw = session_to_mne(path)
+        onset = raw.annotations.onset[list(raw.annotations.description).index("late")]
+        assert round(onset * SFREQ) == position
+    finally:
+        eeg.close()
+
+
+def test_pending_chunks_are_bounded(tmp_path):
+    path = str(tmp_path / "session.bar")
+    # nothing is written until stop
+    eeg = _record(path, recorder={"interval": 60, "max_pending": 5})
+    try:
+        session = read_session(path)
+        assert session.complete
+        assert session.data.shape[1] == 5 * 10
+        assert eeg.recorder.dropped_chunks > 0
+        np.testing.assert_array_equal(session.data, _stored(eeg, session))
+    finally:
+        eeg.close()
@@ -0,0 +1,172 @@
+import time
+
+import mne
+import numpy as np
+import pytest
+
+from brainaccess.utils import acquisition
+from brainaccess.utils.exceptions import BrainAccessException
+from brainaccess.utils.replay import ReplayEEGManager
+from conftest import CAP, SFREQ, make_raw
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 20])
+@pytest.mark.parametrize("mode", ["accumulate", "roll"])
+def test_channels_and_decimation(replay, mode, chunk_size):
+    eeg = replay(
+        mode=mode,
+        manager={"chunk_size": chunk_size},
+        channels=["O1", "O2"],
+        decimation=2,
+        zeros_at_start=5000 if mode == "roll" else 0,
+    )
+    assert eeg.info.ch_names == ["O1", "O2", "Sample"]
+    assert eeg.info["sfreq"] == 125
+    window = eeg.get_window()
+    # 10 s at 250 Hz, every sample decimated, none stored raw
+    assert window.data.shape == (3, 1250)
+    np.testing.assert_array_equal(window.sample_numbers, np.arange(1250))
+    assert eeg.get_gaps()["gaps"] == 0
+
+
+@pytest.mark.parametrize("mode", ["accumulate", "roll", "memmap"])
+def test_filtered_window(replay, mode):
+    eeg = replay(
+        mode=mode,
+        filters={"bandpass": (1, 40)},
+        zeros_at_start=5000 if mode == "roll" else 0,
+    )
+    raw = eeg.get_window(samples=1000)
+    filtered = eeg.get_window(samples=1000, filtered=True)
+    np.testing.assert_array_equal(filtered.sample_numbers, raw.sample_numbers)
+    # the offsets are removed, the 10 Hz rhythm of amplitude 1e-5 is kept
+    assert np.abs(filtered.data[:4].mean(axis=1)).max() < 1e-6
+    assert abs(filtered.data[:4].std() - 1e-5 / np.sqrt(2)) < 1e-6
+    np.testing.assert_array_equal(filtered.data[4], raw.data[4])
+
+
+def test_setup_without_filters_clears_them(replay):
+    eeg = replay(filters={"bandpass": (1, 40)})
+    assert eeg.filter_bank is not None
+    with ReplayEEGManager(make_raw(), cap=CAP, speed=None) as mgr:
+        eeg.setup(mgr, "replay", cap=CAP, sfreq=SFREQ, scan=False)
+    assert eeg.filter_bank is None
+    with pytest.raises(BrainAccessException):
+        eeg.get_window(filtered=True)
+
+
+@pytest.mark.parametrize("name", ["empty.fif", "empty.csv"])
+def test_unreadable_recording(tmp_path, name):
+    path = tmp_path / name
+    path.write_bytes(b"")
+    with pytest.raises(BrainAccessException):
+        ReplayEEGManager(path)
+
+
+def test_chunks_during_stream_start_are_kept_without_waiting():
+    eeg = acquisition.EEG()
+    durations = []
+    acq = eeg._acq
+
+    def timed(chunk, chunk_size):
+        start = time.perf_counter()
+        acq(chunk, chunk_size)
+        durations.append(time.perf_counter() - start)
+
+    eeg._acq = timed
+    try:
+        with ReplayEEGManager(make_raw(), cap=CAP, speed=None) as mgr:
+            index = mgr.get_channel_index
+
+            def slow_index(channel):
+                # chunks keep arriving while the layout is queried
+                time.sleep(0.02)
+                return index(channel)
+
+            mgr.get_channel_index = slow_index
+            eeg.setup(mgr, "replay", cap=CAP, sfreq=SFREQ, scan=False)
+            eeg.start_acquisition()
+            while mgr.is_streaming():
+                time.sleep(0.005)
+        window = eeg.get_window()
+        np.testing.assert_array_equal(window.sample_numbers, np.arange(2500))
+        assert max(durations) < 0.05
+    finally:
+        eeg.close()
+
+
+@pytest.mark.parametrize(
+    "mode, cached",
+    [("accumulate", False), ("accumulate", True), ("roll", False), ("memmap", False)],
+)
+def test_annotations_after_lost_samples(mode, cached):
+    recording = make_raw()
+    recording.set_annotations(mne.Annotations([6.0], [0.0], ["late"]))
+    eeg = acquisition.EEG(mode=mode)
+    try:
+        with ReplayEEGManager(
+            recording, cap=CAP, speed=None, packet_loss=0.3, seed=2
+        ) as mgr:
+            eeg.setup(
+                mgr,
+                "replay",
+                cap=CAP,
+                sfreq=SFREQ,
+                scan=False,
+                zeros_at_start=5000 if mode == "roll" else 5,
+            )
+            eeg.start_acquisition()
+            while mgr.is_streaming():
+                time.sleep(0.005)
+            # the replay forgets annotations on disconnect
+            raw = eeg.get_mne(cached=cached) if mode != "roll" else eeg.get_mne(samples=1500)
+        numbers = raw.get_data(picks=["Sample"])[0]
+        assert raw.annotations.description.tolist() == ["late"]
+        position = round(raw.annotations.onset[0] * SFREQ)
+        assert numbers[position] == 6 * SFREQ or (
+            numbers[position] > 6 * SFREQ and numbers[position - 1] < 6 * SFREQ
+        )
+    finally:
+        eeg.close()
+
+
+@pytest.mark.parametrize("mode", ["accumulate", "roll", "memmap"])
+def test_large_sample_numbers_stay_exact_in_float32(mode):
+    eeg = acquisition.EEG(mode=mode, dtype=np.float32)
+    try:
+        with ReplayEEGManager(make_raw(seconds=2), cap=CAP, speed=None) as mgr:
+            eeg.setup(
+                mgr,
+                "replay",
+                cap=CAP,
+                sfreq=SFREQ,
+                scan=False,
+                decimation=2,
+                zeros_at_start=5000 if mode == "roll" else 0,
+            )
+            eeg.start_acquisition()
+            while mgr.is_streaming():
+                time.sleep(0.005)
+            # continue far past 2**24, where float32 rounds odd numbers
+            block = np.zeros((eeg.chans, SFREQ))
+            if eeg.data.streaming_index is not None:
+                block[eeg.data.streaming_index] = 1
+            first = 2**26 + 1
+            with eeg.lock:
+                # days of missing samples, the host clock starts over
+                eeg.clock.reset()
+            for start in range(first, first + 4 * SFREQ, SFREQ):
+                block[eeg.data.sample_index] = np.arange(start, start + SFREQ)
+                eeg._acq(block, SFREQ)
+        window = eeg.get_window(samples=2 * SFREQ)
+        assert window.data.dtype == np.float32
+        # every even sample number is kept and divided by the factor
+        expected = np.arange((first + 1) // 2, (first + 4 * SFREQ + 1) // 2)
+        np.testing.assert_array_equal(window.sample_numbers[-len(expected) :], expected)
+        # the jump to the large numbers is the only gap
+        assert eeg.get_gaps()["gaps"] == 1
+        raw = eeg.get_mne(samples=2 * SFREQ) if mode == "roll" else eeg.get_mne()
+        numbers = raw.get_data(picks=["Sample"])[0]
+        np.testing.assert_array_equal(numbers[-len(expected) :], expected)
+    finally:
+        eeg.close()